@@ -1,17 +1,38 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import logging
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import resource
+import sys
+import threading
+from flask import Flask, Response, g, request, jsonify, send_from_directory, url_for
+from werkzeug.datastructures import ContentRange
 from dotenv import load_dotenv
 from flask_cors import CORS
 
 from services.collection_services import (
-    delete_cluster, delete_collection, get_collection_by_id, 
+    delete_cluster, delete_collection, get_collection_by_id, get_collection_rollup,
     get_collections, get_cluster_by_id, get_report_by_id, get_reports
 )
+from services.contributor_services import get_contributors
 from services.file_services import upload_files
+from services.health_services import get_collection_health
 from services.report_services import generate_reports
 from services.server_services import open_file
-from utils.utils import REPORTS_DIR, TEMP_DIR, is_safe_path
+from services.trend_services import get_cluster_trend, get_trend_clusters
+from services.upload_services import (
+    cancel_upload, complete_upload, get_upload_status, initiate_upload, upload_chunk
+)
+from utils.governor import ArchiveTooLarge, Overloaded
+from utils.metrics import REGISTRY, REQUEST_LATENCY, STARTUP_DURATION, STARTUP_RSS
+from utils.profiling import PROFILES_DIR, PROFILING_ENABLED, profile_request
+from utils.reaper import start_reaper
+from utils.report_generator import get_report_key, list_report_files, stream_report_zip
+from utils.storage import REPORT_STORAGE
+from utils.tracing import span, current_trace_id, end_trace, start_trace
+from utils.upload_staging import UploadOffsetError
+from utils.utils import is_safe_path
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +45,53 @@ CORS(app)
 DEBUG_MODE = os.getenv("FLASK_DEBUG", "False").lower() == "true"
 PORT = int(os.getenv("FLASK_PORT", 5000))
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.before_request
+def start_request_trace():
+    # Reuse the caller's trace ID when it is well formed, so traces can span services
+    incoming = request.headers.get("X-Trace-Id", "")
+    g.trace_token = start_trace(incoming if is_safe_path(incoming) and len(incoming) <= 64 else None)
+    g.request_span = span("http.request", method=request.method, path=request.path).__enter__()
+
+
+@app.teardown_request
+def end_request_trace(exc):
+    request_span = g.pop("request_span", None)
+    if request_span is not None:
+        request_span.__exit__(type(exc) if exc else None, exc, None)
+    trace_token = g.pop("trace_token", None)
+    if trace_token is not None:
+        end_trace(trace_token)
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code,
+        )
+    if current_trace_id():
+        response.headers["X-Trace-Id"] = current_trace_id()
+    request_span = g.get("request_span")
+    if request_span is not None:
+        request_span.set(status=response.status_code)
+    return response
+
+
+# Prometheus metrics of this process only, see utils/metrics.py before running more than one worker
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
 # API Endpoints
 
 # Get all collections
@@ -45,6 +113,43 @@ def get_collection_by_id_endpoint():
     try:
         data = get_collection_by_id(collection_id)
         return jsonify({"data": data}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Get collection-wide totals, top entries and warning states
+@app.route('/api/v1/chartapp/collection/rollup', methods=['GET'])
+def get_collection_rollup_endpoint():
+    collection_id = request.args.get('collection_name')
+    if not collection_id:
+        return jsonify({"error": "Missing 'collection_name'"}), 400
+    try:
+        data = get_collection_rollup(collection_id)
+        return jsonify({"data": data}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Evaluate the health rules for the clusters of a collection
+@app.route('/api/v1/chartapp/collection/health', methods=['GET'])
+def get_collection_health_endpoint():
+    collection_id = request.args.get('collection_name')
+    if not collection_id:
+        return jsonify({"error": "Missing 'collection_name'"}), 400
+    cluster_names = [name for name in request.args.get('clusters', '').split(',') if name]
+    try:
+        data = get_collection_health(collection_id, cluster_names)
+        return jsonify({"data": data}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -72,6 +177,8 @@ def get_cluster_by_id_endpoint():
     try:
         data = get_cluster_by_id(collection_id, cluster_id)
         return jsonify({"data": data}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -90,6 +197,56 @@ def delete_clusters_endpoint():
         return jsonify({"error": str(e)}), 500
 
 
+# Find the servers that contributed to summary keys, e.g. an error or a path
+@app.route('/api/v1/chartapp/cluster/contributors', methods=['GET'])
+def get_contributors_endpoint():
+    collection_id = request.args.get('collection_name')
+    cluster_id = request.args.get('cluster_name')
+    file_name = request.args.get('file_name')
+    query = request.args.get('q')
+    if not collection_id or not cluster_id or not file_name or query is None:
+        return jsonify({"error": "Missing required fields"}), 400
+    try:
+        data = get_contributors(
+            collection_id, cluster_id, file_name, query,
+            request.args.get('match', 'exact'), request.args.get('limit', 50, type=int),
+        )
+        return jsonify({"data": data}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Get clusters with trend data
+@app.route('/api/v1/chartapp/trend', methods=['GET'])
+def get_trend_clusters_endpoint():
+    try:
+        return jsonify({"data": get_trend_clusters()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Get cluster trend across collections
+@app.route('/api/v1/chartapp/trend/', methods=['GET'])
+def get_cluster_trend_endpoint():
+    cluster_name = request.args.get('cluster_name')
+    if not cluster_name:
+        return jsonify({"error": "Missing 'cluster_name'"}), 400
+    metrics = [metric for metric in request.args.get('metrics', '').split(',') if metric]
+    try:
+        data = get_cluster_trend(cluster_name, metrics, request.args.get('since'), request.args.get('until'))
+        return jsonify({"data": data}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Get report 
 @app.route('/api/v1/chartapp/report/', methods=['GET'])
 def get_report_by_id_endpoint():
@@ -99,6 +256,8 @@ def get_report_by_id_endpoint():
     try:
         data = get_report_by_id(collection_id)
         return jsonify({"data": data}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -115,6 +274,7 @@ def get_all_reports_endpoint():
 
 # Upload files
 @app.route('/api/v1/chartapp/server', methods=['POST'])
+@profile_request("upload_files")
 def upload_files_endpoint():
     collection_name = request.form.get('collection_name')
     files = request.files.getlist('files')
@@ -123,12 +283,101 @@ def upload_files_endpoint():
     try:
         upload_files(collection_name, files)
         return jsonify({"msg": "Files uploaded successfully"}), 200
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except ArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Start a chunked upload
+@app.route('/api/v1/chartapp/server/upload', methods=['POST'])
+def initiate_upload_endpoint():
+    data = request.get_json(silent=True) or {}
+    if not data.get('filename') or 'size' not in data:
+        return jsonify({"error": "Missing required fields: 'filename' and/or 'size'"}), 400
+    try:
+        upload = initiate_upload(data.get('collection_name'), data['filename'], data['size'], data.get('sha256'))
+        return jsonify({"data": upload}), 201
+    except ArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Get chunked upload status, e.g. the offset to resume from
+@app.route('/api/v1/chartapp/server/upload/<upload_id>', methods=['GET'])
+def get_upload_status_endpoint(upload_id):
+    try:
+        return jsonify({"data": get_upload_status(upload_id)}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Upload one chunk: raw body at ?offset=N, with its SHA-256 in X-Chunk-Sha256
+@app.route('/api/v1/chartapp/server/upload/<upload_id>', methods=['PUT'])
+def upload_chunk_endpoint(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({"error": "Missing 'offset'"}), 400
+    if request.content_length is None:
+        return jsonify({"error": "Missing Content-Length"}), 411
+    try:
+        upload = upload_chunk(
+            upload_id, offset, request.stream, request.content_length, request.headers.get('X-Chunk-Sha256')
+        )
+        return jsonify({"data": upload}), 200
+    except UploadOffsetError as e:
+        return jsonify({"error": str(e), "offset": e.offset}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Complete a chunked upload and ingest the server file
+@app.route('/api/v1/chartapp/server/upload/<upload_id>/complete', methods=['POST'])
+@profile_request("complete_upload")
+def complete_upload_endpoint(upload_id):
+    try:
+        data = complete_upload(upload_id)
+        return jsonify({"msg": "File uploaded successfully", "data": data}), 200
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except ArchiveTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except UploadOffsetError as e:
+        return jsonify({"error": str(e), "offset": e.offset}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Cancel a chunked upload
+@app.route('/api/v1/chartapp/server/upload/<upload_id>', methods=['DELETE'])
+def cancel_upload_endpoint(upload_id):
+    try:
+        cancel_upload(upload_id)
+        return jsonify({"msg": "Upload cancelled"}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # Generate reports
 @app.route('/api/v1/chartapp/report/generate', methods=['POST'])
+@profile_request("generate_reports")
 def generate_reports_endpoint():
     try:
         # Extract request data
@@ -142,7 +391,8 @@ def generate_reports_endpoint():
             return jsonify({"error": "Invalid input types: 'collection_name' must be a string and 'cluster_names' must be a list"}), 400
 
         # Generate reports
-        reports_created, download_report_url = generate_reports(collection_name, cluster_names)
+        reports_created, bundle_name = generate_reports(collection_name, cluster_names)
+        download_report_url = url_for('download_zip', filename=bundle_name, _external=True)
 
         # Return success response
         return jsonify({
@@ -151,6 +401,9 @@ def generate_reports_endpoint():
             "download_url": download_report_url
         }), 200
 
+    except Overloaded as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+
     except Exception as e:
         # Log the exception for debugging purposes
         return jsonify({"error": str(e)}), 500
@@ -159,13 +412,25 @@ def generate_reports_endpoint():
 # Donwload All Report
 @app.route('/api/v1/chartapp/download/<filename>', methods=['GET'])
 def download_zip(filename):
-    if not is_safe_path(filename):
+    if not is_safe_path(filename) or not filename.endswith(".zip"):
         return jsonify({"error": "Invalid path"}), 400
+
+    # Optional subset of clusters, e.g. ?clusters=KP1EAAS,KP2EAAS
+    cluster_names = [name for name in request.args.get("clusters", "").split(",") if name]
+    if not all(is_safe_path(name) for name in cluster_names):
+        return jsonify({"error": "Invalid cluster name"}), 400
+
     try:
-        return send_from_directory(TEMP_DIR, filename, as_attachment=True)
+        report_files = list_report_files(filename[:-len(".zip")], cluster_names)
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
 
+    return Response(
+        stream_report_zip(report_files),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 
 # Donwload Report
 @app.route('/api/v1/chartapp/download/<collection>/<filename>', methods=['GET'])
@@ -174,15 +439,46 @@ def download_report(collection, filename):
         return jsonify({"error": "Invalid path"}), 400
 
     try:
-        directory = os.path.join(REPORTS_DIR, collection)
-        
-        return send_from_directory(directory, filename, as_attachment=True, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        key = get_report_key(collection, filename)
+        size = REPORT_STORAGE.stat(key)["size"]
+
+        # Single byte ranges are served from storage directly, so resumed downloads only fetch the rest
+        start, end, status = 0, size, 200
+        if request.range:
+            byte_range = request.range.range_for_length(size)
+            if byte_range is None:
+                return jsonify({"error": "Range not satisfiable"}), 416, {"Content-Range": f"bytes */{size}"}
+            (start, end), status = byte_range, 206
+
+        response = Response(
+            REPORT_STORAGE.iter_chunks(key, start, end),
+            status=status,
+            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            headers={"Content-Disposition": f"attachment; filename={filename}", "Accept-Ranges": "bytes"},
+        )
+        response.content_length = end - start
+        if status == 206:
+            response.headers["Content-Range"] = ContentRange("bytes", start, end, size).to_header()
+        return response
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Download Request Profile
+@app.route('/api/v1/chartapp/profile/<filename>', methods=['GET'])
+def download_profile(filename):
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    if not is_safe_path(filename):
+        return jsonify({"error": "Invalid path"}), 400
+    try:
+        return send_from_directory(PROFILES_DIR, filename, as_attachment=True)
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
+
+
 # Open Server File
 @app.route('/api/v1/chartapp/server/file/', methods=["GET"])
 def open_server_file_endpoint():
@@ -277,6 +573,33 @@ def open_chart_file_endpoint():
         logging.exception("An unexpected error occurred")
         return jsonify({"error": "Internal server error"}), 500
 
+# Startup report
+def report_startup(startup_seconds):
+    max_rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # ru_maxrss is in KiB on Linux
+    heavy_modules = [name for name in ("pandas", "numpy", "matplotlib", "docx") if name in sys.modules]
+    STARTUP_DURATION.set(startup_seconds)
+    STARTUP_RSS.set(max_rss_bytes)
+    logging.info(
+        f"App ready in {startup_seconds:.3f}s, max RSS {max_rss_bytes / 2**20:.1f} MiB, "
+        f"heavy modules loaded: {', '.join(heavy_modules) or 'none'}"
+    )
+
+
+# Import time, so the startup report is accurate however late the first request comes
+STARTUP_SECONDS = time.perf_counter() - STARTUP_STARTED
+_background_started = threading.Lock()
+
+
+# Background work of the serving process; importing the app (tests, tooling) starts nothing
+@app.before_request
+def start_background_services():
+    # flask run has no startup hook, so the first request starts them; acquire() only succeeds once
+    if _background_started.acquire(blocking=False):
+        report_startup(STARTUP_SECONDS)
+        start_reaper()
+
+
 # Main Entry Point
 if __name__ == '__main__':
+    start_background_services()
     app.run(debug=DEBUG_MODE, port=PORT)
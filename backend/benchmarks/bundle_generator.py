@@ -0,0 +1,116 @@
+"""
+Generates synthetic healthcheck bundles shaped like real uploads.
+
+Every bundle is named healthcheck_<date>_<RHxVAULTnn>.zip so that extract_cluster_name and
+extract_server_name resolve it, and contains the audit listing plus the metric files the
+pipeline aggregates.
+
+Usage:
+    python -m benchmarks.bundle_generator OUTPUT_DIR [--servers 6] [--clusters 2] ...
+"""
+import argparse
+import json
+import os
+import random
+import zipfile
+from datetime import date, timedelta
+
+# Server name prefixes understood by extract_cluster_name, one per cluster
+CLUSTER_PREFIXES = ["RH1VAULT", "RH2VAULT", "RH3VAULT", "RHC1VAULT", "RHC2VAULT", "RH3VAULTDR"]
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+ERROR_MESSAGES = [
+    "permission denied",
+    "1 error occurred:\n\t* permission denied\n\n",
+    "unsupported path",
+    "internal error",
+    "missing client token",
+    "invalid token",
+]
+
+
+def concatenated_objects(key, counts):
+    """Renders entries the way the healthcheck exports them: JSON objects back to back, not an array."""
+    return "\n".join(json.dumps({key: label, "Count": count}, indent=2) for label, count in counts.items())
+
+
+def audit_listing(rng, log_lines):
+    lines = [f"total {rng.randint(100, 10_000)}"]
+    for i in range(log_lines):
+        month = rng.choice(MONTHS)
+        day = rng.randint(1, 28)
+        stamp = f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}" if rng.random() < 0.7 else str(rng.randint(2019, 2024))
+        size = rng.randint(1_000, 50_000_000)
+        lines.append(f"-rw-r--r--. 1 vault vault {size:>8} {month} {day} {stamp} audit-{i}.log")
+    return "\n".join(lines) + "\n"
+
+
+def metric_counts(rng, labels, max_count):
+    return {label: rng.randint(1, max_count) for label in labels}
+
+
+def build_bundle(path, rng, log_lines, paths, errors, addresses):
+    requests = rng.randint(10_000, 1_000_000)
+    responses = int(requests * rng.uniform(0.85, 1.0))
+
+    path_labels = [f"secret/data/app-{i}/config" for i in range(paths)]
+    error_labels = [ERROR_MESSAGES[i % len(ERROR_MESSAGES)] + (f" #{i}" if i >= len(ERROR_MESSAGES) else "") for i in range(errors)]
+    address_labels = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(addresses)]
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("healthcheck/0_listing-audit-logs.json", audit_listing(rng, log_lines))
+        bundle.writestr("healthcheck/2_req-resp.json", concatenated_objects("Operation", {"request": requests, "response": responses}))
+        bundle.writestr("healthcheck/3_auth-resp.json", concatenated_objects("DisplayName", metric_counts(rng, ["token", "approle", "ldap-admin", "kubernetes"], 50_000)))
+        bundle.writestr("healthcheck/5_req-paths.json", concatenated_objects("Path", metric_counts(rng, path_labels, 100_000)))
+        bundle.writestr("healthcheck/6_error-count.json", concatenated_objects("Errors", metric_counts(rng, error_labels, 500)))
+        bundle.writestr("healthcheck/7_remote-addr-count.json", concatenated_objects("RemoteAddress", metric_counts(rng, address_labels, 20_000)))
+
+
+def generate_bundles(output_dir, servers=6, clusters=2, log_lines=500, paths=50, errors=10, addresses=200,
+                     bundle_date=None, seed=0):
+    """
+    Writes `servers` bundles spread round-robin over `clusters` clusters and returns their paths.
+    """
+    if not 1 <= clusters <= len(CLUSTER_PREFIXES):
+        raise ValueError(f"clusters must be between 1 and {len(CLUSTER_PREFIXES)}")
+
+    rng = random.Random(seed)
+    bundle_date = bundle_date or (date.today() - timedelta(days=1)).isoformat()
+    os.makedirs(output_dir, exist_ok=True)
+
+    bundle_paths = []
+    for index in range(servers):
+        prefix = CLUSTER_PREFIXES[index % clusters]
+        server_name = f"{prefix}{index // clusters + 1:02d}"
+        path = os.path.join(output_dir, f"healthcheck_{bundle_date}_{server_name}.zip")
+        build_bundle(path, rng, log_lines, paths, errors, addresses)
+        bundle_paths.append(path)
+    return bundle_paths
+
+
+def add_generator_arguments(parser):
+    parser.add_argument("--servers", type=int, default=6, help="Number of server bundles")
+    parser.add_argument("--clusters", type=int, default=2, help=f"Number of clusters (1-{len(CLUSTER_PREFIXES)})")
+    parser.add_argument("--log-lines", type=int, default=500, help="Audit log entries per server")
+    parser.add_argument("--paths", type=int, default=50, help="Distinct request paths per server")
+    parser.add_argument("--errors", type=int, default=10, help="Distinct errors per server")
+    parser.add_argument("--addresses", type=int, default=200, help="Distinct remote addresses per server")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for reproducible bundles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic healthcheck bundles.")
+    parser.add_argument("output_dir")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    bundle_paths = generate_bundles(
+        args.output_dir, args.servers, args.clusters, args.log_lines,
+        args.paths, args.errors, args.addresses, seed=args.seed,
+    )
+    print(f"Generated {len(bundle_paths)} bundles in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
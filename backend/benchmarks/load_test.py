@@ -0,0 +1,402 @@
+"""
+HTTP load test of the backend against a generated fixture dataset.
+
+Generates synthetic bundles, ingests them into a scratch BASE_DIR with the batch CLI, starts the
+app with `flask run` on a free local port and replays a weighted mix of requests from concurrent
+clients: collection listings, collection and cluster views, chart, summary and server file views,
+uploads and report generations. Prints latency percentiles, throughput and error rates per
+endpoint and writes the full results as JSON. Runs offline; only localhost is contacted.
+
+Usage (from the backend folder):
+    python -m benchmarks.load_test --concurrency 16 --duration 60 --output load.json
+    python -m benchmarks.load_test --mix list_collections=1 --concurrency 64    # listing storm
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime
+
+from benchmarks.bundle_generator import add_generator_arguments, generate_bundles
+from benchmarks.pipeline_benchmark import BACKEND_DIR, git_revision
+
+API_PREFIX = "/api/v1/chartapp"
+COLLECTION_NAME = "healthcheck_loadtest"
+# Relative weight of every scenario in the default traffic mix
+DEFAULT_MIX = {
+    "list_collections": 30,
+    "get_collection": 10,
+    "get_cluster": 10,
+    "chart_file": 20,
+    "summary_file": 5,
+    "server_file": 15,
+    "collection_health": 5,
+    "upload": 2,
+    "report": 1,
+}
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value):
+    """Parses "name=weight,name=weight"; unknown scenarios are rejected."""
+    mix = {}
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}', expected one of: {', '.join(DEFAULT_MIX)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid weight for '{name}': {weight}")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one scenario with a positive weight")
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fixture_environment(work_dir):
+    """Every data folder of the app inside the scratch directory, on top of the current environment."""
+    env = dict(os.environ)
+    for name in ("BASE_DIR", "REPORTS_DIR", "TEMP_DIR", "TRENDS_DIR", "BLOBS_DIR"):
+        env[name] = os.path.join(work_dir, name.lower())
+    env.setdefault("TEMPLATES_DIR", os.path.join(BACKEND_DIR, "__templates__"))
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def prepare_fixture(work_dir, env, args):
+    """
+    Generates and ingests the fixture collection unless the work directory already holds one,
+    so repeated runs with --work-dir replay against the same data. Returns the bundle paths.
+    """
+    bundle_dir = os.path.join(work_dir, "bundles")
+    if os.path.isdir(os.path.join(env["BASE_DIR"], COLLECTION_NAME)):
+        return sorted(os.path.join(bundle_dir, name) for name in os.listdir(bundle_dir))
+
+    bundle_paths = generate_bundles(
+        bundle_dir, args.servers, args.clusters, args.log_lines,
+        args.paths, args.errors, args.addresses, seed=args.seed,
+    )
+    subprocess.run(
+        [sys.executable, "cli.py", "--quiet", "ingest", bundle_dir, "--collection", COLLECTION_NAME],
+        cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    return bundle_paths
+
+
+def start_server(env, port, log_path):
+    """Starts the app the way the container does (flask run, threaded) and waits until it answers."""
+    log_file = open(log_path, "ab")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload", "--no-debugger"],
+        cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+    log_file.close()
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}, see {log_path}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"The server did not start within 60s, see {log_path}")
+
+
+def server_peak_rss_kb(process):
+    try:
+        with open(f"/proc/{process.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Client:
+    """Issues requests against the app; every call returns (status, response bytes)."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def request(self, method, path, params=None, body=None, headers=None):
+        url = f"{self.base_url}{API_PREFIX}{path}"
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+        req = urllib.request.Request(url, data=body, headers=headers or {}, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+    def get_json(self, path, params=None):
+        with urllib.request.urlopen(
+            f"{self.base_url}{API_PREFIX}{path}?{urllib.parse.urlencode(params or {})}", timeout=self.timeout
+        ) as response:
+            return json.load(response)["data"]
+
+    def post_json(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        return self.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+
+    def post_files(self, path, fields, file_path):
+        boundary = uuid.uuid4().hex
+        with open(file_path, "rb") as f:
+            content = f.read()
+        parts = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+            for name, value in fields.items()
+        ]
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{os.path.basename(file_path)}"\r\n'
+            f"Content-Type: application/zip\r\n\r\n".encode("utf-8") + content + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        return self.request("POST", path, body=b"".join(parts), headers=headers)
+
+
+def discover_targets(client):
+    """Reads the fixture back through the API, as the frontend would, to build realistic requests."""
+    collection = client.get_json("/collection/", {"collection_name": COLLECTION_NAME})
+    targets = {"clusters": [], "charts": [], "summaries": [], "server_files": []}
+    for cluster in collection["clusters"]:
+        cluster_name = cluster["cluster_name"]
+        targets["clusters"].append(cluster_name)
+        targets["charts"].extend((cluster_name, name) for name in cluster["charts"])
+        targets["summaries"].extend((cluster_name, name) for name in cluster["summaries"])
+        targets["server_files"].extend(
+            (cluster_name, server["server_name"], name) for server in cluster["servers"] for name in server["files"]
+        )
+    if not all(targets.values()):
+        raise RuntimeError(f"The fixture collection is incomplete: {targets}")
+    return targets
+
+
+def build_scenarios(client, targets, bundle_paths):
+    """Maps every scenario name to a callable taking a random generator and returning (status, bytes)."""
+    collection = {"collection_name": COLLECTION_NAME}
+
+    def file_params(rng, kind):
+        cluster_name, file_name = rng.choice(targets[kind])
+        return {**collection, "cluster_name": cluster_name, "file_name": file_name}
+
+    def server_file(rng):
+        cluster_name, server_name, file_name = rng.choice(targets["server_files"])
+        params = {**collection, "cluster_name": cluster_name, "server_name": server_name, "file_name": file_name}
+        return client.request("GET", "/server/file/", params)
+
+    return {
+        "list_collections": lambda rng: client.request("GET", "/collection"),
+        "get_collection": lambda rng: client.request("GET", "/collection/", collection),
+        "get_cluster": lambda rng: client.request(
+            "GET", "/cluster/", {**collection, "cluster_name": rng.choice(targets["clusters"])}
+        ),
+        "chart_file": lambda rng: client.request("GET", "/chart/file/", file_params(rng, "charts")),
+        "summary_file": lambda rng: client.request("GET", "/summary/file/", file_params(rng, "summaries")),
+        "server_file": server_file,
+        "collection_health": lambda rng: client.request("GET", "/collection/health", collection),
+        # Re-uploading a fixture bundle re-aggregates its cluster, contending with readers and reports
+        "upload": lambda rng: client.post_files("/server", collection, rng.choice(bundle_paths)),
+        "report": lambda rng: client.post_json(
+            "/report/generate", {**collection, "cluster_names": targets["clusters"]}
+        ),
+    }
+
+
+class Recorder:
+    """Collects one (latency, status, bytes) sample per request, per scenario. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, scenario, seconds, status, size):
+        with self._lock:
+            self.samples.setdefault(scenario, []).append((seconds, status, size))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run_load(scenarios, mix, concurrency, duration, max_requests, seed):
+    """
+    Runs `concurrency` client threads, each picking scenarios by weight, until `duration` seconds
+    passed or `max_requests` requests were sent in total. Returns (recorder, wall seconds).
+    """
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    sent = iter(range(max_requests)) if max_requests else None
+    sent_lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        while deadline is None or time.monotonic() < deadline:
+            if sent is not None:
+                with sent_lock:
+                    if next(sent, None) is None:
+                        return
+            scenario = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status, size = scenarios[scenario](rng)
+            except Exception as e:
+                status, size = type(e).__name__, 0
+            recorder.add(scenario, time.perf_counter() - started, status, size)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+def summarize(samples, wall_seconds):
+    """Latency percentiles (ms), throughput and error rate of one scenario's samples."""
+    latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(1 for _, status, _ in samples if not isinstance(status, int) or status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        **{f"p{pct}_ms": percentile(latencies, pct) for pct in PERCENTILES},
+        "max_ms": latencies[-1] if latencies else None,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "bytes": sum(size for _, _, size in samples),
+        "statuses": statuses,
+    }
+
+
+def format_table(endpoints, total):
+    header = f"{'Endpoint':<18} {'Reqs':>7} {'Err %':>6} {'Req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    lines = [header, "-" * len(header)]
+    for name, stats in [*endpoints.items(), ("total", total)]:
+        lines.append(
+            f"{name:<18} {stats['requests']:>7} {stats['error_rate'] * 100:>6.1f} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms'] or 0:>8.1f} {stats['p95_ms'] or 0:>8.1f} {stats['p99_ms'] or 0:>8.1f} {stats['max_ms'] or 0:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend HTTP API against a generated fixture.")
+    add_generator_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send traffic for (0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests in total (0: no limit)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"Scenario weights as name=weight,... (default: "
+                             f"{','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario before the run")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--work-dir", help="Scratch directory; an existing fixture in it is reused")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory after the run")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("--duration 0 needs --requests")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="healthcheck-load-")
+    os.makedirs(work_dir, exist_ok=True)
+    env = fixture_environment(work_dir)
+    port = free_port()
+    server = None
+    try:
+        bundle_paths = prepare_fixture(work_dir, env, args)
+        server = start_server(env, port, os.path.join(work_dir, "server.log"))
+        client = Client(f"http://127.0.0.1:{port}", args.timeout)
+        scenarios = build_scenarios(client, discover_targets(client), bundle_paths)
+
+        # Warm caches and lazily imported modules so the timed run measures steady state
+        warmup_rng = random.Random(args.seed)
+        for name, weight in args.mix.items():
+            if weight > 0:
+                for _ in range(args.warmup if name not in ("upload", "report") else 1):
+                    scenarios[name](warmup_rng)
+
+        recorder, wall_seconds = run_load(
+            scenarios, args.mix, args.concurrency, args.duration, args.requests, args.seed
+        )
+        peak_rss_kb = server_peak_rss_kb(server)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    endpoints = {name: summarize(samples, wall_seconds) for name, samples in sorted(recorder.samples.items())}
+    total = summarize([sample for samples in recorder.samples.values() for sample in samples], wall_seconds)
+    print(format_table(endpoints, total), file=sys.stderr)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": {
+            "servers": args.servers,
+            "clusters": args.clusters,
+            "log_lines": args.log_lines,
+            "paths": args.paths,
+            "errors": args.errors,
+            "addresses": args.addresses,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": args.mix,
+        },
+        "wall_seconds": wall_seconds,
+        "server_peak_rss_kb": peak_rss_kb,
+        "total": total,
+        "endpoints": endpoints,
+    }
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
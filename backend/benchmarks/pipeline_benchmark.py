@@ -0,0 +1,184 @@
+"""
+End-to-end benchmark of the ingest -> aggregate -> chart -> report pipeline.
+
+Generates synthetic bundles into a scratch directory, points every data folder (BASE_DIR,
+REPORTS_DIR, TEMP_DIR, TRENDS_DIR and BLOBS_DIR) at it, then times and memory-profiles each
+stage and writes the results as JSON so runs can be compared before and after a change.
+
+Usage (from the backend folder):
+    python -m benchmarks.pipeline_benchmark --servers 12 --clusters 3 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from benchmarks.bundle_generator import add_generator_arguments, generate_bundles
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StageRecorder:
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.track_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            peak = None
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            record = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "peak_bytes": 0})
+            record["calls"] += 1
+            record["seconds"] += elapsed
+            record["max_seconds"] = max(record["max_seconds"], elapsed)
+            if peak is not None:
+                record["peak_bytes"] = max(record["peak_bytes"], peak)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(work_dir):
+    """Points the application folders at the scratch directory. Must run before app modules are imported."""
+    for name in ("BASE_DIR", "REPORTS_DIR", "TEMP_DIR", "TRENDS_DIR", "BLOBS_DIR"):
+        os.environ[name] = os.path.join(work_dir, name.lower())
+    os.environ.setdefault("TEMPLATES_DIR", os.path.join(BACKEND_DIR, "__templates__"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def run_pipeline(bundle_paths, recorder, collection_name="healthcheck_benchmark"):
+    from app import app
+    from services.collection_services import get_cluster_by_id
+    from utils.cluster_handler import generate_charts_from_summary, get_server_log_dates, merge_and_save_json
+    from utils.file_handler import process_file
+    from utils.report_generator import list_report_files, process_cluster_report, stream_report_zip, wrap_report
+    from utils.upload_staging import StagedFile
+    from utils.utils import BASE_DIR, REPORTS_DIR, create_and_get_path, get_path, get_subdirectories
+
+    template_path = get_path(os.environ["TEMPLATES_DIR"], "cluster.docx")
+    create_and_get_path(BASE_DIR, collection_name)
+    create_and_get_path(REPORTS_DIR, collection_name)
+
+    bytes_in = 0
+    for bundle_path in bundle_paths:
+        bytes_in += os.path.getsize(bundle_path)
+        with recorder.stage("process_file"):
+            process_file(collection_name, StagedFile(bundle_path, os.path.basename(bundle_path)))
+
+    cluster_names = sorted(get_subdirectories(get_path(BASE_DIR, collection_name)))
+    json_files = [
+        ("2_req-resp.json", "Operation"),
+        ("3_auth-resp.json", "DisplayName"),
+        ("5_req-paths.json", "Path"),
+        ("6_error-count.json", "Errors"),
+        ("7_remote-addr-count.json", "RemoteAddress"),
+    ]
+    for cluster_name in cluster_names:
+        cluster_path = get_path(BASE_DIR, collection_name, cluster_name, "servers")
+        dates = [get_server_log_dates(collection_name, cluster_name, server) for server in get_subdirectories(cluster_path)]
+        subtitle = f"{min(d[0] for d in dates):%d %b %Y} ~ {max(d[1] for d in dates):%d %b %Y}"
+        summary_path = create_and_get_path(BASE_DIR, collection_name, cluster_name, "summaries")
+        chart_path = create_and_get_path(BASE_DIR, collection_name, cluster_name, "charts")
+
+        with recorder.stage("merge_and_save_json"):
+            merge_and_save_json(summary_path, cluster_path, json_files)
+        with recorder.stage("generate_charts_from_summary"):
+            generate_charts_from_summary(chart_path, summary_path, subtitle)
+
+    for cluster_name in cluster_names:
+        data = get_cluster_by_id(collection_name, cluster_name)
+        with recorder.stage("process_cluster_report"):
+            process_cluster_report(template_path, collection_name, cluster_name, data)
+
+    bytes_out = 0
+    with app.test_request_context():
+        with recorder.stage("wrap_report"):
+            wrap_report(collection_name)
+            for chunk in stream_report_zip(list_report_files(collection_name)):
+                bytes_out += len(chunk)
+
+    return {"clusters": len(cluster_names), "bytes_in": bytes_in, "zip_bytes": bytes_out}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the healthcheck pipeline end to end.")
+    add_generator_arguments(parser)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--work-dir", help="Scratch directory (default: a new temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory after the run")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc, for lower timing overhead")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="healthcheck-bench-")
+    configure_environment(work_dir)
+
+    try:
+        bundle_paths = generate_bundles(
+            os.path.join(work_dir, "bundles"), args.servers, args.clusters, args.log_lines,
+            args.paths, args.errors, args.addresses, seed=args.seed,
+        )
+        recorder = StageRecorder(track_memory=not args.no_memory)
+        started = time.perf_counter()
+        totals = run_pipeline(bundle_paths, recorder)
+        elapsed = time.perf_counter() - started
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "servers": args.servers,
+            "clusters": args.clusters,
+            "log_lines": args.log_lines,
+            "paths": args.paths,
+            "errors": args.errors,
+            "addresses": args.addresses,
+            "seed": args.seed,
+            "memory_tracking": not args.no_memory,
+        },
+        "total_seconds": elapsed,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        **totals,
+        "stages": recorder.stages,
+    }
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Headless batch runner: ingests a directory of healthcheck ZIPs and builds the DOCX reports
+without the HTTP API. Work is spread over a process pool, one archive, cluster or cluster report
+per task; a failed item is reported and the rest of the batch carries on.
+
+Usage:
+    python cli.py [--workers N] [--quiet] ingest /path/to/zips [--collection NAME] [--report]
+    python cli.py [--workers N] [--quiet] report COLLECTION [--clusters KP1EAAS KP2EAAS]
+    python cli.py [--quiet] reap
+
+--workers and --quiet belong to the top-level parser and go before the command.
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from services.collection_services import get_directory_contents
+from services.file_services import select_clusters_to_aggregate
+from services.report_services import generate_reports
+from utils.cluster_handler import process_clusters
+from utils.file_handler import process_file
+from utils.reaper import run_reaper
+from utils.upload_staging import StagedFile
+from utils.utils import BASE_DIR, create_and_get_path, generate_collection_name, get_path
+
+
+class Progress:
+    """Prints one line per finished item and keeps the numbers for the final summary."""
+
+    def __init__(self):
+        self.phases = {}
+        self.failures = []
+
+    def start(self, phase, total):
+        self.phases[phase] = {"total": total, "done": 0, "failed": 0, "work": 0.0, "started": time.perf_counter()}
+
+    def finish_item(self, phase, label, seconds, outcome=None, error=None):
+        stats = self.phases[phase]
+        stats["done"] += 1
+        stats["work"] += seconds
+        if error is not None:
+            stats["failed"] += 1
+            self.failures.append((phase, label, error))
+            outcome = f"FAILED: {error}"
+        width = len(str(stats["total"]))
+        print(f"[{phase} {stats['done']:>{width}}/{stats['total']}] {label}: {outcome} ({seconds:.1f}s)", flush=True)
+
+    def end(self, phase):
+        self.phases[phase]["wall"] = time.perf_counter() - self.phases[phase]["started"]
+
+    def summary(self, total_seconds):
+        lines = ["", f"{'Phase':<10} {'Items':>6} {'Failed':>7} {'Wall (s)':>9} {'Work (s)':>9}"]
+        for phase, stats in self.phases.items():
+            lines.append(
+                f"{phase:<10} {stats['total']:>6} {stats['failed']:>7} {stats.get('wall', 0):>9.2f} {stats['work']:>9.2f}"
+            )
+        lines.append(f"Total wall time: {total_seconds:.2f}s")
+        if self.failures:
+            lines.append("Failures:")
+            lines.extend(f"  {phase} {label}: {error}" for phase, label, error in self.failures)
+        return "\n".join(lines)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    return function(*args), time.perf_counter() - started
+
+
+def ingest_archive(collection_name, archive_path):
+    """Worker task: runs one archive through process_file, exactly like an HTTP upload."""
+    return timed(process_file, collection_name, StagedFile(archive_path, os.path.basename(archive_path)))
+
+
+def aggregate_cluster(collection_name, cluster_name):
+    """Worker task: merges summaries and renders the charts of one cluster."""
+    (errors, _), seconds = timed(process_clusters, collection_name, [cluster_name])
+    if errors:
+        raise RuntimeError(errors[0])
+    return seconds
+
+
+def list_archives(sources):
+    archives = []
+    for source in sources:
+        if os.path.isdir(source):
+            archives.extend(sorted(glob.glob(get_path(source, "*.zip"))))
+        else:
+            archives.append(source)
+    return archives
+
+
+def run_ingest(executor, progress, collection_name, archives):
+    progress.start("ingest", len(archives))
+    futures = {executor.submit(ingest_archive, collection_name, path): path for path in archives}
+    outcomes = []
+    for future in as_completed(futures):
+        label = os.path.basename(futures[future])
+        try:
+            (cluster_name, status), seconds = future.result()
+            outcomes.append((cluster_name, status))
+            progress.finish_item("ingest", label, seconds, f"{cluster_name} {status}")
+        except Exception as e:
+            progress.finish_item("ingest", label, 0.0, error=str(e))
+    progress.end("ingest")
+    return outcomes
+
+
+def run_aggregate(executor, progress, collection_name, outcomes):
+    try:
+        cluster_names = select_clusters_to_aggregate(collection_name, outcomes)
+    except FileNotFoundError:
+        cluster_names = []
+
+    progress.start("aggregate", len(cluster_names))
+    futures = {executor.submit(aggregate_cluster, collection_name, name): name for name in cluster_names}
+    aggregated = []
+    for future in as_completed(futures):
+        try:
+            seconds = future.result()
+            aggregated.append(futures[future])
+            progress.finish_item("aggregate", futures[future], seconds, "charts rendered")
+        except Exception as e:
+            progress.finish_item("aggregate", futures[future], 0.0, error=str(e))
+    progress.end("aggregate")
+    return aggregated
+
+
+def run_report(executor, progress, collection_name, cluster_names):
+    progress.start("report", 1)
+    started = time.perf_counter()
+    try:
+        reports_created, _ = generate_reports(collection_name, sorted(cluster_names), executor)
+        progress.finish_item(
+            "report", collection_name, time.perf_counter() - started, f"{len(reports_created)} cluster report(s)"
+        )
+    except Exception as e:
+        progress.finish_item("report", collection_name, time.perf_counter() - started, error=str(e))
+    progress.end("report")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest healthcheck archives and build reports without the web app.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--quiet", action="store_true", help="Only log warnings and errors")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Ingest ZIP archives into a collection")
+    ingest.add_argument("sources", nargs="+", help="Directories of ZIP archives, or ZIP files")
+    ingest.add_argument("--collection", help="Collection name (default: a new generated name)")
+    ingest.add_argument("--report", action="store_true", help="Also build the reports of the ingested clusters")
+
+    report = commands.add_parser("report", help="Build the reports of a collection")
+    report.add_argument("collection")
+    report.add_argument("--clusters", nargs="+", help="Clusters to report on (default: all)")
+
+    commands.add_parser("reap", help="Apply the retention policies and empty the trash now")
+
+    args = parser.parse_args()
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.command == "reap":
+        removed = run_reaper()
+        print("Another process is reaping, try again later" if removed is None else f"Removed: {removed}")
+        return 0 if removed is not None else 1
+
+    progress = Progress()
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.command == "ingest":
+            archives = list_archives(args.sources)
+            if not archives:
+                parser.error("no ZIP archives found")
+            collection_name = args.collection or generate_collection_name()
+            create_and_get_path(BASE_DIR, collection_name)
+            print(f"Ingesting {len(archives)} archive(s) into '{collection_name}' with {args.workers} worker(s)")
+
+            outcomes = run_ingest(executor, progress, collection_name, archives)
+            aggregated = run_aggregate(executor, progress, collection_name, outcomes)
+            if args.report:
+                cluster_names = {cluster_name for cluster_name, _ in outcomes} | set(aggregated)
+                run_report(executor, progress, collection_name, cluster_names)
+        else:
+            cluster_names = args.clusters or get_directory_contents(get_path(BASE_DIR, args.collection), True)
+            run_report(executor, progress, args.collection, cluster_names)
+
+    print(progress.summary(time.perf_counter() - started))
+    return 1 if progress.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
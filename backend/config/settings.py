@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-
 # Chart settings
 CHART_CONFIG = {
     "2_req-resp": {
@@ -20,6 +18,9 @@ CHART_CONFIG = {
         "chart_type": "bar",
         "sort_desc": True,
         "bar_color": "#46bdc6",
+        # High-cardinality metric: keep at most `capacity` keys while merging (see utils.sketches) and
+        # write the `top_k` largest to the summary; the chart grows by 0.8 inch per entry
+        "aggregation": {"mode": "approximate", "capacity": 10000, "top_k": 50},
     },
     "6_error-count": {
         "title": "Error Count",
@@ -32,11 +33,53 @@ CHART_CONFIG = {
         "chart_type": "bar",
         "sort_desc": False,
         "bar_color": "#46bdc6",
+        "aggregation": {"mode": "approximate", "capacity": 10000, "top_k": 50},
     },
     # Add other chart configurations as needed
 }
-# Matplotlib settings
-plt.rcParams["axes.titlesize"] = 14
-plt.rcParams["axes.labelsize"] = 12
-plt.rcParams["xtick.labelsize"] = 10
-plt.rcParams["ytick.labelsize"] = 10
+
+# Metrics without an "aggregation" entry are merged exactly
+DEFAULT_AGGREGATION = {"mode": "exact"}
+# Matplotlib settings, applied by utils.chart_generator so that importing the config stays cheap
+MATPLOTLIB_RC = {
+    "axes.titlesize": 14,
+    "axes.labelsize": 12,
+    "xtick.labelsize": 10,
+    "ytick.labelsize": 10,
+}
+
+# Health metrics: the values health rules are computed from, each summed per cluster over the "Count"
+# of a summary file's entries, optionally only the entries whose `key` equals `match`
+HEALTH_METRICS = {
+    "requests": {"summary": "2_req-resp.json", "key": "Operation", "match": "request"},
+    "responses": {"summary": "2_req-resp.json", "key": "Operation", "match": "response"},
+    "errors": {"summary": "6_error-count.json", "key": "Errors"},
+}
+# Health rules, evaluated by utils.health for every cluster. A rule is a "Warning" when its check value
+# is above `above`, or when its metrics are unavailable (summary missing or empty) or, for
+# "percent_difference", all zero. `slot` N fills the [warning_N] / [message_N] report placeholders.
+# `depends_on` reports the rule as a bare "Warning" when the rule it depends on could not be evaluated,
+# and `top_label_of` only fires when the metric has a labelled entry, available to the message as {top_label}.
+HEALTH_RULES = [
+    {
+        "id": "request_response_balance",
+        "description": "Requests and responses should be within 10% of each other",
+        "slot": 1,
+        "check": {"type": "percent_difference", "metrics": ["requests", "responses"]},
+        "above": 10,
+        "message": "The percentage difference between Request and Response exceeds 10%.",
+        "unavailable_message": "Failed to retrieve request/response data.",
+        "empty_message": "No Request or Response data available.",
+    },
+    {
+        "id": "error_volume",
+        "description": "At most 10 errors should be logged",
+        "slot": 2,
+        "check": {"type": "total", "metrics": ["errors"]},
+        "above": 10,
+        "top_label_of": "errors",
+        "depends_on": "request_response_balance",
+        "message": "Most frequent error: '{top_label}'.",
+        "unavailable_message": "Failed to retrieve data from 6_error-count.json.",
+    },
+]
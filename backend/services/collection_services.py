@@ -1,19 +1,35 @@
 import os
-import shutil
-from flask import abort
-from utils.utils import BASE_DIR, REPORTS_DIR, TEMP_DIR
+from utils.locking import cluster_lock, cluster_locks
+from utils.manifest import read_manifest_if_present
+from utils.rollup import load_rollup, rebuild_collection_rollup, remove_cluster_rollup
+from utils.storage import REPORT_STORAGE
+from utils.trash import move_to_trash
+from utils.trend_store import remove_collection_trends
+from utils.utils import BASE_DIR, TEMP_DIR, is_valid_name
 
 def get_directory_contents(path, subdirs_only=False):
     if not os.path.exists(path):
         return []
     return [
         name for name in os.listdir(path)
-        if not subdirs_only or os.path.isdir(os.path.join(path, name))
+        if not name.startswith(".")
+        and (not subdirs_only or os.path.isdir(os.path.join(path, name)))
     ]
 
 def validate_path_exists(path, error_message):
     if not os.path.isdir(path):
-        abort(404, description=error_message)
+        raise FileNotFoundError(error_message)
+
+def get_server_stats(server_path):
+    manifest = read_manifest_if_present(server_path)
+    if not manifest:
+        return None
+    return {
+        "earliest_date": manifest.get("earliest_date"),
+        "latest_date": manifest.get("latest_date"),
+        "entry_count": manifest.get("entry_count"),
+        "total_size": manifest.get("total_size"),
+    }
 
 def get_cluster_data(cluster_path):
     return {
@@ -21,9 +37,11 @@ def get_cluster_data(cluster_path):
         "servers": [
             {
                 "server_name": server_name,
-                "files": get_directory_contents(os.path.join(cluster_path, "servers", server_name))
+                "files": get_directory_contents(server_path),
+                "stats": get_server_stats(server_path)
             }
             for server_name in get_directory_contents(os.path.join(cluster_path, "servers"), subdirs_only=True)
+            if (server_path := os.path.join(cluster_path, "servers", server_name))
         ],
         "summaries": get_directory_contents(os.path.join(cluster_path, "summaries"))
     }
@@ -66,36 +84,54 @@ def get_cluster_by_id(collection_name, cluster_name):
         **get_cluster_data(cluster_path)
     }
 
-def delete_directory(path):
-    if os.path.exists(path):
-        shutil.rmtree(path)
+def get_collection_rollup(collection_id):
+    if not is_valid_name(collection_id):
+        raise ValueError("Invalid collection name")
+    collection_path = os.path.join(BASE_DIR, collection_id)
+    validate_path_exists(collection_path, "Collection not found")
+    return load_rollup(collection_id) or rebuild_collection_rollup(collection_id)
 
 def delete_file(path):
     if os.path.exists(path):
         os.remove(path)
 
 def delete_collection(collection_id):
-    delete_directory(os.path.join(BASE_DIR, collection_id))
-    delete_directory(os.path.join(REPORTS_DIR, collection_id))
+    collection_path = os.path.join(BASE_DIR, collection_id)
+    # Renamed into the trash under the locks; utils.reaper frees the space in the background
+    with cluster_locks(collection_id, get_directory_contents(collection_path, subdirs_only=True)):
+        move_to_trash(collection_path, BASE_DIR)
+    REPORT_STORAGE.delete_prefix(collection_id)
     delete_file(os.path.join(TEMP_DIR, f"{collection_id}.zip"))
+    remove_collection_trends(collection_id)
 
 def delete_cluster(collection_id, cluster_id):
-    delete_directory(os.path.join(BASE_DIR, collection_id, cluster_id))
+    with cluster_lock(collection_id, cluster_id):
+        move_to_trash(os.path.join(BASE_DIR, collection_id, cluster_id), BASE_DIR)
+    remove_collection_trends(collection_id, [cluster_id])
+    remove_cluster_rollup(collection_id, cluster_id)
+
+def get_report_files(collection_name):
+    return [
+        file_name
+        for batch in REPORT_STORAGE.list(collection_name)
+        for item in batch
+        if "/" not in (file_name := item["key"][len(collection_name) + 1:]) and not file_name.startswith(".")
+    ]
 
 def get_reports():
     return [
         {
             "collection_name": collection_name,
-            "report_files": get_directory_contents(collection_path, subdirs_only=False)
+            "report_files": get_report_files(collection_name)
         }
-        for collection_name in get_directory_contents(REPORTS_DIR, subdirs_only=True)
-        if (collection_path := os.path.join(REPORTS_DIR, collection_name))
+        for collection_name in REPORT_STORAGE.list_prefixes()
+        if not collection_name.startswith(".")
     ]
 
 def get_report_by_id(collection_name):
-    collection_path = os.path.join(REPORTS_DIR, collection_name)
-    validate_path_exists(collection_path, "Report collection not found")
+    if not REPORT_STORAGE.exists_prefix(collection_name):
+        raise FileNotFoundError("Report collection not found")
     return {
         "collection_name": collection_name,
-        "report_files": get_directory_contents(collection_path, subdirs_only=False)
+        "report_files": get_report_files(collection_name)
     }
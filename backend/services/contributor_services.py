@@ -0,0 +1,31 @@
+from utils.contributor_index import INDEXED_SUMMARIES, MATCH_MODES, load_index, query_contributors
+from utils.utils import is_valid_name
+
+MAX_LIMIT = 1000
+
+
+def get_contributors(collection_name, cluster_name, file_name, query, match="exact", limit=50):
+    """Which servers of a cluster contributed to the summary keys matching `query`, highest count first."""
+    if not is_valid_name(collection_name) or not is_valid_name(cluster_name):
+        raise ValueError("Invalid collection or cluster name")
+    if file_name not in INDEXED_SUMMARIES:
+        raise ValueError(f"Unsupported summary file, expected one of: {', '.join(INDEXED_SUMMARIES)}")
+    if match not in MATCH_MODES:
+        raise ValueError(f"Unsupported match mode, expected one of: {', '.join(MATCH_MODES)}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}")
+
+    index = load_index(collection_name, cluster_name, file_name)
+    matches, total_matches = query_contributors(index, query, match, limit)
+    return {
+        "collection_name": collection_name,
+        "cluster_name": cluster_name,
+        "file_name": file_name,
+        "key_field": index["key"],
+        "query": query,
+        "match": match,
+        "total_matches": total_matches,
+        # False when the index only holds the keys with the highest totals, see utils.contributor_index
+        "index_complete": index.get("complete", True),
+        "matches": matches,
+    }
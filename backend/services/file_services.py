@@ -3,7 +3,10 @@ import logging
 from dotenv import load_dotenv
 from utils.cluster_handler import process_clusters
 from utils.file_handler import process_file
-from utils.utils import BASE_DIR, REPORTS_DIR, create_and_get_path, generate_collection_name, get_subdirectories
+from utils.governor import GOVERNOR
+from utils.metrics import JOBS_IN_FLIGHT
+from utils.tracing import span
+from utils.utils import BASE_DIR, create_and_get_path, generate_collection_name, get_path, get_subdirectories
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -21,28 +24,56 @@ def upload_files(collection_name, files):
     collection_name = collection_name or generate_collection_name()
 
     try:
-        # Use BASE_DIR and REPORTS_DIR from environment variables
-        clusters_path = create_and_get_path(BASE_DIR, collection_name)
-        reports_path = create_and_get_path(REPORTS_DIR, collection_name)
+        # Use BASE_DIR from environment variables; reports are written through utils.storage
+        create_and_get_path(BASE_DIR, collection_name)
 
         # Process each file
-        for file in files:
-            process_file(collection_name, file)
+        with GOVERNOR.admit("ingest"), span("ingest.upload", collection=collection_name, files=len(files)), \
+                JOBS_IN_FLIGHT.track_inprogress(job="ingest"):
+            outcomes = [process_file(collection_name, file) for file in files]
+            # Aggregated within the admitted job, so waiting for an aggregation slot is bounded by the ingest limit
+            aggregate_changed_clusters(collection_name, outcomes)
 
-        # Validate cluster directories
-        cluster_folders = get_subdirectories(clusters_path)
-        if not cluster_folders:
-            logging.error("No cluster folders found.")
-            raise FileNotFoundError("No cluster folders found.")
+    except Exception as e:
+        logging.exception("An unexpected error occurred.")
+        raise e
 
-        # Process clusters
-        errors, results = process_clusters(collection_name, cluster_folders)
 
-        logging.info(f"Processing completed. Success: {len(results)}, Errors: {len(errors)}")
+def select_clusters_to_aggregate(collection_name, outcomes):
+    """Picks the clusters touched by the (cluster_name, status) outcomes of process_file, or never aggregated."""
+    clusters_path = get_path(BASE_DIR, collection_name)
 
-        if errors:
-            logging.warning(f"Some clusters failed to process: {errors}")
+    # Validate cluster directories
+    cluster_folders = get_subdirectories(clusters_path)
+    if not cluster_folders:
+        logging.error("No cluster folders found.")
+        raise FileNotFoundError("No cluster folders found.")
 
-    except Exception as e:
-        logging.exception("An unexpected error occurred.")
-        raise e
+    # Only re-aggregate clusters whose servers changed, or that were never aggregated
+    changed_clusters = {cluster_name for cluster_name, status in outcomes if status != "unchanged"}
+    return [
+        cluster_name for cluster_name in cluster_folders
+        if cluster_name in changed_clusters
+        or not os.path.isdir(get_path(clusters_path, cluster_name, "summaries"))
+    ]
+
+
+def aggregate_changed_clusters(collection_name, outcomes):
+    """
+    Re-aggregates the clusters touched by the (cluster_name, status) outcomes of process_file
+    and returns the errors of the clusters that failed.
+    """
+    cluster_folders = select_clusters_to_aggregate(collection_name, outcomes)
+    if not cluster_folders:
+        logging.info("No changes detected, skipping cluster processing.")
+        return []
+
+    # Process clusters
+    with span("aggregate.clusters", collection=collection_name, clusters=len(cluster_folders)):
+        errors, results = process_clusters(collection_name, cluster_folders)
+
+    logging.info(f"Processing completed. Success: {len(results)}, Errors: {len(errors)}")
+
+    if errors:
+        logging.warning(f"Some clusters failed to process: {errors}")
+    return errors
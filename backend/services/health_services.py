@@ -0,0 +1,49 @@
+import os
+
+from utils.health import HEALTH_RULES, OK, WARNING, evaluate_health, overall_state
+from utils.utils import BASE_DIR, get_path, get_subdirectories, is_valid_name
+
+
+def get_collection_health(collection_name, cluster_names=None):
+    """
+    Health rule results of the given clusters of a collection, by default every cluster with
+    summaries. All clusters are evaluated together in one pass (see utils.health).
+    """
+    if not is_valid_name(collection_name):
+        raise ValueError("Invalid collection name")
+    collection_path = get_path(BASE_DIR, collection_name)
+    if not os.path.isdir(collection_path):
+        raise FileNotFoundError("Collection not found")
+
+    if cluster_names:
+        invalid = [name for name in cluster_names if not is_valid_name(name)]
+        if invalid:
+            raise ValueError(f"Invalid cluster names: {', '.join(invalid)}")
+        missing = [name for name in cluster_names if not os.path.isdir(get_path(collection_path, name))]
+        if missing:
+            raise FileNotFoundError(f"Clusters not found: {', '.join(missing)}")
+    else:
+        cluster_names = [
+            name for name in get_subdirectories(collection_path)
+            if os.path.isdir(get_path(collection_path, name, "summaries"))
+        ]
+
+    results = evaluate_health(collection_name, cluster_names)
+    clusters = {
+        cluster_name: {
+            "state": overall_state(result),
+            "rules": {
+                rule_id: {"state": rule["state"], "message": rule["message"], "value": rule["value"]}
+                for rule_id, rule in result.items()
+            },
+        }
+        for cluster_name, result in results.items()
+    }
+    warnings = sum(1 for cluster in clusters.values() if cluster["state"] != OK)
+    return {
+        "collection_name": collection_name,
+        "state": WARNING if warnings else OK,
+        "rules": [{"id": rule["id"], "description": rule.get("description", "")} for rule in HEALTH_RULES],
+        "clusters": clusters,
+        "counts": {"clusters": len(clusters), "warnings": warnings},
+    }
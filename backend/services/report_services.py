@@ -1,13 +1,26 @@
 import logging
 import os
+from itertools import repeat
 from dotenv import load_dotenv
 from services.collection_services import get_cluster_by_id
 from utils.report_generator import (
+    compute_cluster_fingerprint,
+    compute_fingerprint,
     generate_summary_report,
+    get_report_key,
+    is_report_current,
+    load_report_fingerprints,
     process_cluster_report,
+    save_report_fingerprints,
     update_summary_placeholders,
     wrap_report
 )
+from utils.governor import GOVERNOR
+from utils.health import evaluate_health
+from utils.locking import cluster_locks, file_lock
+from utils.metrics import JOBS_IN_FLIGHT
+from utils.storage import REPORT_STORAGE
+from utils.tracing import span
 from utils.utils import get_path
 
 # Load environment variables
@@ -23,7 +36,50 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def generate_reports(collection_name, cluster_names):
+def generate_reports(collection_name, cluster_names, executor=None):
+    """
+    Builds the cluster and summary reports and returns (report locations, bundle file name).
+    With an `executor` (e.g. a ProcessPoolExecutor), cluster reports are built in parallel.
+    """
+    with GOVERNOR.admit("report"), span("report.generate", collection=collection_name, clusters=len(cluster_names)), \
+            JOBS_IN_FLIGHT.track_inprogress(job="report"):
+        # One build per collection at a time (they share the fingerprint file), and no aggregation
+        # of the selected clusters while their reports are read from a consistent snapshot
+        with file_lock(f"reports.{collection_name}"), cluster_locks(collection_name, cluster_names, shared=True):
+            return build_reports(collection_name, cluster_names, executor)
+
+
+def prepare_cluster_report(template_path, collection_name, cluster_name, record, health=None):
+    """
+    Builds one cluster report unless the stored `record` still matches its inputs.
+    `health` is the cluster's result from utils.health.evaluate_health, if already known.
+    Returns the record to keep, or None when the cluster has no data.
+    """
+    # Fetch cluster data
+    response_data = get_cluster_by_id(collection_name, cluster_name)
+
+    if not response_data:
+        logging.warning(f"No data found for cluster '{cluster_name}' in collection '{collection_name}'.")
+        return None
+
+    # Skip clusters whose inputs have not changed since the last build
+    fingerprint = compute_cluster_fingerprint(template_path, collection_name, cluster_name, response_data)
+    if is_report_current(record, fingerprint):
+        logging.info(f"Report for cluster '{cluster_name}' is up to date, skipping.")
+        return record
+
+    # Process document
+    output_key, placeholders = process_cluster_report(
+        template_path, collection_name, cluster_name, response_data, health
+    )
+    return {
+        "fingerprint": fingerprint,
+        "output_key": output_key,
+        "placeholders": placeholders,
+    }
+
+
+def build_reports(collection_name, cluster_names, executor=None):
     try:
         # Validate template paths
         template_path = get_path(TEMPLATES_DIR, 'cluster.docx')
@@ -41,33 +97,54 @@ def generate_reports(collection_name, cluster_names):
         reports_created = []
         summary_placeholders = {}
         summary_warning_counts = {}
+        fingerprints = load_report_fingerprints(collection_name)
+        cluster_fingerprints = fingerprints.setdefault("clusters", {})
 
-        # Iterate through clusters
-        for cluster_index, cluster_name in enumerate(cluster_names, start=1):
-            # Fetch cluster data
-            response_data = get_cluster_by_id(collection_name, cluster_name)
+        # Evaluate the health rules of all clusters in one pass, workers only fill in the results
+        health = evaluate_health(collection_name, cluster_names)
 
-            if not response_data:
-                logging.warning(f"No data found for cluster '{cluster_name}' in collection '{collection_name}'.")
-                continue
+        # Build the cluster reports, in parallel when an executor is given
+        records = (executor.map if executor else map)(
+            prepare_cluster_report,
+            repeat(template_path),
+            repeat(collection_name),
+            cluster_names,
+            [cluster_fingerprints.get(cluster_name) for cluster_name in cluster_names],
+            [health.get(cluster_name) for cluster_name in cluster_names],
+        )
 
-            # Process document
-            output_path, placeholders = process_cluster_report(
-                template_path, collection_name, cluster_name, response_data
-            )
-            reports_created.append(output_path)
+        # Iterate through clusters
+        for cluster_index, (cluster_name, record) in enumerate(zip(cluster_names, records), start=1):
+            if record is None:
+                continue
+            cluster_fingerprints[cluster_name] = record
+            reports_created.append(REPORT_STORAGE.locate(record["output_key"]))
 
             # Update summary placeholders
-            update_summary_placeholders(summary_placeholders, summary_warning_counts, cluster_index, placeholders)
+            update_summary_placeholders(summary_placeholders, summary_warning_counts, cluster_index, record["placeholders"])
+
+        # Generate summary report only when its content would change
+        summary_fingerprint = compute_fingerprint(
+            [summary_template_path],
+            extra={"placeholders": summary_placeholders, "warning_counts": summary_warning_counts},
+        )
+        summary_record = {
+            "fingerprint": summary_fingerprint,
+            "output_key": get_report_key(collection_name, "Summary_Report.docx"),
+        }
+        if is_report_current(fingerprints.get("summary"), summary_fingerprint):
+            logging.info("Summary report is up to date, skipping.")
+        else:
+            generate_summary_report(summary_template_path, collection_name, summary_placeholders, summary_warning_counts)
+            fingerprints["summary"] = summary_record
+
+        save_report_fingerprints(collection_name, fingerprints)
 
-        # Generate summary report
-        generate_summary_report(summary_template_path, collection_name, summary_placeholders, summary_warning_counts)
+        # After all reports are created, name the ZIP bundle they are downloaded as
+        bundle_name = wrap_report(collection_name)
 
-        # After all reports are created, generate the ZIP file and return the download URL
-        download_report_url = wrap_report(collection_name)
-        
         logging.info("Reports created successfully and ready to download.")
-        return reports_created, download_report_url
+        return reports_created, bundle_name
 
     except FileNotFoundError as fnfe:
         logging.error(f"File error: {str(fnfe)}")
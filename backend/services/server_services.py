@@ -2,29 +2,16 @@ import json
 import os
 
 from flask import jsonify, send_file
-from utils.utils import BASE_DIR
+from utils.repository import get_collection_file_path, load_json_file
 
 
 def open_file(collection_name, cluster_name, file_name, file_type="generic", server_name=None):
     try:
-        # Validate query parameters
-        if not all([collection_name, cluster_name, file_name]):
-            return jsonify({"error": "Missing required parameters."}), 400
-
-        # Determine subdirectory based on file type
-        subdirectory_map = {
-            "chart": "charts",
-            "summary": "summaries",
-            "server": f"servers/{server_name}" if server_name else None,
-            "generic": ""
-        }
-
-        subdirectory = subdirectory_map.get(file_type)
-        if subdirectory is None:
-            return jsonify({"error": f"Unsupported file type: {file_type}"}), 400
-
-        # Construct the file path
-        file_path = os.path.join(BASE_DIR, collection_name, cluster_name, subdirectory, file_name)
+        # Validate query parameters and resolve the file path
+        try:
+            file_path = get_collection_file_path(collection_name, cluster_name, file_name, file_type, server_name)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Check if the file exists
         if not os.path.isfile(file_path):
@@ -34,9 +21,7 @@ def open_file(collection_name, cluster_name, file_name, file_type="generic", ser
         file_extension = os.path.splitext(file_name)[1].lower()
         if file_extension == '.json':
             # Handle JSON file
-            with open(file_path, 'r') as file:
-                file_content = json.load(file)
-            return jsonify(file_content), 200
+            return jsonify(load_json_file(file_path)), 200
         elif file_extension in ['.png', '.jpg', '.jpeg']:
             # Handle image file
             return send_file(file_path, mimetype=f"image/{file_extension.strip('.')}"), 200
@@ -0,0 +1,23 @@
+from utils.trend_store import NUMERIC_COLUMNS, list_trend_clusters, query_trend
+from utils.utils import is_valid_name, validate_date_format
+
+
+def get_trend_clusters():
+    return list_trend_clusters()
+
+
+def get_cluster_trend(cluster_name, metrics=None, since=None, until=None):
+    if not is_valid_name(cluster_name):
+        raise ValueError("Invalid cluster name")
+
+    since_date = validate_date_format(since) if since else None
+    until_date = validate_date_format(until) if until else None
+    if (since and not since_date) or (until and not until_date):
+        raise ValueError("Dates must use the YYYY-MM-DD format")
+    if until_date:
+        until_date = until_date.replace(hour=23, minute=59, second=59)
+
+    series = query_trend(cluster_name, metrics or NUMERIC_COLUMNS, since_date, until_date)
+    if series is None:
+        raise FileNotFoundError(f"No trend data for cluster '{cluster_name}'")
+    return {"cluster_name": cluster_name, **series}
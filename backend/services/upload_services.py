@@ -0,0 +1,86 @@
+import os
+import logging
+import re
+from dotenv import load_dotenv
+from services.file_services import aggregate_changed_clusters
+from utils.file_handler import process_file
+from utils.governor import GOVERNOR, MAX_EXTRACTED_BYTES, ArchiveTooLarge
+from utils.metrics import JOBS_IN_FLIGHT
+from utils.tracing import span
+from utils.upload_staging import create_upload, finalize_upload, get_upload, remove_upload, write_chunk
+from utils.utils import (
+    extract_cluster_name,
+    extract_server_name,
+    generate_collection_name,
+    is_valid_name
+)
+
+# Load environment variables from a .env file
+load_dotenv()
+
+# Configure logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s - %(levelname)s - %(message)s")
+
+SHA256_PATTERN = re.compile(r"[0-9a-fA-F]{64}")
+
+
+def initiate_upload(collection_name, filename, size, sha256=None):
+    """Validates the archive name up front, so a bad file is rejected before any byte is sent."""
+    collection_name = collection_name or generate_collection_name()
+    if not is_valid_name(collection_name):
+        raise ValueError("Invalid collection name")
+    if not isinstance(filename, str) or not filename.lower().endswith(".zip"):
+        raise ValueError("File must be a ZIP archive")
+    if not extract_server_name(filename) or not extract_cluster_name(filename):
+        raise ValueError("Invalid file name format")
+    # bool is an int subclass, but "size": true is not a size
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise ValueError("'size' must be a positive integer")
+    # An archive within the extraction budget is about that size at most; keeps one call from claiming unbounded disk
+    if size > MAX_EXTRACTED_BYTES:
+        raise ArchiveTooLarge(f"Upload of {size} bytes exceeds the limit of {MAX_EXTRACTED_BYTES} bytes.")
+    if sha256 is not None and not (isinstance(sha256, str) and SHA256_PATTERN.fullmatch(sha256)):
+        raise ValueError("'sha256' must be a hex-encoded SHA-256 digest")
+
+    metadata = create_upload(collection_name, filename, size, sha256 and sha256.lower())
+    logging.info(f"Upload '{metadata['upload_id']}' started for '{filename}' ({size} bytes).")
+    return metadata
+
+
+def get_upload_status(upload_id):
+    return get_upload(upload_id)
+
+
+def upload_chunk(upload_id, offset, stream, length, checksum):
+    return write_chunk(upload_id, offset, stream, length, checksum)
+
+
+def complete_upload(upload_id):
+    """
+    Hands a fully received upload to the regular ingest pipeline and re-aggregates its cluster.
+    The staged file is kept when ingest fails, so completion can be retried without re-sending it.
+    """
+    metadata, staged_file = finalize_upload(upload_id)
+    collection_name = metadata["collection_name"]
+
+    with GOVERNOR.admit("ingest"), span("ingest.upload", collection=collection_name, files=1, upload_id=upload_id), \
+            JOBS_IN_FLIGHT.track_inprogress(job="ingest"):
+        cluster_name, status = process_file(collection_name, staged_file)
+        # Aggregated within the admitted job, so waiting for an aggregation slot is bounded by the ingest limit
+        errors = aggregate_changed_clusters(collection_name, [(cluster_name, status)])
+    remove_upload(upload_id)
+    logging.info(f"Upload '{upload_id}' completed: server '{metadata['filename']}' {status}.")
+
+    return {
+        "collection_name": collection_name,
+        "cluster_name": cluster_name,
+        "status": status,
+        "errors": errors,
+    }
+
+
+def cancel_upload(upload_id):
+    get_upload(upload_id)
+    remove_upload(upload_id)
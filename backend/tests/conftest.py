@@ -0,0 +1,65 @@
+"""
+Shared test setup. Every data folder of the app points into one scratch directory per test session;
+this has to happen before any application module is imported, as they read the folders at import time.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import zipfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="healthcheck-tests-")
+
+for name in ("BASE_DIR", "REPORTS_DIR", "TEMP_DIR", "TRENDS_DIR", "BLOBS_DIR"):
+    os.environ[name] = os.path.join(DATA_DIR, name.lower())
+os.environ["TEMPLATES_DIR"] = os.path.join(BACKEND_DIR, "__templates__")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["REAPER_INTERVAL"] = "0"
+os.environ["BLOB_GRACE_HOURS"] = "0"
+os.environ["TRACING_ENABLED"] = "False"
+os.environ["LOG_LEVEL"] = "WARNING"
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.bundle_generator import audit_listing, concatenated_objects  # noqa: E402
+from utils.upload_staging import StagedFile  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+def bundle_members(seed=0, errors=None):
+    """The members of a healthcheck archive; `errors` overrides the counts of 6_error-count.json."""
+    rng = random.Random(seed)
+    return {
+        "healthcheck/0_listing-audit-logs.json": audit_listing(rng, 20),
+        "healthcheck/2_req-resp.json": concatenated_objects("Operation", {"request": 100, "response": 95}),
+        "healthcheck/3_auth-resp.json": concatenated_objects("DisplayName", {"token": 10, "approle": 5}),
+        "healthcheck/5_req-paths.json": concatenated_objects("Path", {"secret/a": 7, "secret/b": 3}),
+        "healthcheck/6_error-count.json": concatenated_objects("Errors", errors or {"permission denied": 4}),
+        "healthcheck/7_remote-addr-count.json": concatenated_objects("RemoteAddress", {"10.0.0.1": 9}),
+    }
+
+
+@pytest.fixture
+def make_bundle(tmp_path):
+    """Writes healthcheck_<date>_<server>.zip from a member dict and returns it as a StagedFile upload."""
+    def make(server_name, members=None, date="2024-01-01"):
+        path = tmp_path / f"{server_name}-{len(os.listdir(tmp_path))}" / f"healthcheck_{date}_{server_name}.zip"
+        path.parent.mkdir()
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for name, content in (bundle_members() if members is None else members).items():
+                bundle.writestr(name, content)
+        return StagedFile(str(path), path.name)
+    return make
+
+
+@pytest.fixture
+def collection_name(request):
+    """A collection name of its own for every test, so tests never see each other's data."""
+    return f"test_{request.node.name}".replace("[", "_").replace("]", "")
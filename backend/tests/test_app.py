@@ -0,0 +1,20 @@
+import threading
+
+import app as app_module
+
+
+def test_importing_the_app_starts_no_background_work():
+    assert "reaper" not in [thread.name for thread in threading.enumerate()]
+
+
+def test_first_request_starts_background_services_once(monkeypatch):
+    started = []
+    monkeypatch.setattr(app_module, "_background_started", threading.Lock())
+    monkeypatch.setattr(app_module, "start_reaper", lambda: started.append("reaper"))
+    monkeypatch.setattr(app_module, "report_startup", lambda seconds: started.append("report"))
+
+    client = app_module.app.test_client()
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics").status_code == 200
+
+    assert started == ["report", "reaper"]
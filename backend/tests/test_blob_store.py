@@ -0,0 +1,58 @@
+import os
+import uuid
+
+from utils.blob_store import get_blob_path, has_blob, link_blob_into, link_files, publish_blob
+from utils.trash import move_to_trash
+from utils.utils import BLOBS_DIR
+
+
+def server_folder(path, files):
+    path.mkdir()
+    for file_name, content in files.items():
+        (path / file_name).write_text(content)
+    return str(path)
+
+
+def test_publish_then_link_shares_inodes(tmp_path):
+    digest = uuid.uuid4().hex
+    source = server_folder(tmp_path / "server", {"2_req-resp.json": "[]", ".manifest.json": "{}"})
+
+    blob_path = publish_blob(digest, source)
+    assert blob_path == get_blob_path(digest) and has_blob(digest)
+    assert os.path.dirname(blob_path) == os.path.join(BLOBS_DIR, digest[:2])
+
+    target = str(tmp_path / "linked")
+    assert link_blob_into(digest, target)
+    assert sorted(os.listdir(target)) == [".manifest.json", "2_req-resp.json"]
+    assert os.path.samefile(os.path.join(target, "2_req-resp.json"), os.path.join(blob_path, "2_req-resp.json"))
+    # No staging folder is left behind
+    assert not [name for name in os.listdir(BLOBS_DIR) if name.startswith(".staging-")]
+
+
+def test_publishing_twice_keeps_the_first_blob(tmp_path):
+    digest = uuid.uuid4().hex
+    first = server_folder(tmp_path / "first", {"a.json": "[1]"})
+    second = server_folder(tmp_path / "second", {"a.json": "[2]"})
+
+    publish_blob(digest, first)
+    publish_blob(digest, second)
+    with open(os.path.join(get_blob_path(digest), "a.json")) as f:
+        assert f.read() == "[1]"
+
+
+def test_linking_a_collected_blob_reports_it_missing(tmp_path):
+    digest = uuid.uuid4().hex
+    publish_blob(digest, server_folder(tmp_path / "server", {"a.json": "[]"}))
+    move_to_trash(get_blob_path(digest), BLOBS_DIR)
+
+    target = str(tmp_path / "linked")
+    assert not link_blob_into(digest, target)
+    assert not os.path.exists(target)
+
+
+def test_link_files_skips_folders(tmp_path):
+    source = server_folder(tmp_path / "server", {"a.json": "[]"})
+    (tmp_path / "server" / "nested").mkdir()
+
+    link_files(source, str(tmp_path / "copy"))
+    assert os.listdir(tmp_path / "copy") == ["a.json"]
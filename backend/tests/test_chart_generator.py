@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from matplotlib import pyplot as plt
+from PIL import Image
+
+from config.settings import CHART_CONFIG
+from utils.chart_generator import create_chart
+
+
+def counts(rows):
+    return pd.DataFrame({"Errors": [f"error {i}" for i in range(rows)], "Count": range(1, rows + 1)})
+
+
+def test_concurrent_renders_keep_their_own_figure(tmp_path):
+    sizes = {"small": 3, "large": 30}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(create_chart, counts(rows), CHART_CONFIG["6_error-count"], str(tmp_path / f"{name}-{i}.png"), name)
+            for i in range(4) for name, rows in sizes.items()
+        ]
+        assert all("message" in future.result() for future in futures)
+
+    heights = {}
+    for i in range(4):
+        for name in sizes:
+            with Image.open(tmp_path / f"{name}-{i}.png") as image:
+                heights.setdefault(name, set()).add(image.height)
+    # Every copy of a chart has the same size, and the two charts differ
+    assert len(heights["small"]) == len(heights["large"]) == 1
+    assert heights["small"] != heights["large"]
+    # No figure is left registered with pyplot
+    assert plt.get_fignums() == []
+
+
+def test_empty_data_is_reported(tmp_path):
+    result = create_chart(pd.DataFrame(), CHART_CONFIG["6_error-count"], str(tmp_path / "chart.png"), "")
+    assert "error" in result
@@ -0,0 +1,60 @@
+import json
+import os
+
+from utils.cluster_handler import merge_and_save_json
+from utils.contributor_index import IndexBuilder, get_index_path, query_contributors
+
+
+def write_server(cluster_path, server_name, file_name, key, counts):
+    os.makedirs(cluster_path / server_name, exist_ok=True)
+    with open(cluster_path / server_name / file_name, "w") as f:
+        json.dump([{key: label, "Count": count} for label, count in counts.items()], f)
+
+
+def test_query_ranks_keys_and_servers_by_count():
+    builder = IndexBuilder("Errors")
+    builder.add_server("s1", ["denied", "timeout", None], [5, 1, 9])
+    builder.add_server("s2", ["denied", "timeout"], [7, 30])
+    index = builder.to_json()
+
+    matches, total = query_contributors(index, "denied")
+    assert total == 1
+    assert matches[0]["total"] == 12
+    assert [server["server_name"] for server in matches[0]["servers"]] == ["s2", "s1"]
+
+    matches, _ = query_contributors(index, "E", match="substring")
+    assert [match["key"] for match in matches] == ["timeout", "denied"]
+    assert query_contributors(index, "time", match="prefix")[1] == 1
+    assert query_contributors(index, "time", match="exact")[1] == 0
+
+
+def test_index_is_capped_to_highest_totals():
+    builder = IndexBuilder("Path")
+    builder.add_server("s1", ["a", "b", "c"], [1, 3, 2])
+    index = builder.to_json(max_keys=2)
+
+    assert index["keys"] == ["b", "c"]
+    assert index["complete"] is False
+
+
+def test_approximate_summary_indexes_only_kept_keys(tmp_path, monkeypatch):
+    cluster_path, summary_path = tmp_path / "servers", tmp_path / "summaries"
+    summary_path.mkdir()
+    for server in range(3):
+        counts = {f"rare-{server}-{i}": 1 for i in range(20)}
+        counts["hot"] = 100
+        write_server(cluster_path, f"s{server}", "5_req-paths.json", "Path", counts)
+
+    monkeypatch.setattr(
+        "utils.cluster_handler.get_aggregation_config",
+        lambda file_name: {"mode": "approximate", "capacity": 5, "top_k": 5},
+    )
+    merge_and_save_json(str(summary_path), str(cluster_path), [("5_req-paths.json", "Path")])
+
+    with open(summary_path / "5_req-paths.json") as f:
+        summary_keys = {entry["Path"] for entry in json.load(f)}
+    with open(get_index_path(str(summary_path), "5_req-paths.json")) as f:
+        index = json.load(f)
+    assert set(index["keys"]) == summary_keys
+    assert "hot" in index["keys"]
+    assert query_contributors(index, "hot")[0][0]["total"] == 300
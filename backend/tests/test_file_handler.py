@@ -0,0 +1,137 @@
+import os
+import zipfile
+
+from conftest import bundle_members
+from utils.blob_store import get_blob_path
+from utils.file_handler import apply_archive_delta, normalize_json_file, process_file, read_archive_members
+from utils.manifest import MANIFEST_FILE, load_dirty_summaries, read_manifest_if_present, write_server_manifest
+from utils.repository import load_json_file
+from utils.utils import BASE_DIR, get_path
+
+CLUSTER = "KP1EAAS"
+
+
+def server_path(collection_name, server_name):
+    return get_path(BASE_DIR, collection_name, CLUSTER, "servers", server_name)
+
+
+def test_first_ingest_is_processed(collection_name, make_bundle):
+    upload = make_bundle("RH1VAULT11", bundle_members(seed=111))
+
+    assert process_file(collection_name, upload) == (CLUSTER, "processed")
+
+    path = server_path(collection_name, "RH1VAULT11")
+    assert sorted(os.listdir(path)) == [
+        MANIFEST_FILE, "0_listing-audit-logs.json", "2_req-resp.json", "3_auth-resp.json",
+        "5_req-paths.json", "6_error-count.json", "7_remote-addr-count.json",
+    ]
+    # Concatenated objects are normalized into arrays
+    assert load_json_file(get_path(path, "6_error-count.json")) == [{"Errors": "permission denied", "Count": 4}]
+    manifest = read_manifest_if_present(path)
+    assert manifest["entry_count"] == 20
+    assert set(manifest["files"]) == set(os.listdir(path)) - {MANIFEST_FILE}
+    assert load_dirty_summaries(collection_name, CLUSTER) == set(manifest["files"])
+    # No staging, retired or uploaded archive is left beside the server
+    assert os.listdir(os.path.dirname(path)) == ["RH1VAULT11"]
+
+
+def test_manifest_records_member_crcs(collection_name, make_bundle):
+    upload = make_bundle("RH1VAULT12", bundle_members(seed=112))
+    process_file(collection_name, upload)
+
+    with zipfile.ZipFile(upload.path) as bundle:
+        expected = {info.filename: {"crc": info.CRC, "size": info.file_size} for info in bundle.infolist()}
+    archive = read_manifest_if_present(server_path(collection_name, "RH1VAULT12"))["archive"]
+    assert archive["members"] == expected
+    assert archive["name"] == upload.filename and archive["size"] == os.path.getsize(upload.path)
+
+
+def test_archive_members_skip_folders_and_other_files(tmp_path):
+    path = tmp_path / "bundle.zip"
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr("healthcheck/", "")
+        bundle.writestr("healthcheck/notes.txt", "ignored")
+        bundle.writestr("healthcheck/2_req-resp.json", "[]")
+    assert list(read_archive_members(str(path))) == ["healthcheck/2_req-resp.json"]
+
+
+def test_identical_reupload_is_unchanged(collection_name, make_bundle):
+    upload = make_bundle("RH1VAULT13", bundle_members(seed=113))
+    process_file(collection_name, upload)
+    manifest = read_manifest_if_present(server_path(collection_name, "RH1VAULT13"))
+
+    assert process_file(collection_name, upload) == (CLUSTER, "unchanged")
+    assert read_manifest_if_present(server_path(collection_name, "RH1VAULT13")) == manifest
+
+
+def test_repacked_archive_with_same_members_is_unchanged(collection_name, make_bundle):
+    members = bundle_members(seed=114)
+    process_file(collection_name, make_bundle("RH1VAULT14", members))
+    # A different archive, members in another order, holding the same member contents
+    repacked = make_bundle("RH1VAULT14", dict(reversed(list(members.items()))))
+
+    assert process_file(collection_name, repacked) == (CLUSTER, "unchanged")
+
+
+def test_reupload_with_changed_members_is_updated(collection_name, make_bundle):
+    process_file(collection_name, make_bundle("RH1VAULT15", bundle_members(seed=115)))
+    path = server_path(collection_name, "RH1VAULT15")
+    first_digest = read_manifest_if_present(path)["archive"]["sha256"]
+    untouched = os.stat(get_path(path, "2_req-resp.json")).st_ino
+
+    members = bundle_members(seed=115, errors={"permission denied": 40})
+    del members["healthcheck/7_remote-addr-count.json"]
+    assert process_file(collection_name, make_bundle("RH1VAULT15", members)) == (CLUSTER, "updated")
+
+    assert load_json_file(get_path(path, "6_error-count.json")) == [{"Errors": "permission denied", "Count": 40}]
+    assert not os.path.exists(get_path(path, "7_remote-addr-count.json"))
+    # Unchanged files are carried over as hardlinks, not re-extracted
+    assert os.stat(get_path(path, "2_req-resp.json")).st_ino == untouched
+    # The blob of the first archive still holds the files it was published with
+    first_blob = get_blob_path(first_digest)
+    assert load_json_file(get_path(first_blob, "6_error-count.json")) == [{"Errors": "permission denied", "Count": 4}]
+    assert os.path.exists(get_path(first_blob, "7_remote-addr-count.json"))
+
+
+def test_same_archive_in_another_collection_is_linked(collection_name, make_bundle):
+    upload = make_bundle("RH1VAULT16", bundle_members(seed=116))
+    process_file(collection_name, upload)
+    other_collection = f"{collection_name}_copy"
+
+    assert process_file(other_collection, upload) == (CLUSTER, "linked")
+
+    original, linked = server_path(collection_name, "RH1VAULT16"), server_path(other_collection, "RH1VAULT16")
+    assert sorted(os.listdir(linked)) == sorted(os.listdir(original))
+    assert os.path.samefile(get_path(linked, "5_req-paths.json"), get_path(original, "5_req-paths.json"))
+    assert load_dirty_summaries(other_collection, CLUSTER) == set(read_manifest_if_present(linked)["files"])
+
+
+def test_apply_archive_delta_reextracts_only_changed_members(tmp_path, make_bundle):
+    before = make_bundle("RH1VAULT17", bundle_members(seed=117))
+    members = bundle_members(seed=117, errors={"timeout": 2})
+    members["healthcheck/8_new.json"] = '{"Key": "x", "Count": 1}'
+    del members["healthcheck/3_auth-resp.json"]
+    after = make_bundle("RH1VAULT17", members)
+
+    folder = str(tmp_path / "server")
+    os.mkdir(folder)
+    with zipfile.ZipFile(before.path) as bundle:
+        bundle.extractall(tmp_path / "extracted")
+    for file_name in os.listdir(tmp_path / "extracted" / "healthcheck"):
+        normalize_json_file(str(tmp_path / "extracted" / "healthcheck" / file_name), get_path(folder, file_name))
+    previous = write_server_manifest(folder, {"members": read_archive_members(before.path)})
+    untouched = os.path.getmtime(get_path(folder, "5_req-paths.json"))
+
+    archive = {"members": read_archive_members(after.path)}
+    changed = apply_archive_delta(after.path, folder, previous, archive)
+
+    assert changed == ["3_auth-resp.json", "6_error-count.json", "8_new.json"]
+    assert not os.path.exists(get_path(folder, "3_auth-resp.json"))
+    assert load_json_file(get_path(folder, "6_error-count.json")) == [{"Errors": "timeout", "Count": 2}]
+    assert load_json_file(get_path(folder, "8_new.json")) == [{"Key": "x", "Count": 1}]
+    assert os.path.getmtime(get_path(folder, "5_req-paths.json")) == untouched
+    # The manifest now describes the new archive, and the scratch folder is gone
+    manifest = read_manifest_if_present(folder)
+    assert manifest["archive"] == archive
+    assert "3_auth-resp.json" not in manifest["files"] and "8_new.json" in manifest["files"]
+    assert not [name for name in os.listdir(folder) if name.startswith(".delta-")]
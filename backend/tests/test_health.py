@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from utils.health import OK, WARNING, evaluate_health, health_placeholders, overall_state
+from utils.report_generator import calculate_warnings
+from utils.repository import save_json
+from utils.utils import BASE_DIR, get_path
+
+REQUESTS_FILE, ERRORS_FILE = "2_req-resp.json", "6_error-count.json"
+
+
+def legacy_warnings(requests, errors):
+    """The hard-coded checks calculate_warnings ran before the rules engine, on in-memory summaries."""
+    if not requests:
+        return {"[warning_1]": WARNING, "[message_1]": "Failed to retrieve request/response data.",
+                "[warning_2]": WARNING, "[message_2]": ""}
+    request_count = next((item["Count"] for item in requests if item["Operation"] == "request"), 0)
+    response_count = next((item["Count"] for item in requests if item["Operation"] == "response"), 0)
+    total_count = request_count + response_count
+    if total_count == 0:
+        return {"[warning_1]": WARNING, "[message_1]": "No Request or Response data available.",
+                "[warning_2]": WARNING, "[message_2]": ""}
+
+    warning_1, message_1 = OK, ""
+    if abs(response_count / total_count * 100 - request_count / total_count * 100) > 10:
+        warning_1, message_1 = WARNING, "The percentage difference between Request and Response exceeds 10%."
+
+    warning_2, message_2 = OK, ""
+    if not errors:
+        warning_2, message_2 = WARNING, f"Failed to retrieve data from {ERRORS_FILE}."
+    elif sum(item["Count"] for item in errors) > 10:
+        non_null_errors = [item for item in errors if item.get("Errors")]
+        if non_null_errors:
+            most_frequent_error = max(non_null_errors, key=lambda x: x["Count"])["Errors"]
+            warning_2, message_2 = WARNING, f"Most frequent error: '{most_frequent_error}'."
+    return {"[warning_1]": warning_1, "[message_1]": message_1, "[warning_2]": warning_2, "[message_2]": message_2}
+
+
+def operations(request, response):
+    return [{"Operation": "request", "Count": request}, {"Operation": "response", "Count": response}]
+
+
+def errors(*entries):
+    return [{"Errors": label, "Count": count} for label, count in entries]
+
+
+# Cluster name: (2_req-resp.json, 6_error-count.json), None for a missing summary
+CASES = {
+    "BALANCED": (operations(100, 95), errors(("permission denied", 4))),
+    "NOERRORS": (operations(100, 95), None),
+    "EMPTYERRORS": (operations(100, 95), []),
+    "ZERO": (operations(0, 0), errors(("a", 50))),
+    "NOREQUESTS": (None, errors(("a", 50))),
+    "ONLYREQUESTS": ([{"Operation": "request", "Count": 7}], errors(("a", 1))),
+    "FEWERRORS": (operations(100, 100), errors(("a", 6), ("b", 4))),
+    "NULLERRORS": (operations(100, 50), errors((None, 30), ("", 5))),
+    "TIE": (operations(100, 50), errors(("b", 8), ("a", 8), (None, 20))),
+    "IMBALANCED": (operations(10, 100), errors(("timeout", 3), ("denied", 9))),
+}
+
+
+@pytest.fixture
+def health_collection(collection_name):
+    for cluster_name, (requests, error_entries) in CASES.items():
+        summary_path = get_path(BASE_DIR, collection_name, cluster_name, "summaries")
+        os.makedirs(summary_path)
+        if requests is not None:
+            save_json(get_path(summary_path, REQUESTS_FILE), requests)
+        if error_entries is not None:
+            save_json(get_path(summary_path, ERRORS_FILE), error_entries)
+    return collection_name
+
+
+def test_rules_match_the_previous_checks(health_collection):
+    results = evaluate_health(health_collection, list(CASES))
+    for cluster_name, (requests, error_entries) in CASES.items():
+        expected = legacy_warnings(requests, error_entries)
+        assert health_placeholders(results[cluster_name]) == expected, cluster_name
+        assert calculate_warnings(health_collection, cluster_name) == expected, cluster_name
+        assert overall_state(results[cluster_name]) == (
+            OK if expected["[warning_1]"] == expected["[warning_2]"] == OK else WARNING
+        )
+
+
+def test_exact_ten_percent_split_is_ok(collection_name):
+    # 55/45 used to trip the old check through float rounding; the rule is "above 10%"
+    summary_path = get_path(BASE_DIR, collection_name, "SPLIT", "summaries")
+    os.makedirs(summary_path)
+    save_json(get_path(summary_path, REQUESTS_FILE), operations(55, 45))
+    save_json(get_path(summary_path, ERRORS_FILE), errors(("a", 1)))
+
+    result = evaluate_health(collection_name, ["SPLIT"])["SPLIT"]
+    assert result["request_response_balance"]["state"] == OK
+    assert result["request_response_balance"]["value"] == pytest.approx(10)
+
+
+def test_rewritten_summary_is_re_evaluated(collection_name):
+    summary_path = get_path(BASE_DIR, collection_name, "REWRITTEN", "summaries")
+    os.makedirs(summary_path)
+    save_json(get_path(summary_path, REQUESTS_FILE), operations(100, 100))
+    save_json(get_path(summary_path, ERRORS_FILE), errors(("a", 1)))
+    assert overall_state(evaluate_health(collection_name, ["REWRITTEN"])["REWRITTEN"]) == OK
+
+    save_json(get_path(summary_path, ERRORS_FILE), errors(("disk full", 1), ("a", 20)))
+    result = evaluate_health(collection_name, ["REWRITTEN"])["REWRITTEN"]
+    assert result["error_volume"]["message"] == "Most frequent error: 'a'."
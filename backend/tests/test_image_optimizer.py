@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+from PIL import Image
+
+import utils.image_optimizer as image_optimizer
+from utils.image_optimizer import REPORT_IMAGE_DPI, optimize_report_image
+
+
+@pytest.fixture
+def pixel_limit(monkeypatch):
+    """Sets REPORT_IMAGE_MAX_PIXELS for one test."""
+    def set_limit(pixels):
+        monkeypatch.setattr(image_optimizer, "REPORT_IMAGE_MAX_PIXELS", pixels)
+    return set_limit
+
+
+def chart(path, size, color="red"):
+    Image.new("RGBA", size, color).save(path)
+    return str(path)
+
+
+def test_chart_is_downsampled_to_its_printed_size(tmp_path):
+    path = chart(tmp_path / "chart.png", (3000, 600))
+
+    optimized = optimize_report_image(path, 2)
+
+    assert optimized != path
+    with Image.open(optimized) as image:
+        assert image.size == (2 * REPORT_IMAGE_DPI, REPORT_IMAGE_DPI * 2 // 5)
+    # Converted once, then served from the cache
+    assert optimize_report_image(path, 2) == optimized
+
+
+@pytest.mark.parametrize("size", [(100, 70), (400, 400)], ids=["above_limit", "above_twice_the_limit"])
+def test_oversized_chart_is_embedded_as_is(tmp_path, caplog, pixel_limit, size):
+    pixel_limit(5000)
+    path = chart(tmp_path / "chart.png", size, "blue")
+
+    pillow_limit = Image.MAX_IMAGE_PIXELS
+
+    with caplog.at_level(logging.WARNING):
+        assert optimize_report_image(path, 2) == path
+    assert "exceeds REPORT_IMAGE_MAX_PIXELS" in caplog.text
+    # Pillow's process-wide setting is left alone
+    assert Image.MAX_IMAGE_PIXELS == pillow_limit
+
+
+def test_zero_lifts_the_pixel_limit(tmp_path, pixel_limit):
+    pixel_limit(0)
+    path = chart(tmp_path / "chart.png", (400, 400), "green")
+
+    assert optimize_report_image(path, 2) != path
+
+
+def test_pillow_limit_still_applies(tmp_path, caplog, monkeypatch, pixel_limit):
+    pixel_limit(0)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+    path = chart(tmp_path / "chart.png", (400, 400), "yellow")
+
+    with caplog.at_level(logging.WARNING):
+        assert optimize_report_image(path, 2) == path
+    assert "exceeds Pillow's pixel limit" in caplog.text
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils.locking import cluster_locks, file_lock, replace_directory, staged_directory
+
+
+def test_exclusive_lock_times_out_while_held():
+    with file_lock("test.exclusive"):
+        with pytest.raises(TimeoutError):
+            with file_lock("test.exclusive", timeout=0.1):
+                pass
+    with file_lock("test.exclusive", timeout=0.1):
+        pass
+
+
+def test_shared_locks_coexist_but_exclude_writers():
+    with file_lock("test.shared", shared=True), file_lock("test.shared", shared=True, timeout=0.1):
+        with pytest.raises(TimeoutError):
+            with file_lock("test.shared", timeout=0.1):
+                pass
+
+
+def test_lock_serializes_threads():
+    counter = {"value": 0}
+
+    def increment():
+        for _ in range(50):
+            with file_lock("test.threads"):
+                value = counter["value"]
+                time.sleep(0)  # Let the other threads run inside the critical section if they could
+                counter["value"] = value + 1
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter["value"] == 200
+
+
+@pytest.mark.parametrize("name", ["", "../escape", "a/b", "a\\b"])
+def test_lock_names_cannot_escape_the_locks_folder(name):
+    with pytest.raises(ValueError):
+        with file_lock(name):
+            pass
+
+
+def test_cluster_locks_accept_duplicates():
+    with cluster_locks("test_locking", ["B", "A", "B"]):
+        with pytest.raises(TimeoutError):
+            with file_lock("cluster.test_locking.A", timeout=0.1):
+                pass
+
+
+def test_staged_directory_publishes_on_success(tmp_path):
+    target = tmp_path / "charts"
+    target.mkdir()
+    (target / "old.png").write_text("old")
+    (target / "kept.png").write_text("kept")
+
+    with staged_directory(str(target)) as staging:
+        with open(os.path.join(staging, "old.png"), "w") as f:
+            f.write("new")
+        # Nothing is visible before the block exits
+        assert (target / "old.png").read_text() == "old"
+
+    assert (target / "old.png").read_text() == "new"
+    assert (target / "kept.png").read_text() == "kept"
+    assert sorted(os.listdir(tmp_path)) == ["charts"]
+
+
+def test_staged_directory_leaves_target_untouched_on_failure(tmp_path):
+    target = tmp_path / "charts"
+    with pytest.raises(RuntimeError):
+        with staged_directory(str(target)) as staging:
+            with open(os.path.join(staging, "partial.png"), "w") as f:
+                f.write("partial")
+            raise RuntimeError("render failed")
+
+    assert not target.exists()
+    assert os.listdir(tmp_path) == []
+
+
+def test_replace_directory_swaps_folders(tmp_path):
+    target, staging = tmp_path / "server", tmp_path / ".staging-server"
+    target.mkdir()
+    (target / "stale.json").write_text("[]")
+    staging.mkdir()
+    (staging / "fresh.json").write_text("[]")
+
+    replace_directory(str(staging), str(target))
+
+    assert os.listdir(target) == ["fresh.json"]
+    assert os.listdir(tmp_path) == ["server"]
+
+    staging.mkdir()
+    replace_directory(str(staging), str(tmp_path / "new-server"))
+    assert sorted(os.listdir(tmp_path)) == ["new-server", "server"]
@@ -0,0 +1,48 @@
+import os
+
+from conftest import bundle_members
+from services.collection_services import delete_collection
+from utils.blob_store import get_blob_path
+from utils.file_handler import process_file
+from utils.reaper import collect_blobs, run_reaper, Throttle
+from utils.trash import TRASH_DIR_NAME
+from utils.utils import BLOBS_DIR
+
+
+def stored_blobs():
+    return set(
+        digest
+        for shard in os.listdir(BLOBS_DIR) if shard != TRASH_DIR_NAME
+        for digest in os.listdir(os.path.join(BLOBS_DIR, shard))
+    )
+
+
+def test_delta_reingest_then_delete_frees_all_blobs(collection_name, make_bundle):
+    before = stored_blobs()
+    first = make_bundle("RH1VAULT01", bundle_members(seed=101))
+    second = make_bundle("RH1VAULT01", bundle_members(seed=101, errors={"permission denied": 40}))
+
+    assert process_file(collection_name, first)[1] == "processed"
+    assert process_file(collection_name, second)[1] == "updated"
+    # The unchanged files of both blobs are the same inodes
+    assert len(stored_blobs() - before) == 2
+
+    delete_collection(collection_name)
+    run_reaper()
+    run_reaper()
+
+    assert stored_blobs() - before == set()
+    assert os.listdir(os.path.join(BLOBS_DIR, TRASH_DIR_NAME)) == []
+
+
+def test_referenced_blobs_are_kept(collection_name, make_bundle):
+    before = stored_blobs()
+    process_file(collection_name, make_bundle("RH1VAULT02", bundle_members(seed=102)))
+    (digest,) = stored_blobs() - before
+
+    collect_blobs(Throttle(0), now=float("inf"))
+
+    assert os.path.isdir(get_blob_path(digest))
+    delete_collection(collection_name)
+    run_reaper()
+    assert not os.path.isdir(get_blob_path(digest))
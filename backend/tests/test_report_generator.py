@@ -0,0 +1,59 @@
+import logging
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from utils.report_generator import insert_log_listings
+
+LISTING = ["total 2", "-rw-r--r--. 1 vault vault 10 Jan 1 2024 audit-0.log"]
+
+
+def paragraph_with(xml_runs):
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    for xml in xml_runs:
+        paragraph._p.append(parse_xml(xml))
+    return doc, paragraph
+
+
+def run(text, bold=False):
+    properties = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f'<w:r {nsdecls("w")}>{properties}<w:t xml:space="preserve">{text}</w:t></w:r>'
+
+
+def test_listing_replaces_a_placeholder_run():
+    doc, paragraph = paragraph_with([run("Files: "), run("[log_1]", bold=True)])
+
+    insert_log_listings(doc, {1: LISTING})
+
+    assert paragraph.text == "Files: " + "\n".join(LISTING)
+    # The listing keeps the placeholder's formatting
+    assert paragraph.runs[-1].bold
+
+
+def test_listing_replaces_a_placeholder_split_over_runs():
+    doc, paragraph = paragraph_with([run("Files: [lo"), run("g_1] end")])
+
+    insert_log_listings(doc, {1: LISTING})
+
+    assert paragraph.text == "Files: " + "\n".join(LISTING) + " end"
+
+
+def test_placeholder_inside_a_hyperlink_falls_back_to_text(caplog):
+    hyperlink = f'<w:hyperlink {nsdecls("w")} w:anchor="logs">{run("g_1]")}</w:hyperlink>'
+    doc, paragraph = paragraph_with([run("Files: [lo"), hyperlink])
+
+    with caplog.at_level(logging.WARNING):
+        insert_log_listings(doc, {1: LISTING})
+
+    assert paragraph.text == "Files: " + "\n".join(LISTING)
+    assert "[log_1] spans a hyperlink or field" in caplog.text
+
+
+def test_unknown_placeholders_are_left_alone():
+    doc, paragraph = paragraph_with([run("[log_2]")])
+
+    insert_log_listings(doc, {1: LISTING})
+
+    assert paragraph.text == "[log_2]"
@@ -0,0 +1,34 @@
+import json
+import tracemalloc
+
+import pytest
+
+from utils.repository import LRUCache, estimate_memory
+
+
+@pytest.mark.parametrize("data", [
+    [{"Path": f"/api/v1/items/{i}", "Count": i} for i in range(50000)],
+    [{"Errors": "x" * (i % 300), "Count": i} for i in range(20000)],
+], ids=["many_small_entries", "long_strings"])
+def test_estimate_is_close_to_the_parsed_size(data):
+    text = json.dumps(data)
+    tracemalloc.start()
+    parsed = json.loads(text)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert 0.8 * allocated <= estimate_memory(parsed) <= 1.25 * allocated
+    # The cost is the memory, not the size on disk
+    assert estimate_memory(parsed) > 2 * len(text)
+
+
+def test_cache_evicts_by_cost():
+    cache = LRUCache(100)
+    cache.put(("a", 0, 0), "A", 60)
+    cache.put(("b", 0, 0), "B", 30)
+    cache.get(("a", 0, 0))
+    cache.put(("c", 0, 0), "C", 30)
+
+    assert cache.get(("b", 0, 0)) is None
+    assert cache.get(("a", 0, 0)) == "A" and cache.get(("c", 0, 0)) == "C"
+    assert cache.total_cost == 90
@@ -0,0 +1,141 @@
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from utils.cluster_handler import get_stats_path, merge_and_save_json
+from utils.sketches import HyperLogLog, SpaceSaving
+
+
+def zipf_stream(seed, keys=2000, updates=20000):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    labels = rng.choices([f"key-{rank}" for rank in range(keys)], weights, k=updates)
+    return [(label, rng.randint(1, 5)) for label in labels]
+
+
+def test_counts_are_exact_below_capacity():
+    sketch = SpaceSaving(10)
+    for key, weight in [("a", 3), ("b", 1), ("a", 2), ("c", 7)]:
+        sketch.update(key, weight)
+
+    assert sketch.top() == [("c", 7, 0), ("a", 5, 0), ("b", 1, 0)]
+    assert sketch.exact and sketch.max_error == 0 and sketch.total == 13
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_estimates_bound_the_true_counts(seed):
+    stream = zipf_stream(seed)
+    truth = Counter()
+    sketch = SpaceSaving(100)
+    for key, weight in stream:
+        truth[key] += weight
+        sketch.update(key, weight)
+
+    assert not sketch.exact and len(sketch) == 100
+    for key, count, error in sketch.top():
+        assert count - error <= truth[key] <= count
+        assert error <= sketch.max_error
+    # Every key heavier than total / capacity is tracked
+    tracked = {key for key, _, _ in sketch.top()}
+    assert {key for key, count in truth.items() if count > sketch.total / sketch.capacity} <= tracked
+    # The heaviest keys come out first and in order
+    assert [key for key, _, _ in sketch.top(3)] == [key for key, _ in truth.most_common(3)]
+
+
+def test_eviction_replaces_the_smallest_counter():
+    sketch = SpaceSaving(2)
+    sketch.update("a", 5)
+    sketch.update("b", 3)
+    sketch.update("c", 1)
+    # b was the smallest: c takes over its count as possible overestimate
+    assert sketch.top() == [("a", 5, 0), ("c", 4, 3)]
+
+    sketch.update("d", 1)
+    assert sketch.top() == [("a", 5, 0), ("d", 5, 4)]
+    assert sketch.evictions == 2
+
+
+def test_ties_evict_the_least_recently_updated_key():
+    sketch = SpaceSaving(2)
+    sketch.update("a", 2)
+    sketch.update("b", 2)
+    sketch.update("c", 1)
+    assert [key for key, _, _ in sketch.top()] == ["c", "b"]
+
+
+def test_weighted_updates_match_repeated_unit_updates():
+    weighted, unit = SpaceSaving(3), SpaceSaving(3)
+    for key, weight in [("a", 4), ("b", 2), ("c", 3), ("d", 5), ("a", 1)]:
+        weighted.update(key, weight)
+        for _ in range(weight):
+            unit.update(key)
+    weighted.update("b", 0)
+    weighted.update("b", -3)
+
+    assert weighted.total == unit.total == 15
+    assert {key: count for key, count, _ in weighted.top()} == {key: count for key, count, _ in unit.top()}
+
+
+def test_outdated_heap_entries_are_compacted():
+    sketch = SpaceSaving(3)
+    for i in range(1000):
+        sketch.update(f"key-{i % 5}", 1)
+    assert len(sketch._heap) <= 4 * sketch.capacity
+    assert sum(count for _, count, _ in sketch.top()) == sketch.total
+
+
+@pytest.mark.parametrize("keys", [10, 1000, 50000])
+def test_distinct_estimate_is_within_a_few_percent(keys):
+    estimator = HyperLogLog()
+    for i in range(keys):
+        estimator.add(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}")
+        estimator.add(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}")
+
+    assert abs(estimator.estimate() - keys) <= max(1, 0.05 * keys)
+
+
+def test_distinct_counts_evicted_keys():
+    sketch = SpaceSaving(10)
+    for key, weight in zipf_stream(3):
+        sketch.update(key, weight)
+    truth = len({key for key, _ in zipf_stream(3)})
+
+    assert len(sketch) == 10
+    assert abs(sketch.distinct() - truth) <= 0.05 * truth
+
+    small = SpaceSaving(10)
+    for key in "abcabc":
+        small.update(key)
+    assert small.distinct() == 3
+
+
+def test_approximate_summary_keeps_error_bounds_out_of_its_entries(tmp_path, monkeypatch):
+    cluster_path, summary_path = tmp_path / "servers", tmp_path / "summaries"
+    summary_path.mkdir()
+    for server in range(3):
+        (cluster_path / f"s{server}").mkdir(parents=True)
+        counts = {f"10.0.{server}.{i}": 1 for i in range(30)}
+        counts["10.0.0.1"] = 50
+        with open(cluster_path / f"s{server}" / "7_remote-addr-count.json", "w") as f:
+            json.dump([{"RemoteAddress": label, "Count": count} for label, count in counts.items()], f)
+
+    monkeypatch.setattr(
+        "utils.cluster_handler.get_aggregation_config",
+        lambda file_name: {"mode": "approximate", "capacity": 20, "top_k": 5},
+    )
+    merge_and_save_json(str(summary_path), str(cluster_path), [("7_remote-addr-count.json", "RemoteAddress")])
+
+    with open(summary_path / "7_remote-addr-count.json") as f:
+        summary = json.load(f)
+    with open(get_stats_path(str(summary_path), "7_remote-addr-count.json")) as f:
+        stats = json.load(f)
+    assert len(summary) == 5
+    assert all(set(entry) == {"RemoteAddress", "Count"} for entry in summary)
+    assert summary[0] == {"RemoteAddress": "10.0.0.1", "Count": 150}
+    assert stats["mode"] == "approximate" and stats["exact"] is False
+    # 90 addresses were seen although the sketch kept 20 of them
+    assert stats["keys"] == 20 and abs(stats["distinct"] - 90) <= 2
+    assert [label for label, _ in stats["error_bounds"]] == [entry["RemoteAddress"] for entry in summary]
+    assert all(error <= stats["max_error"] for _, error in stats["error_bounds"])
@@ -0,0 +1,230 @@
+import sys
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.storage import LocalStorage, S3Storage
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+@pytest.fixture(autouse=True)
+def botocore_exceptions(monkeypatch):
+    """S3Storage imports botocore's ClientError lazily; point it at the one the fake client raises."""
+    exceptions = types.ModuleType("botocore.exceptions")
+    exceptions.ClientError = ClientError
+    monkeypatch.setitem(sys.modules, "botocore", types.ModuleType("botocore"))
+    monkeypatch.setitem(sys.modules, "botocore.exceptions", exceptions)
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+        self.reads = 0
+
+    def iter_chunks(self, chunk_size):
+        for offset in range(0, len(self.data), chunk_size):
+            self.reads += 1
+            yield self.data[offset:offset + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakePaginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix="", Delimiter=None, PaginationConfig=None):
+        page_size = (PaginationConfig or {}).get("PageSize", 1000)
+        keys = sorted(key for key in self.client.objects if key.startswith(Prefix))
+        if Delimiter:
+            prefixes = sorted({Prefix + key[len(Prefix):].split(Delimiter)[0] + Delimiter
+                               for key in keys if Delimiter in key[len(Prefix):]})
+            entries = [("prefix", prefix) for prefix in prefixes]
+        else:
+            entries = [("key", key) for key in keys]
+        for offset in range(0, max(len(entries), 1), page_size):
+            self.client.list_requests += 1
+            page = {"KeyCount": len(entries[offset:offset + page_size])}
+            contents = [self.client.listing(key) for kind, key in entries[offset:offset + page_size] if kind == "key"]
+            common = [{"Prefix": key} for kind, key in entries[offset:offset + page_size] if kind == "prefix"]
+            if contents:
+                page["Contents"] = contents
+            if common:
+                page["CommonPrefixes"] = common
+            yield page
+
+
+class FakeS3Client:
+    """The list/get/put/delete subset of boto3's S3 client that S3Storage uses, backed by a dict."""
+
+    MODIFIED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self):
+        self.objects = {}
+        self.bodies = []
+        self.list_requests = 0
+        self.delete_batches = []
+
+    def listing(self, key):
+        return {"Key": key, "Size": len(self.objects[key]), "LastModified": self.MODIFIED}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return FakePaginator(self)
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))[:MaxKeys]
+        return {"KeyCount": len(keys), "Contents": [self.listing(key) for key in keys]}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError("404")
+        return {"ContentLength": len(self.objects[Key]), "LastModified": self.MODIFIED}
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objects:
+            raise ClientError("NoSuchKey")
+        data = self.objects[Key]
+        if Range:
+            start, end = Range[len("bytes="):].split("-")
+            data = data[int(start):int(end) + 1 if end else None]
+        body = FakeBody(data)
+        self.bodies.append(body)
+        return {"Body": body}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self.objects[key] = fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def delete_objects(self, Bucket, Delete):
+        assert len(Delete["Objects"]) <= 1000, "S3 rejects delete requests with more than 1000 keys"
+        self.delete_batches.append(len(Delete["Objects"]))
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+
+def s3_storage(prefix="tenant/reports"):
+    storage = S3Storage("bucket", prefix)
+    storage._client = FakeS3Client()
+    return storage
+
+
+@pytest.fixture(params=["local", "s3"])
+def storage(request, tmp_path):
+    return LocalStorage(str(tmp_path)) if request.param == "local" else s3_storage()
+
+
+def keys_of(storage, prefix="", batch_size=1000):
+    return [item["key"] for batch in storage.list(prefix, batch_size) for item in batch]
+
+
+def test_backends_agree_on_reads_and_listings(storage):
+    storage.write_bytes("coll/CLUSTER1/report.docx", b"0123456789")
+    with storage.open_write("coll/CLUSTER2/report.docx") as f:
+        f.write(b"abc")
+    storage.write_bytes("other/CLUSTER1/report.docx", b"x")
+
+    assert storage.exists("coll/CLUSTER1/report.docx")
+    assert not storage.exists("coll/CLUSTER3/report.docx")
+    assert storage.exists_prefix("coll") and not storage.exists_prefix("missing")
+    assert storage.stat("coll/CLUSTER2/report.docx")["size"] == 3
+    assert storage.read_bytes("coll/CLUSTER1/report.docx") == b"0123456789"
+    assert b"".join(storage.iter_chunks("coll/CLUSTER1/report.docx", 2, 7, chunk_size=2)) == b"23456"
+    assert b"".join(storage.iter_chunks("coll/CLUSTER1/report.docx", 8)) == b"89"
+
+    assert keys_of(storage, "coll") == ["coll/CLUSTER1/report.docx", "coll/CLUSTER2/report.docx"]
+    assert storage.list_prefixes() == ["coll", "other"]
+    assert storage.list_prefixes("coll") == ["CLUSTER1", "CLUSTER2"]
+
+    storage.delete_prefix("coll")
+    assert keys_of(storage) == ["other/CLUSTER1/report.docx"]
+    assert not storage.exists_prefix("coll")
+    storage.delete("other/CLUSTER1/report.docx")
+    storage.delete("other/CLUSTER1/report.docx")
+    assert keys_of(storage) == []
+
+    with pytest.raises(FileNotFoundError):
+        storage.stat("other/CLUSTER1/report.docx")
+    with pytest.raises(FileNotFoundError):
+        list(storage.iter_chunks("other/CLUSTER1/report.docx"))
+    with pytest.raises(ValueError):
+        storage.exists("../outside")
+
+
+def test_s3_list_paginates_in_batches():
+    storage = s3_storage()
+    for i in range(25):
+        storage.write_bytes(f"coll/CLUSTER{i:02d}/report.docx", b"x")
+    storage.write_bytes("collection2/CLUSTER1/report.docx", b"x")
+
+    batches = list(storage.list("coll", batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert storage.client.list_requests == 3
+    # "coll" must not match "collection2", and keys come back without the storage prefix
+    assert batches[0][0]["key"] == "coll/CLUSTER00/report.docx"
+    assert all(item["key"].startswith("coll/") for batch in batches for item in batch)
+
+
+def test_s3_list_prefixes_reads_every_page():
+    storage = s3_storage()
+    for i in range(1500):
+        storage.write_bytes(f"coll/CLUSTER{i:04d}/report.docx", b"x")
+
+    prefixes = storage.list_prefixes("coll")
+    assert len(prefixes) == 1500
+    assert storage.client.list_requests == 2
+    assert prefixes[0] == "CLUSTER0000" and prefixes[-1] == "CLUSTER1499"
+
+
+def test_s3_delete_prefix_batches_at_the_request_limit():
+    storage = s3_storage()
+    for i in range(2345):
+        storage.write_bytes(f"coll/CLUSTER{i:04d}/report.docx", b"x")
+    storage.write_bytes("keep/CLUSTER1/report.docx", b"x")
+
+    storage.delete_prefix("coll")
+    assert storage.client.delete_batches == [1000, 1000, 345]
+    assert list(storage.client.objects) == ["tenant/reports/keep/CLUSTER1/report.docx"]
+
+
+def test_s3_reads_stream_a_byte_range():
+    storage = s3_storage()
+    storage.write_bytes("coll/CLUSTER1/report.docx", bytes(range(256)) * 4)
+
+    chunks = list(storage.iter_chunks("coll/CLUSTER1/report.docx", 100, 900, chunk_size=256))
+    assert [len(chunk) for chunk in chunks] == [256, 256, 256, 32]
+    assert b"".join(chunks) == (bytes(range(256)) * 4)[100:900]
+    body = storage.client.bodies[-1]
+    assert body.reads == 4 and body.closed
+
+    # Abandoning a stream half-way still releases the connection
+    stream = storage.iter_chunks("coll/CLUSTER1/report.docx", chunk_size=64)
+    next(stream)
+    stream.close()
+    assert storage.client.bodies[-1].closed
+
+
+def test_s3_open_write_uploads_on_clean_exit_only():
+    storage = s3_storage()
+    with storage.open_write("coll/CLUSTER1/report.docx") as f:
+        f.write(b"report")
+    assert storage.read_bytes("coll/CLUSTER1/report.docx") == b"report"
+
+    with pytest.raises(RuntimeError):
+        with storage.open_write("coll/CLUSTER2/report.docx") as f:
+            f.write(b"partial")
+            raise RuntimeError("render failed")
+    assert not storage.exists("coll/CLUSTER2/report.docx")
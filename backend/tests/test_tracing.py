@@ -0,0 +1,48 @@
+import json
+import os
+
+from utils import tracing
+
+
+def enable_tracing(monkeypatch, tmp_path, sample_rate=1.0, max_mb=64):
+    trace_file = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", sample_rate)
+    monkeypatch.setattr(tracing, "TRACE_FILE", trace_file)
+    monkeypatch.setattr(tracing, "TRACE_FILES", (trace_file, f"{trace_file}.1"))
+    monkeypatch.setattr(tracing, "TRACE_FILE_MAX_MB", max_mb)
+    return trace_file
+
+
+def test_spans_of_a_sampled_trace_are_exported(monkeypatch, tmp_path):
+    trace_file = enable_tracing(monkeypatch, tmp_path)
+    with tracing.span("outer") as outer, tracing.span("inner"):
+        pass
+
+    with open(trace_file) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["name"] for record in records] == ["inner", "outer"]
+    assert records[0]["parent_id"] == outer.span_id
+    assert tracing.current_trace_id() is None
+
+
+def test_unsampled_traces_export_nothing(monkeypatch, tmp_path):
+    trace_file = enable_tracing(monkeypatch, tmp_path, sample_rate=0)
+    with tracing.span("outer"), tracing.span("inner") as inner:
+        inner.set(rows=1)
+
+    assert not os.path.exists(trace_file)
+    assert inner.attributes == {"rows": 1}
+    assert tracing.current_trace_id() is None
+
+
+def test_trace_file_is_rotated(monkeypatch, tmp_path):
+    trace_file = enable_tracing(monkeypatch, tmp_path, max_mb=1 / 1024)  # 1 KiB
+    for _ in range(20):
+        with tracing.span("work", payload="x" * 100):
+            pass
+
+    # A file is rotated by the write that takes it past the limit, so neither outgrows it by more than a span
+    sizes = [os.path.getsize(path) for path in (trace_file, f"{trace_file}.1") if os.path.exists(path)]
+    assert os.path.exists(f"{trace_file}.1")
+    assert all(size < 2 * 1024 for size in sizes)
@@ -0,0 +1,60 @@
+import json
+import multiprocessing
+import os
+from datetime import datetime
+
+from utils.repository import SUMMARY_STATS_PREFIX, get_collection_file_path
+from utils.trend_store import build_trend_row, query_trend, record_cluster_trend, remove_collection_trends
+
+START, END = datetime(2024, 1, 1), datetime(2024, 1, 2)
+
+
+def record_many(cluster_name, worker):
+    for i in range(10):
+        record_cluster_trend(f"healthcheck_2024-01-{worker + 1:02d}-{i:02d}.00", cluster_name, START, END)
+
+
+def test_concurrent_writers_keep_every_row():
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=record_many, args=("TRENDCONCURRENT", worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in workers)
+    assert len(query_trend("TRENDCONCURRENT")["collection"]) == 40
+
+
+def test_undated_collection_has_no_collection_time():
+    record_cluster_trend("my_upload", "TRENDUNDATED", START, END)
+    record_cluster_trend("healthcheck_2024-03-01-10.00", "TRENDUNDATED", START, END)
+    # Re-aggregating must not move the undated collection in the series
+    record_cluster_trend("my_upload", "TRENDUNDATED", START, END)
+
+    series = query_trend("TRENDUNDATED")
+    assert series["collection"] == ["healthcheck_2024-03-01-10.00", "my_upload"]
+    assert series["collected_at"] == ["2024-03-01T10:00:00", None]
+    assert query_trend("TRENDUNDATED", since=datetime(2024, 1, 1))["collection"] == ["healthcheck_2024-03-01-10.00"]
+
+    remove_collection_trends("my_upload")
+    assert query_trend("TRENDUNDATED")["collection"] == ["healthcheck_2024-03-01-10.00"]
+
+
+def test_approximate_summaries_report_their_distinct_count():
+    def write_summary(file_name, data):
+        path = get_collection_file_path("healthcheck_2024-04-01-10.00", "TRENDDISTINCT", file_name, "summary")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    # The summary keeps its top 2 of 1234 paths; the addresses were merged before stats were recorded
+    write_summary("5_req-paths.json", [{"Path": "/a", "Count": 9}, {"Path": "/b", "Count": 5}])
+    write_summary(f"{SUMMARY_STATS_PREFIX}5_req-paths.json", {"mode": "approximate", "keys": 2, "distinct": 1234})
+    write_summary("7_remote-addr-count.json", [{"RemoteAddress": "10.0.0.1", "Count": 3}])
+
+    row = build_trend_row("healthcheck_2024-04-01-10.00", "TRENDDISTINCT", START, END)
+
+    assert row["paths"] == 1234
+    assert row["remote_addresses"] == 1
+    assert json.loads(row["top_paths"]) == [["/a", 9], ["/b", 5]]
@@ -0,0 +1,128 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import app
+from conftest import bundle_members
+from services.upload_services import upload_chunk
+from utils.governor import MAX_EXTRACTED_BYTES
+from utils.upload_staging import DATA_FILE, UploadOffsetError, get_upload_path
+from utils.utils import BASE_DIR, get_path
+
+UPLOADS_URL = "/api/v1/chartapp/server/upload"
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def archive(make_bundle):
+    upload = make_bundle("RH1VAULT21", bundle_members(seed=121))
+    with open(upload.path, "rb") as f:
+        return upload.filename, f.read()
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def initiate(client, collection_name, filename, size, **fields):
+    return client.post(UPLOADS_URL, json={"collection_name": collection_name, "filename": filename, "size": size, **fields})
+
+
+def send_chunk(client, upload_id, offset, chunk, checksum=None):
+    return client.put(
+        f"{UPLOADS_URL}/{upload_id}?offset={offset}", data=chunk,
+        headers={"X-Chunk-Sha256": checksum or sha256(chunk)},
+    )
+
+
+def staged_size(upload_id):
+    return os.path.getsize(get_path(get_upload_path(upload_id), DATA_FILE))
+
+
+@pytest.mark.parametrize("fields, status", [
+    ({"size": True}, 400),
+    ({"size": "100"}, 400),
+    ({"size": 0}, 400),
+    ({"size": MAX_EXTRACTED_BYTES + 1}, 413),
+    ({"size": 100, "sha256": 123}, 400),
+    ({"size": 100, "sha256": "not-a-digest"}, 400),
+    ({"size": 100, "sha256": "a" * 63}, 400),
+    ({"size": 100, "filename": 42}, 400),
+])
+def test_initiate_rejects_invalid_fields(client, collection_name, fields, status):
+    body = {"collection_name": collection_name, "filename": "healthcheck_2024-01-01_RH1VAULT21.zip", **fields}
+    assert client.post(UPLOADS_URL, json=body).status_code == status
+
+
+def test_chunk_at_the_wrong_offset_is_a_conflict(client, collection_name, archive):
+    filename, data = archive
+    upload_id = initiate(client, collection_name, filename, len(data)).get_json()["data"]["upload_id"]
+
+    response = send_chunk(client, upload_id, 10, data[10:20])
+
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 0
+
+
+def test_checksum_mismatch_discards_the_chunk(client, collection_name, archive):
+    filename, data = archive
+    upload_id = initiate(client, collection_name, filename, len(data)).get_json()["data"]["upload_id"]
+
+    response = send_chunk(client, upload_id, 0, data[:100], checksum=sha256(b"something else"))
+
+    assert response.status_code == 400
+    assert client.get(f"{UPLOADS_URL}/{upload_id}").get_json()["data"]["offset"] == 0
+    assert staged_size(upload_id) == 0
+
+
+def test_short_chunk_is_discarded(client, collection_name, archive):
+    filename, data = archive
+    upload_id = initiate(client, collection_name, filename, len(data)).get_json()["data"]["upload_id"]
+
+    # The connection drops after 50 of the 100 announced bytes
+    with pytest.raises(UploadOffsetError) as error:
+        upload_chunk(upload_id, 0, io.BytesIO(data[:50]), 100, sha256(data[:100]))
+
+    assert error.value.offset == 0
+    assert staged_size(upload_id) == 0
+
+
+def test_upload_resumes_after_an_interruption(client, collection_name, archive):
+    filename, data = archive
+    upload_id = initiate(client, collection_name, filename, len(data), sha256=sha256(data).upper()).get_json()["data"]["upload_id"]
+    middle = len(data) // 2
+
+    assert send_chunk(client, upload_id, 0, data[:middle]).status_code == 200
+    with pytest.raises(UploadOffsetError):
+        upload_chunk(upload_id, middle, io.BytesIO(data[middle:middle + 10]), len(data) - middle, sha256(data[middle:]))
+
+    # The client asks where to resume and re-sends the rest
+    offset = client.get(f"{UPLOADS_URL}/{upload_id}").get_json()["data"]["offset"]
+    assert offset == middle
+    assert send_chunk(client, upload_id, offset, data[offset:]).status_code == 200
+
+    response = client.post(f"{UPLOADS_URL}/{upload_id}/complete")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["status"] == "processed"
+    assert os.path.isdir(get_path(BASE_DIR, collection_name, "KP1EAAS", "servers", "RH1VAULT21"))
+    assert client.get(f"{UPLOADS_URL}/{upload_id}").status_code == 404
+
+
+def test_completing_an_incomplete_upload_is_a_conflict(client, collection_name, archive):
+    filename, data = archive
+    upload_id = initiate(client, collection_name, filename, len(data)).get_json()["data"]["upload_id"]
+    send_chunk(client, upload_id, 0, data[:100])
+
+    response = client.post(f"{UPLOADS_URL}/{upload_id}/complete")
+
+    assert response.status_code == 409
+    assert response.get_json()["offset"] == 100
+    # Nothing was ingested and the upload can still be finished
+    assert not os.path.isdir(get_path(BASE_DIR, collection_name))
+    assert client.get(f"{UPLOADS_URL}/{upload_id}").get_json()["data"]["offset"] == 100
@@ -0,0 +1,79 @@
+import logging
+import os
+import shutil
+import uuid
+
+from utils.locking import file_lock
+from utils.utils import BLOBS_DIR, create_directory, get_path
+
+
+def get_blob_path(digest):
+    """Blobs are sharded by the first two hex digits of the archive hash."""
+    return get_path(BLOBS_DIR, digest[:2], digest)
+
+
+def blob_lock(digest, shared=True):
+    """
+    Shared while a blob is linked into a server folder or published, exclusive while the reaper
+    decides whether blobs of the same shard are still in use (see utils.reaper.collect_blobs).
+    """
+    return file_lock(f"blobs.{digest[:2]}", shared)
+
+
+def has_blob(digest):
+    return os.path.isdir(get_blob_path(digest))
+
+
+def link_or_copy(source, destination):
+    """Hardlinks a file, falling back to a copy when the blob store lives on another filesystem."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def link_files(source_dir, target_dir):
+    """Hardlinks every file of a folder into another one."""
+    create_directory(target_dir)
+    for file_name in os.listdir(source_dir):
+        source = get_path(source_dir, file_name)
+        if os.path.isfile(source):
+            link_or_copy(source, get_path(target_dir, file_name))
+
+
+def link_blob_into(digest, target_dir):
+    """
+    Materializes a blob as a server folder: each normalized file becomes a hardlink to the blob.
+    Files in the folder must only ever be replaced (os.replace), never rewritten in place,
+    otherwise the change would leak into every collection sharing the blob.
+    Returns False when the blob was garbage-collected since it was looked up.
+    """
+    with blob_lock(digest):
+        if not has_blob(digest):
+            return False
+        link_files(get_blob_path(digest), target_dir)
+    return True
+
+
+def publish_blob(digest, source_dir):
+    """
+    Stores the normalized files of a server folder under the archive hash.
+    The blob is assembled in a scratch folder and renamed into place, so concurrent
+    publishers of the same archive never expose a half-written blob.
+    """
+    blob_path = get_blob_path(digest)
+    if os.path.isdir(blob_path):
+        return blob_path
+
+    staging_path = get_path(BLOBS_DIR, f".staging-{uuid.uuid4().hex}")
+    try:
+        link_files(source_dir, staging_path)
+        with blob_lock(digest):
+            create_directory(os.path.dirname(blob_path))
+            os.rename(staging_path, blob_path)
+    except OSError as e:
+        # Another request published the same blob first, or the store is unavailable; either way the
+        # server folder itself is complete, so deduplication is simply skipped this time
+        logging.warning(f"Could not publish blob {digest}: {e}")
+        shutil.rmtree(staging_path, ignore_errors=True)
+    return blob_path
@@ -1,9 +1,12 @@
 import matplotlib
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 import locale
 import numpy as np
+from config.settings import MATPLOTLIB_RC
 
 matplotlib.use('Agg')  # Non-GUI backend for matplotlib
+plt.rcParams.update(MATPLOTLIB_RC)
 locale.setlocale(locale.LC_ALL, '')  # Set locale for number formatting
 
 def wrap_text(text, max_words=7):
@@ -44,8 +47,9 @@ def create_chart(df, config, output_path, subtitle):
         # Wrap long text labels
         df.iloc[:, 0] = df.iloc[:, 0].apply(wrap_text)
 
-        # Chart figure setup
-        fig, ax = plt.subplots(figsize=(12, max(6, len(df) * 0.8)))
+        # Chart figure setup, outside pyplot's global figure state so charts can render concurrently
+        fig = Figure(figsize=(12, max(6, len(df) * 0.8)))
+        ax = fig.subplots()
         fig.subplots_adjust(left=0.15, right=0.85, top=0.85, bottom=0.2)  # Add margins for each side
 
         # Title and subtitle setup
@@ -90,9 +94,7 @@ def create_chart(df, config, output_path, subtitle):
             return {"error": f"Unsupported chart type: '{chart_type}'"}
 
         # Save the chart aku titipkan dia tak pantas ku bersanding dengan nya bahagiakan dia kau sayangi dia sepertiku menyayanginya dann kan ku ikhlaskan dia 
-        plt.savefig(output_path, bbox_inches="tight", dpi=300)
+        fig.savefig(output_path, bbox_inches="tight", dpi=300)
         return {"message": f"Chart successfully saved at {output_path}"}
     except Exception as e:
         return {"error": f"Error creating chart: {str(e)}"}
-    finally:
-        plt.close()
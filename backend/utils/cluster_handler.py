@@ -1,69 +1,87 @@
 from collections import defaultdict
+from datetime import datetime
 import json
 import logging
 import os
 
-import pandas as pd
-from config.settings import CHART_CONFIG
-from services.server_services import open_file
-from utils.chart_generator import create_chart
-from utils.utils import BASE_DIR, create_and_get_path, get_path, get_subdirectories, is_valid_name, parse_log_date
+from config.settings import CHART_CONFIG, DEFAULT_AGGREGATION
+from utils.contributor_index import INDEXED_SUMMARIES, IndexBuilder, build_index, get_index_path
+from utils.governor import GOVERNOR
+from utils.locking import cluster_lock, staged_directory
+from utils.manifest import LOG_LISTING_FILE, clear_dirty_summaries, load_dirty_summaries, load_server_manifest
+from utils.metrics import CHART_RENDER_DURATION, CLUSTER_AGGREGATION_DURATION, JOBS_IN_FLIGHT
+from utils.repository import SUMMARY_STATS_PREFIX, load_counts, load_json_file, save_json
+from utils.rollup import update_cluster_rollup
+from utils.sketches import SpaceSaving
+from utils.tracing import span
+from utils.trend_store import record_cluster_trend
+from utils.utils import BASE_DIR, create_and_get_path, get_path, get_subdirectories, is_valid_name
 
 
 def process_clusters(collection_name, cluster_folders):
     errors, results = [], []
-    for cluster_name in cluster_folders:
-        if not is_valid_name(cluster_name):
-            errors.append(f"Invalid cluster name: {cluster_name}")
-            logging.warning(f"Skipping invalid cluster name: {cluster_name}")
-            continue
-        try:
-            results.append(process_single_cluster(collection_name, cluster_name))
-        except Exception as e:
-            logging.error(f"Error processing cluster '{cluster_name}': {e}")
-            errors.append(f"Cluster '{cluster_name}': {str(e)}")
+    with JOBS_IN_FLIGHT.track_inprogress(job="aggregation"):
+        for cluster_name in cluster_folders:
+            if not is_valid_name(cluster_name):
+                errors.append(f"Invalid cluster name: {cluster_name}")
+                logging.warning(f"Skipping invalid cluster name: {cluster_name}")
+                continue
+            try:
+                with GOVERNOR.admit("aggregation", blocking=True), CLUSTER_AGGREGATION_DURATION.time():
+                    results.append(process_single_cluster(collection_name, cluster_name))
+            except Exception as e:
+                logging.error(f"Error processing cluster '{cluster_name}': {e}")
+                errors.append(f"Cluster '{cluster_name}': {str(e)}")
     return errors, results
 
 
 def process_single_cluster(collection_name, cluster_name):
+    # Servers cannot be ingested, nor reports built, while the cluster is being aggregated
+    with cluster_lock(collection_name, cluster_name):
+        aggregate_cluster(collection_name, cluster_name)
+
+
+def aggregate_cluster(collection_name, cluster_name):
     cluster_path = get_path(BASE_DIR, collection_name, cluster_name, "servers")
     server_folders = get_subdirectories(cluster_path)
 
     if not server_folders:
         raise ValueError(f"No servers found in cluster '{cluster_name}'.")
 
-    dates = [
-        get_server_log_dates(collection_name, cluster_name, server_name)
-        for server_name in server_folders
-    ]
-    earliest_date = min(date[0] for date in dates)
-    latest_date = max(date[1] for date in dates)
-
-    create_summary_and_generate_charts(
-        collection_name, cluster_name, cluster_path, earliest_date, latest_date
-    )
+    with span("aggregate.cluster", collection=collection_name, cluster=cluster_name, servers=len(server_folders)):
+        dates = [
+            get_server_log_dates(collection_name, cluster_name, server_name)
+            for server_name in server_folders
+        ]
+        earliest_date = min(date[0] for date in dates)
+        latest_date = max(date[1] for date in dates)
+
+        create_summary_and_generate_charts(
+            collection_name, cluster_name, cluster_path, earliest_date, latest_date
+        )
     logging.info(f"Charts created for cluster '{cluster_name}'.")
 
+    try:
+        record_cluster_trend(collection_name, cluster_name, earliest_date, latest_date)
+    except Exception as e:
+        logging.error(f"Failed to record trend for cluster '{cluster_name}': {e}")
+
+    try:
+        update_cluster_rollup(collection_name, cluster_name)
+    except Exception as e:
+        logging.error(f"Failed to update the rollup of collection '{collection_name}': {e}")
+
 
 def get_server_log_dates(collection_name, cluster_name, server_name):
-    log_file = "0_listing-audit-logs.json"
-    response, status = open_file(collection_name, cluster_name, log_file, "server", server_name)
+    manifest = load_server_manifest(collection_name, cluster_name, server_name)
 
-    if status != 200:
+    if LOG_LISTING_FILE not in manifest["files"]:
         raise FileNotFoundError(f"Logs not found for server '{server_name}'.")
 
-    log_data = response.get_json()
-    if not log_data or 'logs' not in log_data:
-        raise ValueError(f"Invalid log data for server '{server_name}'.")
-
-    dates = [
-        parse_log_date(entry["date"])
-        for entry in log_data["logs"] if "date" in entry
-    ]
-    if not dates:
+    if not manifest["earliest_date"] or not manifest["latest_date"]:
         raise ValueError(f"No valid log dates for server '{server_name}'.")
 
-    return min(dates), max(dates)
+    return datetime.fromisoformat(manifest["earliest_date"]), datetime.fromisoformat(manifest["latest_date"])
 
 
 def create_summary_and_generate_charts(collection_name, cluster_name, cluster_path, start_date, end_date):
@@ -78,47 +96,121 @@ def create_summary_and_generate_charts(collection_name, cluster_name, cluster_pa
         ("7_remote-addr-count.json", "RemoteAddress"),
     ]
 
-    merge_and_save_json(summary_path, cluster_path, json_files)
+    # After a delta ingest only the summaries fed by changed server files are re-merged;
+    # a changed log listing moves the date range, so every chart subtitle is redrawn then
+    dirty = load_dirty_summaries(collection_name, cluster_name)
+    if dirty is not None:
+        json_files = [
+            (file_name, key) for file_name, key in json_files
+            if file_name in dirty or not os.path.exists(get_path(summary_path, file_name))
+        ]
+    # Summaries and charts are written to staging folders and moved into place once complete
+    with staged_directory(summary_path) as staged_summary_path:
+        merge_and_save_json(staged_summary_path, cluster_path, json_files)
 
     subtitle = f"{start_date.strftime('%d %b %Y')} ~ {end_date.strftime('%d %b %Y')}"
-    generate_charts_from_summary(chart_path, summary_path, subtitle)
+    redraw = None if dirty is None or LOG_LISTING_FILE in dirty else {file_name for file_name, _ in json_files}
+    with staged_directory(chart_path) as staged_chart_path:
+        generate_charts_from_summary(staged_chart_path, summary_path, subtitle, redraw)
+    clear_dirty_summaries(collection_name, cluster_name)
 
 
-def merge_and_save_json(summary_path, cluster_path, json_files):
-    for file_name, key in json_files:
-        merged_data = defaultdict(int)
+def get_aggregation_config(file_name):
+    chart_key = os.path.splitext(file_name)[0]
+    return CHART_CONFIG.get(chart_key, {}).get("aggregation", DEFAULT_AGGREGATION)
+
 
-        for server_folder in get_subdirectories(cluster_path):
-            json_file_path = os.path.join(cluster_path, server_folder, file_name)
-            if os.path.exists(json_file_path):
-                try:
-                    with open(json_file_path, "r") as f:
-                        for entry in json.load(f):
-                            if key in entry:
-                                merged_data[entry[key]] += entry.get("Count", 0)
-                except json.JSONDecodeError:
-                    logging.error(f"Failed to read JSON file: {json_file_path}")
+def get_stats_path(summary_path, file_name):
+    """Hidden file beside a summary describing how it was merged, see merge_and_save_json."""
+    return get_path(summary_path, f"{SUMMARY_STATS_PREFIX}{file_name}")
 
-        output_file = os.path.join(summary_path, file_name)
-        with open(output_file, "w") as f:
-            json.dump([{key: k, "Count": v} for k, v in merged_data.items()], f, indent=4)
 
+def merge_and_save_json(summary_path, cluster_path, json_files):
+    for file_name, key in json_files:
+        aggregation = get_aggregation_config(file_name)
+        approximate = aggregation.get("mode") == "approximate"
+
+        with span("aggregate.merge", file=file_name, mode=aggregation.get("mode")) as merge_span:
+            merged_data = SpaceSaving(aggregation["capacity"]) if approximate else defaultdict(int)
+            # Exact summaries are indexed while merging; approximate ones afterwards, see below
+            index = IndexBuilder(key) if file_name in INDEXED_SUMMARIES and not approximate else None
+            rows = 0
+
+            for server_folder in sorted(get_subdirectories(cluster_path)):
+                json_file_path = os.path.join(cluster_path, server_folder, file_name)
+                if os.path.exists(json_file_path):
+                    try:
+                        labels, counts = load_counts(json_file_path, key)
+                        counts = counts.tolist()
+                        rows += len(labels)
+                        for label, count in zip(labels, counts):
+                            if approximate:
+                                merged_data.update(label, count)
+                            else:
+                                merged_data[label] += count
+                        if index is not None:
+                            index.add_server(server_folder, labels, counts)
+                    except json.JSONDecodeError:
+                        logging.error(f"Failed to read JSON file: {json_file_path}")
+
+            output_file = os.path.join(summary_path, file_name)
+            stats = {
+                "mode": aggregation.get("mode", "exact"),
+                "keys": len(merged_data),
+                # Keys seen across all servers, also when the summary keeps only some of them
+                "distinct": merged_data.distinct() if approximate else len(merged_data),
+            }
+            if approximate:
+                top = merged_data.top(aggregation.get("top_k"))
+                save_json(output_file, [{key: k, "Count": count} for k, count, _ in top])
+                # How far each Count may overestimate the true total (0 while the sketch is exact), kept
+                # beside the summary so its entries have the same shape in both modes
+                stats.update(
+                    capacity=merged_data.capacity,
+                    total=merged_data.total,
+                    exact=merged_data.exact,
+                    max_error=merged_data.max_error,
+                    error_bounds=[[k, error] for k, _, error in top],
+                )
+                if file_name in INDEXED_SUMMARIES:
+                    # Second pass over the server files for only the keys the sketch kept, so the
+                    # index is as bounded as the summary instead of holding every key of every server
+                    kept = {str(k) for k, _, _ in top if k not in (None, "")}
+                    save_json(get_index_path(summary_path, file_name), build_index(cluster_path, file_name, key, kept))
+            else:
+                save_json(output_file, [{key: k, "Count": v} for k, v in merged_data.items()])
+                if index is not None:
+                    save_json(get_index_path(summary_path, file_name), index.to_json())
+            save_json(get_stats_path(summary_path, file_name), stats)
+            merge_span.set(rows=rows, keys=len(merged_data))
+
+
+def generate_charts_from_summary(chart_path, summary_path, subtitle, file_names=None):
+    """Renders the chart of every summary, or only of the summaries in `file_names` when given."""
+    # pandas and matplotlib are only loaded by workers that actually render charts
+    import pandas as pd
+    from utils.chart_generator import create_chart
 
-def generate_charts_from_summary(chart_path, summary_path, subtitle):
     for file_name in os.listdir(summary_path):
-        if file_name.endswith(".json"):
+        # Hidden files beside the summaries, such as the contributor indexes, have no chart
+        if (
+            not file_name.startswith(".") and file_name.endswith(".json")
+            and (file_names is None or file_name in file_names)
+        ):
             try:
-                df = pd.read_json(os.path.join(summary_path, file_name))
+                df = pd.DataFrame(load_json_file(os.path.join(summary_path, file_name)))
                 chart_key = next((k for k in CHART_CONFIG if k in file_name), None)
                 if not chart_key:
                     continue
 
-                create_chart(
-                    df,
-                    CHART_CONFIG[chart_key],
-                    get_path(chart_path, f"{chart_key}.png"),
-                    subtitle,
-                )
+                with GOVERNOR.admit("chart", blocking=True), span("chart.render", chart=chart_key, rows=len(df)), \
+                        CHART_RENDER_DURATION.time(chart=chart_key):
+                    create_chart(
+                        df,
+                        CHART_CONFIG[chart_key],
+                        get_path(chart_path, f"{chart_key}.png"),
+                        subtitle,
+                    )
             except Exception as e:
                 logging.error(f"Error creating chart for {file_name}: {e}")
 
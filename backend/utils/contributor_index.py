@@ -0,0 +1,169 @@
+import logging
+import os
+from bisect import bisect_left
+
+from dotenv import load_dotenv
+from utils.repository import load_counts, load_json_file, save_json
+from utils.utils import BASE_DIR, get_path, get_subdirectories
+
+# Load environment variables
+load_dotenv()
+
+# Every indexed summary has a hidden inverted index beside it, summaries/.index-<summary file>: each key
+# of the summary mapped to the servers it came from and their counts, so drill-downs never open server files
+INDEX_FILE_PREFIX = ".index-"
+# Label key of the entries of every summary that can be indexed
+SUMMARY_KEYS = {
+    "2_req-resp.json": "Operation",
+    "3_auth-resp.json": "DisplayName",
+    "5_req-paths.json": "Path",
+    "6_error-count.json": "Errors",
+    "7_remote-addr-count.json": "RemoteAddress",
+}
+# Comma-separated summaries to index
+CONTRIBUTOR_INDEX_FILES = os.getenv("CONTRIBUTOR_INDEX_FILES", "5_req-paths.json,6_error-count.json,7_remote-addr-count.json")
+# Keys kept per index, highest totals first, so an index stays as bounded as an approximate summary
+CONTRIBUTOR_INDEX_MAX_KEYS = int(os.getenv("CONTRIBUTOR_INDEX_MAX_KEYS", 10000))
+
+MATCH_MODES = ("exact", "prefix", "substring")
+
+
+def parse_indexed_summaries(value):
+    """Maps the summaries listed in CONTRIBUTOR_INDEX_FILES to their label key."""
+    indexed = {}
+    for file_name in filter(None, (name.strip() for name in value.split(","))):
+        if file_name in SUMMARY_KEYS:
+            indexed[file_name] = SUMMARY_KEYS[file_name]
+        else:
+            logging.warning(f"CONTRIBUTOR_INDEX_FILES: '{file_name}' cannot be indexed, ignoring it.")
+    return indexed
+
+
+INDEXED_SUMMARIES = parse_indexed_summaries(CONTRIBUTOR_INDEX_FILES)
+
+
+def get_index_path(summary_path, file_name):
+    return get_path(summary_path, f"{INDEX_FILE_PREFIX}{file_name}")
+
+
+class IndexBuilder:
+    """
+    Collects per-server counts of one summary, either while its server files are merged or in a
+    second pass. With `keys`, only those keys are indexed, e.g. the keys an approximate summary kept.
+    """
+
+    def __init__(self, key, keys=None):
+        self.key = key
+        self.keys = keys
+        self.servers = []
+        self.postings = {}
+
+    def add_server(self, server_name, labels, counts):
+        server_index = len(self.servers)
+        self.servers.append(server_name)
+        for label, count in zip(labels, counts):
+            # Unlabelled entries cannot be searched for
+            if label is None or label == "":
+                continue
+            label = str(label)
+            if self.keys is not None and label not in self.keys:
+                continue
+            per_server = self.postings.setdefault(label, {})
+            per_server[server_index] = per_server.get(server_index, 0) + count
+
+    def to_json(self, max_keys=CONTRIBUTOR_INDEX_MAX_KEYS):
+        """
+        Keys are sorted so exact and prefix lookups are binary searches; the servers of every key
+        are sorted by count, highest first, so a drill-down is a plain read. Only the `max_keys`
+        keys with the highest totals are kept; "complete" tells whether any were dropped.
+        """
+        totals = {key: sum(per_server.values()) for key, per_server in self.postings.items()}
+        kept = totals
+        if max_keys and len(totals) > max_keys:
+            kept = dict(sorted(totals.items(), key=lambda item: -item[1])[:max_keys])
+
+        keys = sorted(kept)
+        postings = []
+        for key in keys:
+            ranked = sorted(self.postings[key].items(), key=lambda item: (-item[1], item[0]))
+            postings.append([[server_index, count] for server_index, count in ranked])
+        return {
+            "key": self.key,
+            "complete": len(kept) == len(totals),
+            "servers": self.servers,
+            "keys": keys,
+            "totals": [kept[key] for key in keys],
+            "postings": postings,
+        }
+
+
+def build_index(cluster_path, file_name, key, keys=None):
+    """Builds the index of one summary straight from the server files under `cluster_path`."""
+    builder = IndexBuilder(key, keys)
+    for server_name in sorted(get_subdirectories(cluster_path)):
+        json_file_path = get_path(cluster_path, server_name, file_name)
+        if os.path.exists(json_file_path):
+            labels, counts = load_counts(json_file_path, key)
+            builder.add_server(server_name, labels, counts.tolist())
+    return builder.to_json()
+
+
+def summary_keys(summary_file_path, key):
+    """The keys of a summary, which for an approximate summary are the ones its sketch kept."""
+    return {str(entry[key]) for entry in load_json_file(summary_file_path) if entry.get(key) not in (None, "")}
+
+
+def load_index(collection_name, cluster_name, file_name):
+    """
+    Returns the index of a summary, building it first for clusters aggregated before indexes existed.
+    The returned object is shared through the JSON cache and must be treated as read-only.
+    """
+    summary_path = get_path(BASE_DIR, collection_name, cluster_name, "summaries")
+    index_path = get_index_path(summary_path, file_name)
+    try:
+        return load_json_file(index_path)
+    except FileNotFoundError:
+        if not os.path.isfile(get_path(summary_path, file_name)):
+            raise FileNotFoundError(f"Cluster '{cluster_name}' has no summary '{file_name}'")
+    key = INDEXED_SUMMARIES[file_name]
+    keys = summary_keys(get_path(summary_path, file_name), key)
+    save_json(index_path, build_index(get_path(BASE_DIR, collection_name, cluster_name, "servers"), file_name, key, keys))
+    return load_json_file(index_path)
+
+
+def match_keys(keys, query, match):
+    """Positions of the keys matching `query`: a binary search for exact and prefix matches, a scan otherwise."""
+    if match == "exact":
+        position = bisect_left(keys, query)
+        return [position] if position < len(keys) and keys[position] == query else []
+    if match == "prefix":
+        position = bisect_left(keys, query)
+        matches = []
+        while position < len(keys) and keys[position].startswith(query):
+            matches.append(position)
+            position += 1
+        return matches
+    query = query.lower()
+    return [position for position, key in enumerate(keys) if query in key.lower()]
+
+
+def query_contributors(index, query, match="exact", limit=50, server_limit=None):
+    """
+    Keys matching `query` with the servers that contributed to each, both sorted by count.
+    Returns (matches, total number of matching keys).
+    """
+    positions = match_keys(index["keys"], query, match)
+    positions.sort(key=lambda position: -index["totals"][position])
+    servers = index["servers"]
+    matches = [
+        {
+            "key": index["keys"][position],
+            "total": index["totals"][position],
+            "servers": [
+                {"server_name": servers[server_index], "count": count}
+                for server_index, count in index["postings"][position][:server_limit]
+            ],
+        }
+        for position in positions[:limit]
+    ]
+    return matches, len(positions)
@@ -1,8 +1,21 @@
 import logging
 import os
 import shutil
+import uuid
 import zipfile
 from dotenv import load_dotenv
+from utils.blob_store import has_blob, link_blob_into, link_files, publish_blob
+from utils.governor import check_archive_budget
+from utils.locking import cluster_lock, replace_directory, server_lock
+from utils.manifest import (
+    LOG_LISTING_FILE,
+    hash_file,
+    mark_summaries_dirty,
+    read_manifest_if_present,
+    write_server_manifest
+)
+from utils.metrics import BYTES_PROCESSED, INGEST_STAGE_DURATION
+from utils.tracing import span
 from utils.utils import (
     BASE_DIR,
     convert_logs_to_json,
@@ -36,8 +49,12 @@ def process_file(collection_name, file):
         logging.error(f"Invalid file name format for file '{file.filename}'.")
         raise ValueError("Invalid file name format")
 
-    create_cluster(collection_name, cluster_name)
-    add_server(collection_name, cluster_name, server_name, file)
+    with span("ingest.process_file", collection=collection_name, cluster=cluster_name,
+              server=server_name, file=file.filename):
+        create_cluster(collection_name, cluster_name)
+        with cluster_lock(collection_name, cluster_name, shared=True), \
+                server_lock(collection_name, cluster_name, server_name):
+            return cluster_name, add_server(collection_name, cluster_name, server_name, file)
 
 
 def create_cluster(collection_name, cluster_name):
@@ -50,58 +67,178 @@ def create_cluster(collection_name, cluster_name):
 
 
 def add_server(collection_name, cluster_name, server_name, file):
+    """
+    Ingests one server archive and returns how it was handled:
+    "unchanged" when no JSON member differs from what is already in place, "linked" when it was
+    materialized from the blob store, "updated" when only the changed members were re-extracted,
+    or "processed" after a full extract and normalize.
+    The new server folder is always built beside the current one and swapped in once complete, so
+    readers never see a half-ingested server and a failed re-upload leaves the previous one in place.
+    The server files that changed are flagged so that aggregation only re-merges their summaries.
+    Callers hold the server lock and a shared cluster lock, see process_file.
+    """
     cluster_path = get_path(BASE_DIR, collection_name, cluster_name, "servers")
     server_path = get_path(cluster_path, server_name)
+    zip_path = get_path(cluster_path, f".{server_name}_uploaded.zip")
+    staging_path = get_path(cluster_path, f".staging-{server_name}-{uuid.uuid4().hex}")
 
-    if os.path.exists(server_path):
-        shutil.rmtree(server_path)
+    try:
+        with span("ingest.save") as save_span, INGEST_STAGE_DURATION.time(stage="save"):
+            file.save(zip_path)
+            save_span.set(bytes=os.path.getsize(zip_path))
+        BYTES_PROCESSED.inc(save_span.attributes["bytes"], stage="upload")
 
-    create_directory(server_path)
-    zip_path = get_path(server_path, f"{file.filename}_uploaded.zip")
+        archive = {
+            "name": file.filename,
+            "size": save_span.attributes["bytes"],
+            "sha256": hash_file(zip_path),
+            "members": read_archive_members(zip_path),
+        }
 
-    try:
-        file.save(zip_path)
-        json_found = extract_and_process_json(zip_path, server_path)
+        # Identical re-upload: nothing to do
+        previous = read_manifest_if_present(server_path)
+        previous_archive = (previous or {}).get("archive") or {}
+        if previous_archive.get("sha256") == archive["sha256"]:
+            logging.info(f"Server '{server_name}' is unchanged, skipping ingest.")
+            return "unchanged"
+
+        linked = False
+        if has_blob(archive["sha256"]):
+            # Same archive already ingested into another collection: reuse its normalized files
+            with span("ingest.link", blob=archive["sha256"]):
+                linked = link_blob_into(archive["sha256"], staging_path)
+
+        if linked:
+            changed, status = server_file_names(previous, read_manifest_if_present(staging_path)), "linked"
+        elif previous_archive.get("members") is not None and os.path.isdir(server_path):
+            # Re-upload of a server ingested with member records: only touch the members that changed
+            link_files(server_path, staging_path)
+            changed = apply_archive_delta(zip_path, staging_path, previous, archive)
+            publish_blob(archive["sha256"], staging_path)
+            status = "updated" if changed else "unchanged"
+        else:
+            create_directory(staging_path)
+            json_found = extract_and_process_json(zip_path, staging_path)
 
-        if not json_found:
-            shutil.rmtree(server_path)
-            logging.error(f"No JSON files found in the ZIP for server '{server_name}'.")
-            raise FileNotFoundError("No JSON files found in the ZIP")
+            if not json_found:
+                logging.error(f"No JSON files found in the ZIP for server '{server_name}'.")
+                raise FileNotFoundError("No JSON files found in the ZIP")
 
-        clean_up_folders_and_empty_files(server_path)
+            with span("ingest.cleanup"), INGEST_STAGE_DURATION.time(stage="cleanup"):
+                clean_up_folders_and_empty_files(staging_path)
+            with span("ingest.manifest"), INGEST_STAGE_DURATION.time(stage="manifest"):
+                manifest = write_server_manifest(staging_path, archive)
+            publish_blob(archive["sha256"], staging_path)
+            changed, status = server_file_names(previous, manifest), "processed"
+
+        replace_directory(staging_path, server_path)
+        if changed:
+            mark_summaries_dirty(collection_name, cluster_name, changed)
+
+        if status == "linked":
+            logging.info(f"Server '{server_name}' linked from blob store.")
+        elif status == "updated":
+            logging.info(f"Server '{server_name}' updated, changed files: {', '.join(changed)}")
+        elif status == "unchanged":
+            logging.info(f"Server '{server_name}' has no changed JSON members.")
+        return status
 
     except zipfile.BadZipFile:
         logging.error(f"Invalid ZIP file: {file.filename}")
         raise ValueError("Invalid ZIP file")
     except Exception as e:
         logging.error(f"Error processing server '{server_name}': {str(e)}")
-        shutil.rmtree(server_path, ignore_errors=True)
         raise
     finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
         if os.path.exists(zip_path):
             os.remove(zip_path)
 
 
+def read_archive_members(zip_path):
+    """Returns the CRC32 and size of every JSON member, read from the ZIP central directory only."""
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        return {
+            info.filename: {"crc": info.CRC, "size": info.file_size}
+            for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(".json")
+        }
+
+
+def server_file_names(*manifests):
+    """All normalized files listed by the given manifests, i.e. everything a replaced server contributes."""
+    return {file_name for manifest in manifests if manifest for file_name in manifest.get("files", {})}
+
+
+def apply_archive_delta(zip_path, server_path, previous, archive):
+    """
+    Brings a server folder in line with a new archive by re-extracting only the members whose
+    CRC32 or size differ from the previous ingest, and dropping the files of removed members.
+    Returns the sorted names of the normalized files that changed.
+    """
+    previous_members = previous["archive"]["members"]
+    members = archive["members"]
+    changed_members = [name for name, info in members.items() if previous_members.get(name) != info]
+    removed_members = [name for name in previous_members if name not in members]
+    changed = sorted({os.path.basename(name) for name in changed_members + removed_members})
+
+    with span("ingest.delta", changed=len(changed_members), removed=len(removed_members)) as delta_span, \
+            INGEST_STAGE_DURATION.time(stage="delta"):
+        for name in removed_members:
+            output_file_path = get_path(server_path, os.path.basename(name))
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path)
+
+        scratch_path = get_path(server_path, f".delta-{uuid.uuid4().hex}")
+        try:
+            with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                check_archive_budget(zip_ref, changed_members)
+                for name in changed_members:
+                    input_file_path = zip_ref.extract(name, scratch_path)
+                    output_file_path = get_path(server_path, os.path.basename(name))
+                    # Unlink first: the old file is a hardlink shared with the live folder and the blob store
+                    if os.path.exists(output_file_path):
+                        os.remove(output_file_path)
+                    normalize_json_file(input_file_path, output_file_path)
+                    if os.path.exists(output_file_path) and is_file_empty(output_file_path):
+                        os.remove(output_file_path)
+            extracted_bytes = sum(members[name]["size"] for name in changed_members)
+            delta_span.set(bytes=extracted_bytes)
+            BYTES_PROCESSED.inc(extracted_bytes, stage="extract")
+        finally:
+            shutil.rmtree(scratch_path, ignore_errors=True)
+
+        write_server_manifest(server_path, archive, previous, changed)
+    return changed
+
+
 def extract_and_process_json(zip_path, server_path):
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+    with span("ingest.extract") as extract_span, INGEST_STAGE_DURATION.time(stage="extract"), \
+            zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        extracted_bytes = check_archive_budget(zip_ref)
         zip_ref.extractall(server_path)
+        extract_span.set(bytes=extracted_bytes, members=len(zip_ref.infolist()))
+        BYTES_PROCESSED.inc(extracted_bytes, stage="extract")
 
     json_found = False
-    for root, _, files in os.walk(server_path):
-        for file_name in files:
-            if file_name.lower().endswith(".json"):
-                json_found = True
-                input_file_path = get_path(root, file_name)
-                output_file_path = get_path(server_path, file_name)
-
-                if file_name == "0_listing-audit-logs.json":
-                    convert_logs_to_json(input_file_path, output_file_path)
-                else:
-                    fix_and_save_json(input_file_path, output_file_path)
+    with span("ingest.repair") as repair_span, INGEST_STAGE_DURATION.time(stage="repair"):
+        for root, _, files in os.walk(server_path):
+            for file_name in files:
+                if file_name.lower().endswith(".json"):
+                    json_found = True
+                    repair_span.set(files=repair_span.attributes.get("files", 0) + 1)
+                    normalize_json_file(get_path(root, file_name), get_path(server_path, file_name))
 
     return json_found
 
 
+def normalize_json_file(input_file_path, output_file_path):
+    if os.path.basename(input_file_path) == LOG_LISTING_FILE:
+        convert_logs_to_json(input_file_path, output_file_path)
+    else:
+        fix_and_save_json(input_file_path, output_file_path)
+
+
 def clean_up_folders_and_empty_files(server_path):
     for root, dirs, files in os.walk(server_path, topdown=False):
         for file_name in files:
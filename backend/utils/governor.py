@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from utils.metrics import ADMISSION_REJECTED, ADMISSION_WAIT
+
+# Load environment variables
+load_dotenv()
+
+# Concurrent jobs allowed per workload class, within one worker process
+WORKLOAD_LIMITS = {
+    "ingest": int(os.getenv("INGEST_CONCURRENCY", 2)),
+    "aggregation": int(os.getenv("AGGREGATION_CONCURRENCY", 2)),
+    "chart": int(os.getenv("CHART_CONCURRENCY", 2)),
+    "report": int(os.getenv("REPORT_CONCURRENCY", 1)),
+}
+# How long a new request may queue for a slot before it is turned away, and the Retry-After it gets
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", 5))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 30))
+# New jobs are refused while the worker's resident memory is above this budget (0 disables the check)
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", 2048))
+
+# Decompression budget of one uploaded archive, checked on the ZIP central directory before extracting
+MAX_EXTRACTED_BYTES = int(os.getenv("MAX_EXTRACTED_MB", 2048)) * 1024 * 1024
+MAX_ARCHIVE_MEMBERS = int(os.getenv("MAX_ARCHIVE_MEMBERS", 10000))
+MAX_COMPRESSION_RATIO = int(os.getenv("MAX_COMPRESSION_RATIO", 200))
+
+
+class Overloaded(Exception):
+    """Raised when a job cannot be admitted now; `retry_after` is the suggested delay in seconds."""
+
+    def __init__(self, message, retry_after=ADMISSION_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ArchiveTooLarge(ValueError):
+    """Raised when an archive would decompress beyond the configured budget."""
+
+
+def current_rss_bytes():
+    """Current (not peak) resident memory of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ResourceGovernor:
+    """
+    Limits how many jobs of each workload class run at once.
+    Entry points (an upload, a report generation) wait at most `timeout` for a slot and are
+    rejected with Overloaded otherwise, so the client can retry later. Stages that run inside an
+    already admitted job wait for their slot instead, which queues the work without failing it;
+    they must run inside that job, so the number of waiters stays bounded by the entry point limits.
+    """
+
+    def __init__(self, limits, timeout, memory_budget_bytes):
+        self.timeout = timeout
+        self.memory_budget_bytes = memory_budget_bytes
+        self._semaphores = {workload: threading.BoundedSemaphore(limit) for workload, limit in limits.items()}
+
+    def check_memory(self, workload):
+        rss = current_rss_bytes()
+        if self.memory_budget_bytes and rss is not None and rss > self.memory_budget_bytes:
+            ADMISSION_REJECTED.inc(workload=workload, reason="memory")
+            logging.warning(f"Refusing {workload} job: RSS {rss // (1024 * 1024)} MiB is over the memory budget.")
+            raise Overloaded("Server is low on memory, please retry later.")
+
+    @contextmanager
+    def admit(self, workload, blocking=False):
+        semaphore = self._semaphores[workload]
+        if not blocking:
+            self.check_memory(workload)
+
+        started = time.perf_counter()
+        if not semaphore.acquire(timeout=None if blocking else self.timeout):
+            ADMISSION_REJECTED.inc(workload=workload, reason="busy")
+            logging.warning(f"Refusing {workload} job: all {workload} slots are busy.")
+            raise Overloaded(f"Too many {workload} jobs in progress, please retry later.")
+        ADMISSION_WAIT.observe(time.perf_counter() - started, workload=workload)
+
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+GOVERNOR = ResourceGovernor(WORKLOAD_LIMITS, ADMISSION_TIMEOUT, MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+def check_archive_budget(zip_ref, member_names=None):
+    """
+    Rejects ZIP bombs using the sizes declared in the central directory, before anything is extracted.
+    zipfile never inflates a member beyond its declared size, so the declared sizes are a hard bound.
+    """
+    members = [
+        info for info in zip_ref.infolist()
+        if not info.is_dir() and (member_names is None or info.filename in member_names)
+    ]
+    if len(members) > MAX_ARCHIVE_MEMBERS:
+        raise ArchiveTooLarge(f"Archive has {len(members)} members, the limit is {MAX_ARCHIVE_MEMBERS}.")
+
+    extracted_bytes = sum(info.file_size for info in members)
+    if extracted_bytes > MAX_EXTRACTED_BYTES:
+        raise ArchiveTooLarge(
+            f"Archive expands to {extracted_bytes} bytes, the limit is {MAX_EXTRACTED_BYTES}."
+        )
+
+    for info in members:
+        if info.file_size > 1024 * 1024 and info.file_size > MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+            raise ArchiveTooLarge(f"Member '{info.filename}' has a suspicious compression ratio.")
+    return extracted_bytes
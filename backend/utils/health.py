@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+
+from config.settings import HEALTH_METRICS, HEALTH_RULES
+from utils.repository import LRUCache, get_collection_file_path, load_json_file
+
+OK, WARNING = "OK", "Warning"
+# Part of every cache key and report fingerprint, so editing the rules re-evaluates everything
+RULES_FINGERPRINT = hashlib.sha256(json.dumps([HEALTH_METRICS, HEALTH_RULES], sort_keys=True).encode("utf-8")).hexdigest()
+SUMMARY_FILES = sorted({metric["summary"] for metric in HEALTH_METRICS.values()})
+# Evaluated clusters kept in memory, keyed by collection, cluster and summary fingerprint
+HEALTH_CACHE_ENTRIES = 4096
+
+_results_cache = LRUCache(HEALTH_CACHE_ENTRIES)
+
+
+def summary_fingerprint(collection_name, cluster_name):
+    """Hashes the size and modification time of the summaries the rules read."""
+    digest = hashlib.sha256(RULES_FINGERPRINT.encode("utf-8"))
+    for file_name in SUMMARY_FILES:
+        path = get_collection_file_path(collection_name, cluster_name, file_name, "summary")
+        try:
+            stat = os.stat(path)
+            digest.update(f"{file_name}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+        except FileNotFoundError:
+            digest.update(f"{file_name}|missing".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_summary_columns(collection_name, cluster_names, file_name, key):
+    """
+    Flattens one summary file of every cluster into columns with a row per entry: cluster index,
+    label and count. Also returns which clusters have the file with at least one entry.
+    """
+    import numpy as np  # Loaded on first use, keeps numpy out of read-only workers
+
+    available = np.zeros(len(cluster_names), dtype=bool)
+    cluster_index, labels, counts = [], [], []
+    for i, cluster_name in enumerate(cluster_names):
+        try:
+            entries = load_json_file(get_collection_file_path(collection_name, cluster_name, file_name, "summary"))
+        except (OSError, ValueError):
+            continue
+        if not entries:
+            continue
+        available[i] = True
+        cluster_index.extend([i] * len(entries))
+        labels.extend(entry.get(key) for entry in entries)
+        counts.extend(entry.get("Count", 0) for entry in entries)
+
+    labels_array = np.empty(len(labels), dtype=object)
+    labels_array[:] = labels
+    return available, np.array(cluster_index, dtype=np.int64), labels_array, np.array(counts, dtype=np.float64)
+
+
+def top_labels(cluster_index, labels, counts, cluster_count):
+    """Most frequent labelled entry of every cluster (the first one on ties), or None."""
+    import numpy as np
+
+    top = np.full(cluster_count, None, dtype=object)
+    labelled = np.fromiter((bool(label) for label in labels), dtype=bool, count=len(labels))
+    if labelled.any():
+        index, label, count = cluster_index[labelled], labels[labelled], counts[labelled]
+        order = np.lexsort((np.arange(len(index)), -count, index))
+        clusters, first = np.unique(index[order], return_index=True)
+        top[clusters] = label[order][first]
+    return top
+
+
+def evaluate_rules(collection_name, cluster_names):
+    """
+    Evaluates every rule for every given cluster in one pass: each summary file is loaded once into
+    columns, metrics are per-cluster sums (np.bincount) and rule checks are array operations.
+    Returns one {rule id: {"state", "message", "value", "slot"}} dict per cluster.
+    """
+    import numpy as np
+
+    n = len(cluster_names)
+    columns, values, available, top = {}, {}, {}, {}
+    for name, metric in HEALTH_METRICS.items():
+        source = (metric["summary"], metric["key"])
+        if source not in columns:
+            columns[source] = load_summary_columns(collection_name, cluster_names, *source)
+        has_file, cluster_index, labels, counts = columns[source]
+        weights = counts * (labels == metric["match"]) if "match" in metric else counts
+        values[name] = np.bincount(cluster_index, weights=weights, minlength=n)
+        available[name] = has_file
+
+    for rule in HEALTH_RULES:
+        if rule.get("top_label_of") and rule["top_label_of"] not in top:
+            metric = HEALTH_METRICS[rule["top_label_of"]]
+            _, cluster_index, labels, counts = columns[(metric["summary"], metric["key"])]
+            top[rule["top_label_of"]] = top_labels(cluster_index, labels, counts, n)
+
+    results = [{} for _ in cluster_names]
+    not_evaluated = {}
+    for rule in HEALTH_RULES:
+        check = rule["check"]
+        metrics = [values[name] for name in check["metrics"]]
+        unavailable = ~np.logical_and.reduce([available[name] for name in check["metrics"]])
+
+        if check["type"] == "percent_difference":
+            first, second = metrics
+            total = first + second
+            empty = ~unavailable & (total == 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                value = np.abs(first - second) / total * 100
+        elif check["type"] == "total":
+            value = np.sum(metrics, axis=0)
+            empty = np.zeros(n, dtype=bool)
+        else:
+            raise ValueError(f"Unsupported health check type: {check['type']}")
+
+        labels = top.get(rule.get("top_label_of"))
+        fired = ~unavailable & ~empty & (value > rule["above"])
+        if labels is not None:
+            fired &= labels != None  # noqa: E711, element-wise comparison
+
+        skipped = not_evaluated.get(rule.get("depends_on"), np.zeros(n, dtype=bool))
+        not_evaluated[rule["id"]] = unavailable | empty | skipped
+
+        for i in range(n):
+            if skipped[i]:
+                state, message = WARNING, ""
+            elif unavailable[i]:
+                state, message = WARNING, rule["unavailable_message"]
+            elif empty[i]:
+                state, message = WARNING, rule.get("empty_message", "")
+            elif fired[i]:
+                top_label = labels[i] if labels is not None else None
+                state, message = WARNING, rule["message"].format(value=value[i], top_label=top_label)
+            else:
+                state, message = OK, ""
+            results[i][rule["id"]] = {
+                "state": state,
+                "message": message,
+                "value": None if unavailable[i] or empty[i] else float(value[i]),
+                "slot": rule.get("slot"),
+            }
+    return results
+
+
+def evaluate_health(collection_name, cluster_names):
+    """
+    Returns {cluster: {rule id: result}} for the given clusters. Results are cached per summary
+    fingerprint; all clusters missing from the cache are evaluated together in a single pass.
+    The returned dicts are shared with the cache and must be treated as read-only.
+    """
+    results, pending = {}, {}
+    for cluster_name in cluster_names:
+        fingerprint = summary_fingerprint(collection_name, cluster_name)
+        cached = _results_cache.get((collection_name, cluster_name, fingerprint))
+        if cached is None:
+            pending[cluster_name] = fingerprint
+        else:
+            results[cluster_name] = cached
+
+    if pending:
+        for cluster_name, result in zip(pending, evaluate_rules(collection_name, list(pending))):
+            _results_cache.put((collection_name, cluster_name, pending[cluster_name]), result, 1)
+            results[cluster_name] = result
+    return {cluster_name: results[cluster_name] for cluster_name in cluster_names}
+
+
+def overall_state(result):
+    return WARNING if any(rule["state"] != OK for rule in result.values()) else OK
+
+
+def health_placeholders(result):
+    """Maps the rules with a report slot to their [warning_N] / [message_N] placeholders."""
+    placeholders = {}
+    for rule in result.values():
+        if rule["slot"] is not None:
+            placeholders[f"[warning_{rule['slot']}]"] = rule["state"]
+            placeholders[f"[message_{rule['slot']}]"] = rule["message"]
+    return placeholders
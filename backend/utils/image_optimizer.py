@@ -0,0 +1,77 @@
+import hashlib
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from utils.manifest import hash_file
+from utils.utils import TEMP_DIR, create_and_get_path, get_path
+
+# Load environment variables
+load_dotenv()
+
+# Charts are rendered at 300 DPI for the web view; in a report they only need the resolution of their printed size
+REPORT_IMAGE_DPI = int(os.getenv("REPORT_IMAGE_DPI", 150))
+# Palette size report images are quantized to; 0 keeps them in full color
+REPORT_IMAGE_COLORS = int(os.getenv("REPORT_IMAGE_COLORS", 256))
+# Charts with more pixels than this are embedded as rendered instead of being converted, which would take
+# about 15 bytes per pixel (0 lifts the limit; Pillow's own decompression bomb check still applies)
+REPORT_IMAGE_MAX_PIXELS = int(os.getenv("REPORT_IMAGE_MAX_PIXELS", 150_000_000))
+# Report-ready copies of the charts, named after the hash of their source content and settings
+REPORT_IMAGES_DIR = create_and_get_path(TEMP_DIR, "report-images")
+
+
+def get_report_image_key(image_path, width_inches):
+    settings = f"{hash_file(image_path)}|{width_inches}|{REPORT_IMAGE_DPI}|{REPORT_IMAGE_COLORS}"
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+def optimize_report_image(image_path, width_inches):
+    """
+    Returns a copy of a chart sized for printing at `width_inches`: downsampled to REPORT_IMAGE_DPI,
+    flattened on white, quantized to a palette and written as an optimized PNG.
+    Copies are keyed by content hash, so a chart is converted once and identical charts of every
+    cluster and collection share one copy. Falls back to the original image if conversion fails.
+    """
+    output_path = get_path(REPORT_IMAGES_DIR, f"{get_report_image_key(image_path, width_inches)}.png")
+    if os.path.exists(output_path):
+        os.utime(output_path)  # Recently used copies survive TEMP_DIR clean-up longest
+        return output_path
+
+    from PIL import Image  # Only report workers pay for loading Pillow
+
+    temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with Image.open(image_path) as source:
+            # Opening only reads the header; checked here rather than through Image.MAX_IMAGE_PIXELS,
+            # which is shared by every user of Pillow in the process
+            pixels = source.width * source.height
+            if REPORT_IMAGE_MAX_PIXELS and pixels > REPORT_IMAGE_MAX_PIXELS:
+                logging.warning(
+                    f"Image '{image_path}' exceeds REPORT_IMAGE_MAX_PIXELS ({pixels} > {REPORT_IMAGE_MAX_PIXELS} pixels), "
+                    "embedding the original"
+                )
+                return image_path
+            rgba = source.convert("RGBA")
+        image = Image.alpha_composite(Image.new("RGBA", rgba.size, "white"), rgba).convert("RGB")
+
+        target_width = round(width_inches * REPORT_IMAGE_DPI)
+        if image.width > target_width:
+            target_height = max(1, round(image.height * target_width / image.width))
+            image = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        if REPORT_IMAGE_COLORS:
+            # No dithering: charts are flat colors and dithered text looks noisy
+            image = image.quantize(REPORT_IMAGE_COLORS, Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+
+        image.save(temp_path, "PNG", optimize=True, dpi=(REPORT_IMAGE_DPI, REPORT_IMAGE_DPI))
+        os.replace(temp_path, output_path)
+        return output_path
+    except Image.DecompressionBombError as e:
+        logging.warning(f"Image '{image_path}' exceeds Pillow's pixel limit, embedding the original: {e}")
+        return image_path
+    except Exception as e:
+        logging.warning(f"Could not optimize image '{image_path}', embedding the original: {e}")
+        return image_path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
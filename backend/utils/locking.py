@@ -0,0 +1,95 @@
+import fcntl
+import os
+import shutil
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from dotenv import load_dotenv
+from utils.utils import TEMP_DIR, create_and_get_path, get_path, is_valid_name
+
+# Load environment variables
+load_dotenv()
+
+# Lock files live under TEMP_DIR/locks; flock locks are released by the kernel if a worker dies
+LOCKS_DIR = create_and_get_path(TEMP_DIR, "locks")
+LOCK_TIMEOUT = float(os.getenv("LOCK_TIMEOUT", 600))
+LOCK_POLL_INTERVAL = 0.05
+
+
+@contextmanager
+def file_lock(name, shared=False, timeout=LOCK_TIMEOUT):
+    """
+    Holds an flock on LOCKS_DIR/<name>.lock, shared or exclusive.
+    Works across processes and, since every call opens its own file description, across threads too.
+    """
+    # Names embed collection and cluster names, keep them from escaping LOCKS_DIR
+    if not is_valid_name(name):
+        raise ValueError(f"Invalid lock name: {name}")
+
+    mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    deadline = time.monotonic() + timeout
+    with open(get_path(LOCKS_DIR, f"{name}.lock"), "a") as f:
+        while True:
+            try:
+                fcntl.flock(f, mode | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for lock '{name}'.")
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def cluster_lock(collection_name, cluster_name, shared=False):
+    """
+    Exclusive while a cluster is aggregated or deleted; shared while its servers are ingested
+    or its reports are built, so those can run side by side but never during aggregation.
+    """
+    return file_lock(f"cluster.{collection_name}.{cluster_name}", shared)
+
+
+def server_lock(collection_name, cluster_name, server_name):
+    return file_lock(f"server.{collection_name}.{cluster_name}.{server_name}")
+
+
+@contextmanager
+def cluster_locks(collection_name, cluster_names, shared=False):
+    """Locks several clusters, always in sorted order so two callers can never deadlock."""
+    with ExitStack() as stack:
+        for cluster_name in sorted(set(cluster_names)):
+            stack.enter_context(cluster_lock(collection_name, cluster_name, shared))
+        yield
+
+
+@contextmanager
+def staged_directory(target_dir):
+    """
+    Yields a hidden scratch folder beside `target_dir`. When the block succeeds, every file written
+    to it is moved into `target_dir` with os.replace, so readers see either the old or the new file,
+    never a partial one. On failure the scratch folder is dropped and `target_dir` is left untouched.
+    """
+    parent, name = os.path.split(target_dir)
+    staging_dir = create_and_get_path(parent, f".staging-{name}-{uuid.uuid4().hex}")
+    try:
+        yield staging_dir
+        os.makedirs(target_dir, exist_ok=True)
+        for file_name in sorted(os.listdir(staging_dir)):
+            os.replace(get_path(staging_dir, file_name), get_path(target_dir, file_name))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def replace_directory(staging_dir, target_dir):
+    """Swaps a fully built folder into place with two renames, then removes the old copy."""
+    retired_dir = None
+    if os.path.exists(target_dir):
+        parent, name = os.path.split(target_dir)
+        retired_dir = get_path(parent, f".retired-{name}-{uuid.uuid4().hex}")
+        os.rename(target_dir, retired_dir)
+    os.rename(staging_dir, target_dir)
+    if retired_dir:
+        shutil.rmtree(retired_dir, ignore_errors=True)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+from utils.locking import file_lock
+from utils.repository import load_json_file, save_json
+from utils.utils import BASE_DIR, get_path
+
+MANIFEST_FILE = ".manifest.json"
+LOG_LISTING_FILE = "0_listing-audit-logs.json"
+MANIFEST_VERSION = 1
+DIRTY_SUMMARIES_FILE = ".dirty.json"
+LOG_LISTING_STATS = ("earliest_date", "latest_date", "entry_count", "total", "total_size")
+
+
+def parse_log_dates(log_dates):
+    """
+    Vectorized counterpart of parse_log_date for a whole listing.
+    Dates with a time ("Nov 5 13:44") get the current year, dates without one ("Nov 5 2023") keep theirs.
+    """
+    import pandas as pd  # Loaded on first use, keeps pandas out of read-only workers
+
+    dates = pd.Series(log_dates, dtype="object").astype(str)
+    has_time = dates.str.contains(":", regex=False)
+    current_year = datetime.now().year
+
+    parsed = pd.Series(pd.NaT, index=dates.index, dtype="datetime64[ns]")
+    parsed[has_time] = pd.to_datetime(dates[has_time] + f" {current_year}", format="%b %d %H:%M %Y", errors="coerce")
+    parsed[~has_time] = pd.to_datetime(dates[~has_time], format="%b %d %Y", errors="coerce")
+
+    invalid = parsed.isna()
+    if invalid.any():
+        raise ValueError(f"Invalid log date format: {dates[invalid].iloc[0]}")
+    return parsed
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_server_manifest(server_path, archive=None, previous=None, changed=()):
+    """
+    Computes the statistics of a normalized server folder in a single pass over its files.
+    `archive` describes the uploaded ZIP (name, size, sha256, members) the folder was built from.
+    When a `previous` manifest is given, the records of files not listed in `changed` are reused
+    instead of reading and hashing the files again.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "archive": archive,
+        "earliest_date": None,
+        "latest_date": None,
+        "entry_count": 0,
+        "total": 0,
+        "total_size": 0,
+        "files": {},
+    }
+
+    for file_name in sorted(os.listdir(server_path)):
+        file_path = get_path(server_path, file_name)
+        if file_name.startswith(".") or not file_name.endswith(".json") or not os.path.isfile(file_path):
+            continue
+
+        record = (previous or {}).get("files", {}).get(file_name)
+        if record and file_name not in changed and record["bytes"] == os.path.getsize(file_path):
+            manifest["files"][file_name] = record
+            if file_name == LOG_LISTING_FILE:
+                manifest.update({key: previous[key] for key in LOG_LISTING_STATS})
+            continue
+
+        try:
+            data = load_json_file(file_path)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to read JSON file: {file_path}")
+            data = None
+
+        if file_name == LOG_LISTING_FILE and isinstance(data, dict):
+            logs = data.get("logs", [])
+            rows = len(logs)
+            manifest["entry_count"] = rows
+            manifest["total"] = data.get("total", 0)
+            manifest["total_size"] = sum(log.get("size", 0) for log in logs)
+            dates = parse_log_dates([log["date"] for log in logs if log.get("date")])
+            if not dates.empty:
+                manifest["earliest_date"] = dates.min().isoformat()
+                manifest["latest_date"] = dates.max().isoformat()
+        else:
+            rows = len(data) if isinstance(data, list) else 0
+
+        manifest["files"][file_name] = {
+            "rows": rows,
+            "bytes": os.path.getsize(file_path),
+            "sha256": hash_file(file_path),
+        }
+
+    return manifest
+
+
+def write_server_manifest(server_path, archive=None, previous=None, changed=()):
+    manifest = build_server_manifest(server_path, archive, previous, changed)
+    save_json(get_path(server_path, MANIFEST_FILE), manifest)
+    return manifest
+
+
+def load_server_manifest(collection_name, cluster_name, server_name):
+    """
+    Returns the server manifest, (re)building it when it is missing or older than the log listing.
+    Folders ingested before manifests existed are upgraded on first read.
+    """
+    server_path = get_path(BASE_DIR, collection_name, cluster_name, "servers", server_name)
+    manifest_path = get_path(server_path, MANIFEST_FILE)
+    log_path = get_path(server_path, LOG_LISTING_FILE)
+
+    try:
+        stale = os.path.exists(log_path) and os.path.getmtime(log_path) > os.path.getmtime(manifest_path)
+        if not stale:
+            manifest = load_json_file(manifest_path)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    if not os.path.isdir(server_path):
+        raise FileNotFoundError(f"Server '{server_name}' not found.")
+    return write_server_manifest(server_path)
+
+
+def read_manifest_if_present(server_path):
+    """Reads a manifest without building it, for cheap listing endpoints."""
+    try:
+        return load_json_file(get_path(server_path, MANIFEST_FILE))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def get_dirty_summaries_path(collection_name, cluster_name):
+    return get_path(BASE_DIR, collection_name, cluster_name, DIRTY_SUMMARIES_FILE)
+
+
+def mark_summaries_dirty(collection_name, cluster_name, file_names):
+    """Records which server files changed since the cluster was last aggregated."""
+    # Servers of one cluster are ingested concurrently, so the read-modify-write needs its own lock
+    with file_lock(f"dirty.{collection_name}.{cluster_name}"):
+        dirty = load_dirty_summaries(collection_name, cluster_name) or set()
+        save_json(get_dirty_summaries_path(collection_name, cluster_name), sorted(dirty | set(file_names)))
+
+
+def load_dirty_summaries(collection_name, cluster_name):
+    """
+    Returns the names of the server files changed since the last aggregation,
+    or None when that is unknown and every summary has to be rebuilt.
+    """
+    try:
+        return set(load_json_file(get_dirty_summaries_path(collection_name, cluster_name)))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def clear_dirty_summaries(collection_name, cluster_name):
+    try:
+        os.remove(get_dirty_summaries_path(collection_name, cluster_name))
+    except FileNotFoundError:
+        pass
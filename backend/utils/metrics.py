@@ -0,0 +1,176 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast listings up to multi-minute chart and report jobs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{format_labels(self.label_names, key)} {value}" for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+
+        lines = self.header()
+        for key, (bucket_counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Holds every metric of the process and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+# Values live in the memory of the process that recorded them and /metrics renders that process only.
+# The app runs as a single Flask process (see the Dockerfile), so this is the whole picture; behind
+# several workers (gunicorn -w N, replicas) every scrape would see one worker's share, so scrape each
+# worker as its own target or move to a multiprocess collector first. cli.py pool workers are not exported.
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "chartapp_http_request_duration_seconds", "HTTP request latency per route.", ("method", "route", "status")
+))
+INGEST_STAGE_DURATION = REGISTRY.register(Histogram(
+    "chartapp_ingest_stage_duration_seconds", "Time spent per server archive in each ingest stage.", ("stage",)
+))
+CLUSTER_AGGREGATION_DURATION = REGISTRY.register(Histogram(
+    "chartapp_cluster_aggregation_duration_seconds", "Time to merge summaries and render charts for one cluster."
+))
+CHART_RENDER_DURATION = REGISTRY.register(Histogram(
+    "chartapp_chart_render_duration_seconds", "Time to render one chart, per CHART_CONFIG key.", ("chart",)
+))
+REPORT_BUILD_DURATION = REGISTRY.register(Histogram(
+    "chartapp_report_build_duration_seconds", "Time to build one cluster DOCX report."
+))
+ZIP_PACKAGING_DURATION = REGISTRY.register(Histogram(
+    "chartapp_zip_packaging_duration_seconds", "Time spent packaging one report bundle, excluding time waiting on the client."
+))
+BYTES_PROCESSED = REGISTRY.register(Counter(
+    "chartapp_bytes_processed_total", "Bytes processed per pipeline stage.", ("stage",)
+))
+STARTUP_DURATION = REGISTRY.register(Gauge(
+    "chartapp_startup_seconds", "Time from the first line of app.py until the app was ready."
+))
+STARTUP_RSS = REGISTRY.register(Gauge(
+    "chartapp_startup_max_rss_bytes", "Peak resident memory of the worker right after startup."
+))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chartapp_jobs_in_flight", "Jobs currently running, per job type.", ("job",)
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "chartapp_admission_rejected_total", "Jobs turned away by the resource governor.", ("workload", "reason")
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "chartapp_admission_wait_seconds", "Time jobs waited for a free slot, per workload.", ("workload",)
+))
+REAPER_REMOVED = REGISTRY.register(Counter(
+    "chartapp_reaper_removed_total", "Entries removed by the background reaper, per policy.", ("kind",)
+))
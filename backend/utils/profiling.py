@@ -0,0 +1,58 @@
+import cProfile
+import functools
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+from flask import current_app, request, url_for
+from utils.utils import TEMP_DIR, create_and_get_path
+
+# Load environment variables
+load_dotenv()
+
+# Profiling must be switched on per deployment; the header or query flag alone does nothing
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+PROFILES_DIR = os.path.join(TEMP_DIR, "profiles")
+PROFILE_HEADER = "X-Profile"
+
+
+def profiling_requested():
+    """Checks whether the caller asked for a profile via the X-Profile header or ?profile=1."""
+    flag = request.headers.get(PROFILE_HEADER) or request.args.get("profile")
+    return PROFILING_ENABLED and (flag or "").lower() in ("1", "true", "yes")
+
+
+def profile_request(name):
+    """
+    Runs the decorated view under cProfile when profiling is requested.
+    The stats are written to TEMP_DIR/profiles as a .pstats file and linked from the response,
+    both as an X-Profile-Url header and, for JSON bodies, a "profile_url" field.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not profiling_requested():
+                return view(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(view, *args, **kwargs)
+            finally:
+                filename = f"{name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}.pstats"
+                profiler.dump_stats(os.path.join(create_and_get_path(PROFILES_DIR), filename))
+                logging.info(f"Request profile written to {filename}")
+
+            response = current_app.make_response(result)
+            profile_url = url_for("download_profile", filename=filename, _external=True)
+            response.headers["X-Profile-Url"] = profile_url
+            if response.is_json and isinstance(response.get_json(silent=True), dict):
+                payload = response.get_json()
+                payload["profile_url"] = profile_url
+                response.set_data(current_app.json.dumps(payload))
+            return response
+
+        return wrapper
+
+    return decorator
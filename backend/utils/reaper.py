@@ -0,0 +1,313 @@
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from utils.image_optimizer import REPORT_IMAGES_DIR
+from utils.locking import file_lock
+from utils.manifest import read_manifest_if_present
+from utils.metrics import REAPER_REMOVED
+from utils.storage import REPORT_STORAGE, STORAGE_BACKEND
+from utils.tracing import TRACE_FILES
+from utils.trash import TRASH_DIR_NAME, get_trash_dir, move_to_trash
+from utils.upload_staging import UPLOADS_DIR
+from utils.utils import BASE_DIR, BLOBS_DIR, REPORTS_DIR, TEMP_DIR, get_path
+
+# Load environment variables
+load_dotenv()
+
+# Seconds between reaper passes in each app process (0 disables the background reaper)
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", 300))
+# Files and folders the reaper removes per second at most, so it never starves request I/O
+REAPER_OPS_PER_SECOND = float(os.getenv("REAPER_OPS_PER_SECOND", 1000))
+# Retention budgets; 0 disables a budget
+TEMP_MAX_AGE_HOURS = float(os.getenv("TEMP_MAX_AGE_HOURS", 7 * 24))
+TEMP_MAX_MB = float(os.getenv("TEMP_MAX_MB", 1024))
+UPLOAD_MAX_AGE_HOURS = float(os.getenv("UPLOAD_MAX_AGE_HOURS", 24))
+REPORT_MAX_AGE_DAYS = float(os.getenv("REPORT_MAX_AGE_DAYS", 0))
+REPORTS_MAX_MB = float(os.getenv("REPORTS_MAX_MB", 0))
+# Unused blobs and abandoned scratch folders younger than this are left alone, they may still be in use
+BLOB_GRACE_HOURS = float(os.getenv("BLOB_GRACE_HOURS", 1))
+
+TRASH_ROOTS = (BASE_DIR, REPORTS_DIR, BLOBS_DIR, TEMP_DIR)
+# Same folder as utils.profiling.PROFILES_DIR, which cannot be imported without Flask
+PROFILES_DIR = get_path(TEMP_DIR, "profiles")
+THROTTLE_BATCH = 50
+HOUR = 3600
+MB = 1024 * 1024
+
+_reaper_thread = None
+
+
+class Throttle:
+    """Paces filesystem operations to a rate, sleeping once per batch rather than per operation."""
+
+    def __init__(self, rate=REAPER_OPS_PER_SECOND):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.started = time.monotonic()
+        self.count = 0
+
+    def tick(self):
+        self.count += 1
+        if self.interval and self.count % THROTTLE_BATCH == 0:
+            delay = self.started + self.count * self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def remove_tree(path, throttle):
+    """Deletes a file or folder bottom-up, one throttled unlink at a time."""
+    if os.path.islink(path) or not os.path.isdir(path):
+        os.remove(path)
+        throttle.tick()
+        return
+    for directory, dir_names, file_names in os.walk(path, topdown=False):
+        for name in file_names:
+            os.remove(get_path(directory, name))
+            throttle.tick()
+        for name in dir_names:
+            dir_path = get_path(directory, name)
+            if os.path.islink(dir_path):
+                os.remove(dir_path)
+            else:
+                os.rmdir(dir_path)
+            throttle.tick()
+    os.rmdir(path)
+    throttle.tick()
+
+
+def select_expired(entries, max_age, max_bytes, now):
+    """
+    Picks the entries ({"size", "modified", ...}) a retention policy removes: every entry older than
+    `max_age` seconds, then the oldest remaining ones until the rest fits in `max_bytes`.
+    """
+    expired, kept = [], []
+    for entry in sorted(entries, key=lambda entry: entry["modified"]):
+        (expired if max_age and now - entry["modified"] > max_age else kept).append(entry)
+
+    total = sum(entry["size"] for entry in kept)
+    for entry in kept:
+        if not max_bytes or total <= max_bytes:
+            break
+        expired.append(entry)
+        total -= entry["size"]
+    return expired
+
+
+def list_files(directory, pattern_suffix=""):
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return []
+    files = []
+    for entry in entries:
+        if entry.is_file() and not entry.name.startswith(".") and entry.name.endswith(pattern_suffix):
+            stat = entry.stat()
+            files.append({"path": entry.path, "size": stat.st_size, "modified": stat.st_mtime})
+    return files
+
+
+def stat_files(paths):
+    files = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files.append({"path": path, "size": stat.st_size, "modified": stat.st_mtime})
+    return files
+
+
+def empty_trash(throttle, now=None):
+    removed = 0
+    for root in TRASH_ROOTS:
+        trash_dir = get_trash_dir(root)
+        if not os.path.isdir(trash_dir):
+            continue
+        for name in os.listdir(trash_dir):
+            try:
+                remove_tree(get_path(trash_dir, name), throttle)
+                removed += 1
+            except OSError as e:
+                logging.warning(f"Reaper could not remove '{name}' from {trash_dir}: {e}")
+    return removed
+
+
+def reap_temp_files(throttle, now):
+    """Legacy report ZIPs, cached report images, profiles and trace files share one age and size budget."""
+    entries = [
+        *list_files(TEMP_DIR, ".zip"),
+        *list_files(REPORT_IMAGES_DIR),
+        *list_files(PROFILES_DIR),
+        *stat_files(TRACE_FILES),
+    ]
+    expired = select_expired(entries, TEMP_MAX_AGE_HOURS * HOUR, TEMP_MAX_MB * MB, now)
+    for entry in expired:
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+        throttle.tick()
+    return len(expired)
+
+
+def reap_uploads(throttle, now):
+    """Drops chunked uploads nobody has written to within UPLOAD_MAX_AGE_HOURS."""
+    if not UPLOAD_MAX_AGE_HOURS or not os.path.isdir(UPLOADS_DIR):
+        return 0
+    removed = 0
+    for entry in os.scandir(UPLOADS_DIR):
+        if not entry.is_dir():
+            continue
+        last_write = max((file.stat().st_mtime for file in os.scandir(entry.path)), default=entry.stat().st_mtime)
+        if now - last_write > UPLOAD_MAX_AGE_HOURS * HOUR and move_to_trash(entry.path, TEMP_DIR):
+            removed += 1
+            throttle.tick()
+    return removed
+
+
+def reap_reports(throttle, now):
+    """
+    Applies the report budgets per collection, oldest collections first; reports can always be
+    regenerated. With local storage, reports of collections that no longer exist are dropped too;
+    a shared bucket may hold collections of other nodes, so it is left alone.
+    """
+    entries = []
+    for collection_name in REPORT_STORAGE.list_prefixes():
+        if collection_name.startswith("."):
+            continue
+        if STORAGE_BACKEND == "local" and not os.path.isdir(get_path(BASE_DIR, collection_name)):
+            entries.append({"collection": collection_name, "size": 0, "modified": 0, "orphan": True})
+            continue
+        items = [item for batch in REPORT_STORAGE.list(collection_name) for item in batch]
+        if items:
+            entries.append({
+                "collection": collection_name,
+                "size": sum(item["size"] for item in items),
+                "modified": max(item["modified"] for item in items),
+            })
+
+    removed = 0
+    orphans = [entry for entry in entries if entry.get("orphan")]
+    expired = select_expired(
+        [entry for entry in entries if not entry.get("orphan")], REPORT_MAX_AGE_DAYS * 24 * HOUR, REPORTS_MAX_MB * MB, now
+    )
+    for entry in orphans + expired:
+        try:
+            # Never delete reports while they are being generated
+            with file_lock(f"reports.{entry['collection']}", timeout=0):
+                REPORT_STORAGE.delete_prefix(entry["collection"])
+            removed += 1
+            throttle.tick()
+        except TimeoutError:
+            continue
+    return removed
+
+
+def referenced_blobs():
+    """
+    Archive hashes of every server folder under BASE_DIR, including folders still being staged.
+    Link counts cannot tell this: after a delta re-ingest the unchanged files of the old and the
+    new blob are the same inodes, so both blobs keep each other's files linked forever.
+    """
+    digests = set()
+    for collection in os.scandir(BASE_DIR):
+        if collection.name.startswith(".") or not collection.is_dir():
+            continue
+        for cluster in os.scandir(collection.path):
+            servers_path = get_path(cluster.path, "servers")
+            if cluster.name.startswith(".") or not os.path.isdir(servers_path):
+                continue
+            for server in os.scandir(servers_path):
+                if not server.is_dir():
+                    continue
+                manifest = read_manifest_if_present(server.path)
+                digest = ((manifest or {}).get("archive") or {}).get("sha256")
+                if digest:
+                    digests.add(digest)
+    return digests
+
+
+def collect_blobs(throttle, now):
+    """
+    Moves blobs no server folder references any more, and abandoned scratch folders, to the trash.
+    A server that links a blob while it is being collected keeps its files (they are hardlinks),
+    it only misses the deduplication.
+    """
+    removed = 0
+    grace = BLOB_GRACE_HOURS * HOUR
+    in_use = referenced_blobs()
+    for shard in sorted(os.listdir(BLOBS_DIR)):
+        shard_path = get_path(BLOBS_DIR, shard)
+        if shard == TRASH_DIR_NAME or not os.path.isdir(shard_path):
+            continue
+        if shard.startswith("."):
+            # Scratch folder of a publisher that died before renaming it into place
+            if now - os.stat(shard_path).st_mtime > grace and move_to_trash(shard_path, BLOBS_DIR):
+                removed += 1
+            continue
+        # Nothing can link or publish a blob of this shard meanwhile (see utils.blob_store.blob_lock)
+        with file_lock(f"blobs.{shard}"):
+            for digest in os.listdir(shard_path):
+                blob_path = get_path(shard_path, digest)
+                if digest not in in_use and now - os.stat(blob_path).st_mtime > grace:
+                    move_to_trash(blob_path, BLOBS_DIR)
+                    removed += 1
+                throttle.tick()
+            if not os.listdir(shard_path):
+                os.rmdir(shard_path)
+    return removed
+
+
+def run_reaper():
+    """
+    Runs one pass of every retention policy and empties the trash, returning what was removed.
+    Only one process reaps at a time; others return None straight away.
+    """
+    try:
+        with file_lock("reaper", timeout=0):
+            started = time.perf_counter()
+            throttle = Throttle()
+            now = time.time()
+            removed = {}
+            # The trash is emptied before blobs are collected, so blobs only linked from deleted
+            # collections are unused by then, and once more to free the collected blobs
+            for kind, reap in (
+                ("temp", reap_temp_files),
+                ("uploads", reap_uploads),
+                ("reports", reap_reports),
+                ("trash", empty_trash),
+                ("blobs", collect_blobs),
+                ("trash", empty_trash),
+            ):
+                try:
+                    removed[kind] = removed.get(kind, 0) + reap(throttle, now)
+                except Exception as e:
+                    logging.error(f"Reaper failed to apply the '{kind}' policy: {e}")
+    except TimeoutError:
+        return None
+
+    for kind, count in removed.items():
+        REAPER_REMOVED.inc(count, kind=kind)
+    if any(removed.values()):
+        logging.info(f"Reaper pass done in {time.perf_counter() - started:.1f}s, removed {removed}.")
+    return removed
+
+
+def start_reaper(interval=REAPER_INTERVAL):
+    """Starts the background reaper thread of this process, once."""
+    global _reaper_thread
+    if interval <= 0 or _reaper_thread is not None:
+        return
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                run_reaper()
+            except Exception as e:
+                logging.error(f"Reaper pass failed: {e}")
+
+    _reaper_thread = threading.Thread(target=loop, name="reaper", daemon=True)
+    _reaper_thread.start()
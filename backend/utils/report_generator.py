@@ -1,14 +1,50 @@
+import hashlib
+import io
 import json
 import logging
 import os
+import re
+import time
 import zipfile
-
-from docx import Document
-from docx.shared import Inches
-from flask import url_for
-
-from services.server_services import open_file
-from utils.utils import BASE_DIR, REPORTS_DIR, TEMP_DIR, TEMPLATES_DIR, get_path, parse_log_date
+from copy import deepcopy
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from dotenv import load_dotenv
+from utils.health import RULES_FINGERPRINT, evaluate_health, health_placeholders
+from utils.image_optimizer import REPORT_IMAGE_COLORS, REPORT_IMAGE_DPI, optimize_report_image
+from utils.manifest import load_server_manifest
+from utils.metrics import BYTES_PROCESSED, JOBS_IN_FLIGHT, REPORT_BUILD_DURATION, ZIP_PACKAGING_DURATION
+from utils.tracing import span
+from utils.repository import load_json_file
+from utils.storage import REPORT_STORAGE
+from utils.utils import BASE_DIR, get_path
+
+# Load environment variables
+load_dotenv()
+
+FINGERPRINTS_FILE = ".fingerprints.json"
+# Printed width of the charts in cluster reports
+REPORT_IMAGE_WIDTH_INCHES = 5
+
+# Listings with more than LOG_LISTING_HEAD + LOG_LISTING_TAIL files only show their first and last files
+# and a line summarizing the others; set both to 0 to always include every file
+LOG_LISTING_HEAD = int(os.getenv("LOG_LISTING_HEAD", 50))
+LOG_LISTING_TAIL = int(os.getenv("LOG_LISTING_TAIL", 50))
+LOG_PLACEHOLDER_PATTERN = re.compile(r"\[log_(\d+)\]")
+# Characters XML 1.0 cannot hold, e.g. control characters in odd file names
+INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def docx_document(path):
+    """Opens a Word document. python-docx is imported here so listing-only workers never load it."""
+    from docx import Document
+    return Document(path)
+
+
+def docx_shared():
+    import docx.shared
+    return docx.shared
 
 def validate_cluster_names(cluster_names):
     """Validates the cluster names input."""
@@ -47,7 +83,10 @@ def insert_images(doc, image_placeholders, image_folder):
                 image_path = os.path.join(image_folder, image_name)
                 if os.path.exists(image_path):
                     run = paragraph.add_run()
-                    run.add_picture(image_path, width=Inches(5))
+                    run.add_picture(
+                        optimize_report_image(image_path, REPORT_IMAGE_WIDTH_INCHES),
+                        width=docx_shared().Inches(REPORT_IMAGE_WIDTH_INCHES),
+                    )
 
 
 def update_summary_placeholders(summary_placeholders, summary_warning_counts, cluster_index, placeholders):
@@ -60,23 +99,29 @@ def update_summary_placeholders(summary_placeholders, summary_warning_counts, cl
 
 
 def generate_summary_report(summary_template_path, collection_name, summary_placeholders, summary_warning_counts):
-    summary_doc = Document(summary_template_path)
+    summary_doc = docx_document(summary_template_path)
     replace_placeholders(summary_doc, summary_placeholders)
     for key, value in summary_warning_counts.items():
         replace_placeholders(summary_doc, {key: str(value)})
 
-    summary_output_path = get_path(REPORTS_DIR, collection_name, 'Summary_Report.docx')
-    summary_doc.save(summary_output_path)
+    with REPORT_STORAGE.open_write(get_report_key(collection_name, 'Summary_Report.docx')) as f:
+        summary_doc.save(f)
    
 
-def process_cluster_report(template_path, collection_name, cluster_name, data):
+def process_cluster_report(template_path, collection_name, cluster_name, data, health=None):
     """
     Process the report for a single cluster.
     """
-    doc = Document(template_path)
+    with span("report.cluster", collection=collection_name, cluster=cluster_name,
+              servers=len(data.get("servers", []))), REPORT_BUILD_DURATION.time():
+        return build_cluster_report(template_path, collection_name, cluster_name, data, health)
+
+
+def build_cluster_report(template_path, collection_name, cluster_name, data, health=None):
+    doc = docx_document(template_path)
 
     # Update placeholders and document content
-    placeholders = generate_placeholders(collection_name, cluster_name, data)
+    placeholders = generate_placeholders(collection_name, cluster_name, data, health)
     replace_placeholders(doc, placeholders)
 
     # Insert logs, metadata, and images
@@ -89,13 +134,15 @@ def process_cluster_report(template_path, collection_name, cluster_name, data):
     )
 
     # Save the document
-    output_path = get_path(REPORTS_DIR, collection_name, f"{cluster_name}_Report.docx")
-    doc.save(output_path)
+    output_key = get_report_key(collection_name, f"{cluster_name}_Report.docx")
+    with REPORT_STORAGE.open_write(output_key) as f:
+        doc.save(f)
+        BYTES_PROCESSED.inc(f.tell(), stage="report")
 
-    return output_path, placeholders
+    return output_key, placeholders
 
 
-def generate_placeholders(collection_name, cluster_name, data):
+def generate_placeholders(collection_name, cluster_name, data, health=None):
     placeholders = {
         "[cluster_name]": data.get("cluster_name", ""),
         **{
@@ -105,47 +152,23 @@ def generate_placeholders(collection_name, cluster_name, data):
     }
 
     # Add warnings and messages
-    warning_result = calculate_warnings(
-        collection_name, cluster_name, "2_req-resp.json", error_file="6_error-count.json"
-    )
-    placeholders.update(warning_result)
+    placeholders.update(calculate_warnings(collection_name, cluster_name, health))
     return placeholders
 
 
-def calculate_warnings(collection_name, cluster_name, file_name, error_file=None):
+def calculate_warnings(collection_name, cluster_name, health=None):
+    """
+    Fills the warning placeholders from the health rules (see utils.health). `health` is the
+    cluster's result when the caller already evaluated the whole collection.
+    """
     try:
-        request_data = load_json_summary(collection_name, cluster_name, file_name)
-        if not request_data:
-            return default_warnings("Failed to retrieve request/response data.")
-
-        request_count, response_count = get_request_response_counts(request_data)
-        total_count = request_count + response_count
-
-        if total_count == 0:
-            return default_warnings("No Request or Response data available.")
-
-        warning_1, message_1 = evaluate_percentages(request_count, response_count, total_count)
-        warning_2, message_2 = evaluate_errors(collection_name, cluster_name, error_file)
-
-        return {
-            "[warning_1]": warning_1,
-            "[message_1]": message_1,
-            "[warning_2]": warning_2,
-            "[message_2]": message_2,
-        }
+        if health is None:
+            health = evaluate_health(collection_name, [cluster_name])[cluster_name]
+        return health_placeholders(health)
     except Exception as e:
         return default_warnings(f"Unexpected error: {e}")
 
 
-def load_json(collection_name, cluster_name, folder_name, file_name):
-    response, status_code = open_file(collection_name, cluster_name, file_name, "server", folder_name)
-    return response.get_json() if status_code == 200 else None
-
-def load_json_summary(collection_name, cluster_name, file_name):
-    response, status_code = open_file(collection_name, cluster_name, file_name, "summary")
-    return response.get_json() if status_code == 200 else None
-
-
 def default_warnings(message):
     return {
         "[warning_1]": "Warning",
@@ -155,68 +178,113 @@ def default_warnings(message):
     }
 
 
-def get_request_response_counts(data):
-    request_count = next((item["Count"] for item in data if item["Operation"] == "request"), 0)
-    response_count = next((item["Count"] for item in data if item["Operation"] == "response"), 0)
-    return request_count, response_count
-
-
-def evaluate_percentages(request_count, response_count, total_count):
-    request_percentage = (request_count / total_count) * 100
-    response_percentage = (response_count / total_count) * 100
-    if abs(response_percentage - request_percentage) > 10:
-        return "Warning", "The percentage difference between Request and Response exceeds 10%."
-    return "OK", ""
-
+def insert_logs(doc, data, collection_name, cluster_name):
+    listings = {
+        j + 1: process_log_file(collection_name, cluster_name, server.get("server_name"), "0_listing-audit-logs.json")
+        for j, server in enumerate(data.get("servers", []))
+    }
+    insert_log_listings(doc, listings)
 
-def evaluate_errors(collection_name, cluster_name, error_file):
-    if not error_file:
-        return "OK", ""
 
-    error_data = load_json_summary(collection_name, cluster_name, error_file)
-    if not error_data:
-        return "Warning", f"Failed to retrieve data from {error_file}."
+def process_log_file(collection_name, cluster_name, server_name, log_file):
+    log_file_path = get_path(BASE_DIR, collection_name, cluster_name, "servers", server_name, log_file)
+    return format_log_listing(load_json_file(log_file_path))
 
-    total_errors = sum(item["Count"] for item in error_data)
-    if total_errors > 10:
-        # Check if any "Errors" field in error_data is not null
-        non_null_errors = [item for item in error_data if item.get("Errors")]
-        if non_null_errors:
-            most_frequent_error = max(non_null_errors, key=lambda x: x["Count"])["Errors"]
-            return "Warning", f"Most frequent error: '{most_frequent_error}'."
 
-    return "OK", ""
+def format_log_entry(log):
+    return f"{log['permissions']} {log['links']} {log['owner']} {log['group']} {log['size']:>8} {log['date']} {log['name']}"
 
 
-def insert_logs(doc, data, collection_name, cluster_name):
-    servers = data.get("servers", [])
-    for j, server in enumerate(servers):
-        log_content = process_log_file(collection_name, cluster_name, server.get("server_name"), "0_listing-audit-logs.json")
-        replace_placeholders(doc, {f"[log_{j+1}]": log_content})
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
 
-def process_log_file(collection_name, cluster_name, server_name, log_file):
-    log_file_path = get_path(BASE_DIR, collection_name, cluster_name, "servers", server_name, log_file)
-    output_file_path = get_path(TEMPLATES_DIR, "log-content.txt")
-    convert_json_to_text(log_file_path, output_file_path)
-    return read_file(output_file_path)
 
-
-def convert_json_to_text(json_file_path, output_file_path):
-    with open(json_file_path, "r") as json_file:
-        data = json.load(json_file)
-    with open(output_file_path, "w") as output_file:
-        output_file.write(
-            f"total {data['total']}\n"
-            + "\n".join(
-                f"{log['permissions']} {log['links']} {log['owner']} {log['group']} {log['size']:>8} {log['date']} {log['name']}"
-                for log in data["logs"]
-            )
-        )
+def format_log_listing(data, head=LOG_LISTING_HEAD, tail=LOG_LISTING_TAIL):
+    """
+    Returns the `ls -l` lines of a server's log listing.
+    When it has more than head + tail files, only the first `head` and last `tail` are listed and the
+    files in between are summarized by count and size.
+    """
+    logs = data["logs"]
+    lines = [f"total {data['total']}"]
+    if not head + tail or len(logs) <= head + tail:
+        lines.extend(map(format_log_entry, logs))
+        return lines
+
+    omitted = logs[head:len(logs) - tail]
+    omitted_size = sum(log["size"] for log in omitted)
+    total_size = sum(log["size"] for log in logs)
+    lines.extend(map(format_log_entry, logs[:head]))
+    lines.append(
+        f"... {len(omitted)} more files ({format_size(omitted_size)}) not shown, "
+        f"{len(logs)} files ({format_size(total_size)}) in total ..."
+    )
+    lines.extend(map(format_log_entry, logs[len(logs) - tail:]))
+    return lines
 
 
-def read_file(file_path):
-    with open(file_path, "r") as file:
-        return file.read()
+def insert_log_listings(doc, listings):
+    """
+    Replaces each [log_N] placeholder with the lines of listings[N].
+    The document is walked once for all placeholders, and every listing is written as a single
+    preformatted run (one <w:t> per line, separated by <w:br/>) built and parsed as XML in one go,
+    keeping the placeholder's font. Going through python-docx line by line is far too slow for
+    servers with tens of thousands of log files.
+    """
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+
+    for p in list(doc.element.body.iter(qn("w:p"))):
+        paragraph = Paragraph(p, None)
+        for match in list(LOG_PLACEHOLDER_PATTERN.finditer(paragraph.text)):
+            if int(match.group(1)) in listings:
+                replace_with_listing(paragraph, match.group(0), listings[int(match.group(1))])
+
+
+def replace_with_listing(paragraph, placeholder, lines):
+    runs = paragraph.runs
+    run = next((run for run in runs if placeholder in run.text), None)
+    if run is None and placeholder in "".join(run.text for run in runs):
+        # The placeholder is split over several runs: fold the paragraph into its first run
+        text = "".join(run.text for run in runs)
+        for extra in runs[1:]:
+            extra._r.getparent().remove(extra._r)
+        run = runs[0]
+        run.text = text
+    elif run is None:
+        # Part of the placeholder sits in a hyperlink or field run, which paragraph.runs does not
+        # list: replace it in the paragraph text instead, losing the listing's formatting
+        logging.warning(f"Placeholder {placeholder} spans a hyperlink or field, writing its listing as plain text.")
+        paragraph.text = paragraph.text.replace(placeholder, "\n".join(lines))
+        return
+
+    before, after = run.text.split(placeholder, 1)
+    lines = [before + lines[0], *lines[1:]]
+    lines[-1] += after
+    if "\n" in before or "\n" in after:
+        lines = "\n".join(lines).split("\n")
+
+    listing_run = build_listing_run(lines)
+    if run._r.rPr is not None:
+        listing_run.insert(0, deepcopy(run._r.rPr))
+    run._r.addnext(listing_run)
+    run._r.getparent().remove(run._r)
+
+
+def build_listing_run(lines):
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    content = "<w:br/>".join(
+        f'<w:t xml:space="preserve">{escape(INVALID_XML_CHARS.sub("", line))}</w:t>' for line in lines
+    )
+    return parse_xml(f"<w:r {nsdecls('w')}>{content}</w:r>")
 
 
 def insert_logs_metadata(doc, data, collection_name,  cluster_name):
@@ -229,15 +297,17 @@ def insert_logs_metadata(doc, data, collection_name,  cluster_name):
 
 def extract_log_metadata(collection_name, cluster_name, server_name, log_file, index_server):
     j = index_server + 1
-    log_data = load_json(collection_name, cluster_name, server_name, log_file)
-    if not log_data:
+    try:
+        manifest = load_server_manifest(collection_name, cluster_name, server_name)
+    except (OSError, ValueError):
         return {}
-    logs = log_data.get("logs", [])
-    dates = [parse_log_date(log.get("date")) for log in logs if log.get("date")]
+    if log_file not in manifest["files"]:
+        return {}
+    earliest_date, latest_date = manifest["earliest_date"], manifest["latest_date"]
     return {
-        f"[ps_{j}]": min(dates).strftime("%Y-%m-%d") if dates else "",
-        f"[pe_{j}]": max(dates).strftime("%Y-%m-%d") if dates else "",
-        f"[nof_{j}]": str(len(log_data.get("logs", []))),
+        f"[ps_{j}]": datetime.fromisoformat(earliest_date).strftime("%Y-%m-%d") if earliest_date else "",
+        f"[pe_{j}]": datetime.fromisoformat(latest_date).strftime("%Y-%m-%d") if latest_date else "",
+        f"[nof_{j}]": str(manifest["entry_count"]),
     }
 
 
@@ -248,32 +318,172 @@ def generate_image_placeholders(data):
     }
 
 
-def wrap_report(collection_name):    
+def compute_fingerprint(file_paths, extra=None):
+    """
+    Returns a hash of the size and modification time of every input file.
+    Missing files are recorded as such, so adding or removing an input changes the fingerprint.
+    """
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+            entry = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        except FileNotFoundError:
+            entry = f"{file_path}|missing"
+        digest.update(entry.encode("utf-8"))
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_cluster_report_inputs(template_path, collection_name, cluster_name, data):
+    """Lists every file a cluster report is built from."""
+    cluster_path = get_path(BASE_DIR, collection_name, cluster_name)
+    return [
+        template_path,
+        *(get_path(cluster_path, "summaries", name) for name in sorted(data.get("summaries", []))),
+        *(get_path(cluster_path, "charts", name) for name in sorted(data.get("charts", []))),
+        *(
+            get_path(cluster_path, "servers", server.get("server_name"), "0_listing-audit-logs.json")
+            for server in data.get("servers", [])
+        ),
+    ]
+
+
+def compute_cluster_fingerprint(template_path, collection_name, cluster_name, data):
+    server_names = [server.get("server_name") for server in data.get("servers", [])]
+    return compute_fingerprint(
+        get_cluster_report_inputs(template_path, collection_name, cluster_name, data),
+        extra={
+            "servers": server_names,
+            "log_listing": [LOG_LISTING_HEAD, LOG_LISTING_TAIL],
+            "images": [REPORT_IMAGE_DPI, REPORT_IMAGE_COLORS],
+            "health": RULES_FINGERPRINT,
+        },
+    )
+
+
+def get_report_key(collection_name, file_name):
+    """Storage key of a report file, see utils.storage."""
+    return f"{collection_name}/{file_name}"
+
+
+def load_report_fingerprints(collection_name):
+    try:
+        return json.loads(REPORT_STORAGE.read_bytes(get_report_key(collection_name, FINGERPRINTS_FILE)))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"clusters": {}, "summary": None}
+
+
+def save_report_fingerprints(collection_name, fingerprints):
+    REPORT_STORAGE.write_bytes(
+        get_report_key(collection_name, FINGERPRINTS_FILE), json.dumps(fingerprints, indent=4).encode("utf-8")
+    )
+
+
+def is_report_current(record, fingerprint):
+    """Checks whether a stored report record still matches its inputs and its output exists."""
+    return bool(
+        record
+        and record.get("fingerprint") == fingerprint
+        and record.get("output_key")
+        and REPORT_STORAGE.exists(record["output_key"])
+    )
+
+
+def wrap_report(collection_name):
+    """
+    Returns the file name of the collection's report bundle; the download_zip endpoint turns it into a URL.
+    The ZIP itself is built on the fly when it is downloaded, see stream_report_zip.
+    """
     try:
         # Name of the ZIP file based on the collection name
         zip_filename = f"{collection_name}.zip"
-        zip_path = get_path(TEMP_DIR, zip_filename)
-        
-        # Path to the collection folder
-        collection_path = get_path(REPORTS_DIR, collection_name)
-
-        # Validate if the collection folder exists
-        if not os.path.isdir(collection_path):
-            logging.error(f"Collection '{collection_name}' does not exist in {REPORTS_DIR}.")
-            raise FileNotFoundError(f"Collection '{collection_name}' does not exist in {REPORTS_DIR}.")
-
-        # Create ZIP file
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for root, dirs, files in os.walk(collection_path):
-                for file in files:
-                    file_path = os.path.join(root, file)  # Full path to the file
-                    arcname = os.path.relpath(file_path, collection_path)  # Relative path inside the ZIP
-                    zipf.write(file_path, arcname)
-
-        # Generate download URL
-        download_url = url_for('download_zip', filename=zip_filename, _external=True)
-        return download_url
+
+        # Validate if the collection has reports
+        if not REPORT_STORAGE.exists_prefix(collection_name):
+            logging.error(f"Collection '{collection_name}' has no reports.")
+            raise FileNotFoundError(f"Collection '{collection_name}' has no reports.")
+
+        return zip_filename
 
     except Exception as e:
-        logging.error(f"Error while creating ZIP file: {str(e)}")
+        logging.error(f"Error while preparing report download: {str(e)}")
         raise
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that collects the bytes zipfile produces so they can be yielded."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def list_report_files(collection_name, cluster_names=None):
+    """
+    Lists the report objects to bundle, as storage listing entries with their "arcname" inside the ZIP.
+    When cluster_names is given, only those cluster reports and the summary report are included.
+    """
+    if not REPORT_STORAGE.exists_prefix(collection_name):
+        logging.error(f"Collection '{collection_name}' has no reports.")
+        raise FileNotFoundError(f"Collection '{collection_name}' has no reports.")
+
+    wanted = None
+    if cluster_names:
+        wanted = {f"{cluster_name}_Report.docx" for cluster_name in cluster_names} | {"Summary_Report.docx"}
+
+    report_files = []
+    for batch in REPORT_STORAGE.list(collection_name):
+        for item in batch:
+            arcname = item["key"][len(collection_name) + 1:]  # Relative path inside the ZIP
+            file_name = arcname.rsplit("/", 1)[-1]
+            if file_name.startswith(".") or (wanted is not None and file_name not in wanted):
+                continue
+            report_files.append({**item, "arcname": arcname})
+    return sorted(report_files, key=lambda item: item["arcname"])
+
+
+def stream_report_zip(report_files, chunk_size=64 * 1024):
+    """
+    Yields a ZIP archive of the given report files chunk by chunk, reading each member straight from storage.
+    Nothing is written to TEMP_DIR and at most one chunk is held in memory.
+    """
+    buffer = ZipStreamBuffer()
+    packaging_seconds, bytes_sent = 0.0, 0
+
+    with JOBS_IN_FLIGHT.track_inprogress(job="zip"):
+        started = time.perf_counter()
+        with zipfile.ZipFile(buffer, 'w') as zipf:
+            for report_file in report_files:
+                zip_info = zipfile.ZipInfo(report_file["arcname"], time.localtime(report_file["modified"])[:6])
+                zip_info.file_size = report_file["size"]
+                zip_info.external_attr = 0o644 << 16
+                with zipf.open(zip_info, 'w', force_zip64=True) as target:
+                    for chunk in REPORT_STORAGE.iter_chunks(report_file["key"], chunk_size=chunk_size):
+                        target.write(chunk)
+                        data = buffer.drain()
+                        # Only count our own work, not the time the client takes to read the chunk
+                        packaging_seconds += time.perf_counter() - started
+                        bytes_sent += len(data)
+                        yield data
+                        started = time.perf_counter()
+        data = buffer.drain()
+        packaging_seconds += time.perf_counter() - started
+        bytes_sent += len(data)
+        yield data
+
+    ZIP_PACKAGING_DURATION.observe(packaging_seconds)
+    BYTES_PROCESSED.inc(bytes_sent, stage="report_zip")
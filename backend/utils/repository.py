@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from utils.utils import BASE_DIR, get_path
+
+# Load environment variables
+load_dotenv()
+
+# Upper bound for the parsed-file cache, measured by the estimated memory of the parsed objects
+# (see estimate_memory; a parsed JSON file takes several times its size on disk)
+DATA_CACHE_MAX_BYTES = int(os.getenv("DATA_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Every merged summary has a hidden summaries/.stats-<summary file> beside it
+SUMMARY_STATS_PREFIX = ".stats-"
+
+SUBDIRECTORY_MAP = {
+    "chart": "charts",
+    "summary": "summaries",
+    "server": "servers",
+    "generic": "",
+}
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total cost of its entries.
+    Entries are keyed by (path, mtime, size) so a rewritten file is never served stale.
+    """
+
+    def __init__(self, max_cost):
+        self.max_cost = max_cost
+        self.total_cost = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, cost):
+        if cost > self.max_cost:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_cost -= self._entries.pop(key)[1]
+            self._entries[key] = (value, cost)
+            self.total_cost += cost
+            while self.total_cost > self.max_cost:
+                _, (_, evicted_cost) = self._entries.popitem(last=False)
+                self.total_cost -= evicted_cost
+
+    def invalidate(self, path):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self.total_cost -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_cost = 0
+
+
+_json_cache = LRUCache(DATA_CACHE_MAX_BYTES)
+
+
+def estimate_memory(data, sample=64):
+    """
+    Approximate bytes held by parsed JSON, from sys.getsizeof of its containers and values.
+    Long lists are estimated from `sample` evenly spaced items. Dict keys are not counted: the
+    JSON decoder shares one key string between all the objects of a document.
+    """
+    size = sys.getsizeof(data)
+    if isinstance(data, dict):
+        size += sum(estimate_memory(value, sample) for value in data.values())
+    elif isinstance(data, list) and data:
+        picked = data[::max(1, len(data) // sample)]
+        size += sum(estimate_memory(value, sample) for value in picked) * len(data) // len(picked)
+    return size
+
+
+def get_collection_file_path(collection_name, cluster_name, file_name, file_type="generic", server_name=None):
+    """Resolves the path of a file inside a cluster folder."""
+    if not all([collection_name, cluster_name, file_name]):
+        raise ValueError("Missing required parameters.")
+    if file_type not in SUBDIRECTORY_MAP or (file_type == "server" and not server_name):
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    parts = [BASE_DIR, collection_name, cluster_name, SUBDIRECTORY_MAP[file_type]]
+    if file_type == "server":
+        parts.append(server_name)
+    return get_path(*parts, file_name)
+
+
+def load_json_file(path):
+    """
+    Loads a JSON file through the shared cache.
+    The returned object is shared between callers and must be treated as read-only.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    data = _json_cache.get(key)
+    if data is None:
+        with open(path, "r") as f:
+            data = json.load(f)
+        _json_cache.invalidate(path)
+        _json_cache.put(key, data, estimate_memory(data))
+    return data
+
+
+def save_json(path, data, indent=4):
+    """
+    Writes a JSON file and primes the cache with the written data.
+    The file is written beside the target and renamed over it, so readers never see a partial file
+    and hardlinked copies of the old file (see utils.blob_store) are left untouched.
+    """
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temp_path, path)
+    stat = os.stat(path)
+    _json_cache.invalidate(path)
+    _json_cache.put((path, stat.st_mtime_ns, stat.st_size), data, estimate_memory(data))
+
+
+def load_counts(path, key):
+    """Returns the labels and counts of a metric file as a list and an int64 array."""
+    import numpy as np  # Loaded on first use, keeps numpy out of read-only workers
+
+    entries = [entry for entry in load_json_file(path) if key in entry]
+    labels = [entry[key] for entry in entries]
+    counts = np.fromiter((entry.get("Count", 0) for entry in entries), dtype=np.int64, count=len(entries))
+    return labels, counts
+
+
+def read_server_json(collection_name, cluster_name, server_name, file_name):
+    return load_json_file(get_collection_file_path(collection_name, cluster_name, file_name, "server", server_name))
+
+
+def read_summary_json(collection_name, cluster_name, file_name):
+    return load_json_file(get_collection_file_path(collection_name, cluster_name, file_name, "summary"))
+
+
+def read_summary_stats(collection_name, cluster_name, file_name):
+    """Returns the merge statistics of a summary, or None for summaries merged before they were recorded."""
+    try:
+        return load_json_file(
+            get_collection_file_path(collection_name, cluster_name, f"{SUMMARY_STATS_PREFIX}{file_name}", "summary")
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def clear_cache():
+    _json_cache.clear()
@@ -0,0 +1,168 @@
+import logging
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+from utils.locking import file_lock
+from utils.manifest import load_server_manifest
+from utils.health import HEALTH_RULES, OK, evaluate_health
+from utils.repository import load_json_file, read_summary_json, save_json
+from utils.trend_store import top_entries
+from utils.utils import BASE_DIR, get_path, get_subdirectories
+
+# Load environment variables
+load_dotenv()
+
+# Every collection keeps its rollup in BASE_DIR/<collection>/.rollup.json: one entry per cluster, refreshed
+# whenever that cluster is aggregated, plus collection totals re-derived from those entries
+ROLLUP_FILE = ".rollup.json"
+# Entries shown in the collection-wide top lists, and entries kept per cluster to merge them from
+ROLLUP_TOP_N = int(os.getenv("ROLLUP_TOP_N", 10))
+ROLLUP_TOP_K = int(os.getenv("ROLLUP_TOP_K", 50))
+
+# Summary file and label key of every rolled-up metric
+ROLLUP_METRICS = {
+    "operations": ("2_req-resp.json", "Operation"),
+    "auth": ("3_auth-resp.json", "DisplayName"),
+    "paths": ("5_req-paths.json", "Path"),
+    "errors": ("6_error-count.json", "Errors"),
+    "remote_addresses": ("7_remote-addr-count.json", "RemoteAddress"),
+}
+
+
+def get_rollup_path(collection_name):
+    return get_path(BASE_DIR, collection_name, ROLLUP_FILE)
+
+
+def load_rollup(collection_name):
+    try:
+        return load_json_file(get_rollup_path(collection_name))
+    except (OSError, ValueError):
+        return None
+
+
+def get_cluster_period(collection_name, cluster_name, server_names):
+    earliest, latest = [], []
+    for server_name in server_names:
+        try:
+            manifest = load_server_manifest(collection_name, cluster_name, server_name)
+        except (OSError, ValueError):
+            continue
+        if manifest.get("earliest_date") and manifest.get("latest_date"):
+            earliest.append(datetime.fromisoformat(manifest["earliest_date"]))
+            latest.append(datetime.fromisoformat(manifest["latest_date"]))
+    return min(earliest, default=None), max(latest, default=None)
+
+
+def build_cluster_entry(collection_name, cluster_name):
+    """Rolls up one cluster from its summaries: totals, top entries per metric and health rule states."""
+    server_names = get_subdirectories(get_path(BASE_DIR, collection_name, cluster_name, "servers"))
+    start_date, end_date = get_cluster_period(collection_name, cluster_name, server_names)
+
+    metrics = {}
+    for metric, (file_name, key) in ROLLUP_METRICS.items():
+        try:
+            entries = read_summary_json(collection_name, cluster_name, file_name)
+        except (OSError, ValueError):
+            entries = []
+        metrics[metric] = {
+            "total": sum(entry.get("Count", 0) for entry in entries),
+            "distinct": sum(1 for entry in entries if entry.get(key)),
+            "top": top_entries(entries, key, ROLLUP_TOP_K),
+        }
+
+    operations = dict(metrics["operations"]["top"])
+    health = evaluate_health(collection_name, [cluster_name])[cluster_name]
+    return {
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "servers": len(server_names),
+        "requests": operations.get("request", 0),
+        "responses": operations.get("response", 0),
+        "metrics": metrics,
+        "warnings": {
+            rule_id: {"state": result["state"], "message": result["message"]} for rule_id, result in health.items()
+        },
+    }
+
+
+def summarize_clusters(collection_name, clusters):
+    """
+    Derives the collection-wide figures from the cluster entries; cheap, as each cluster contributes
+    only its totals and top ROLLUP_TOP_K entries. Collection top lists are therefore exact for any
+    entry that is in the top ROLLUP_TOP_K of every cluster it appears in.
+    """
+    metrics = {}
+    for metric in ROLLUP_METRICS:
+        merged = {}
+        for cluster in clusters.values():
+            for label, count in cluster["metrics"][metric]["top"]:
+                merged[label] = merged.get(label, 0) + count
+        ranked = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:ROLLUP_TOP_N]
+        metrics[metric] = {
+            "total": sum(cluster["metrics"][metric]["total"] for cluster in clusters.values()),
+            "top": [[label, count] for label, count in ranked],
+        }
+
+    return {
+        "collection_name": collection_name,
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        "totals": {
+            "clusters": len(clusters),
+            "servers": sum(cluster["servers"] for cluster in clusters.values()),
+            "requests": sum(cluster["requests"] for cluster in clusters.values()),
+            "responses": sum(cluster["responses"] for cluster in clusters.values()),
+            "errors": metrics["errors"]["total"],
+        },
+        "metrics": metrics,
+        "warnings": {
+            rule["id"]: sum(
+                1 for cluster in clusters.values() if cluster["warnings"].get(rule["id"], {}).get("state") != OK
+            )
+            for rule in HEALTH_RULES
+        },
+        "clusters": clusters,
+    }
+
+
+def update_cluster_rollup(collection_name, cluster_name):
+    """Refreshes the entry of a cluster whose summaries changed, and the collection figures."""
+    entry = build_cluster_entry(collection_name, cluster_name)
+    with file_lock(f"rollup.{collection_name}"):
+        rollup = load_rollup(collection_name)
+        clusters = dict(rollup["clusters"]) if rollup else {}
+        clusters[cluster_name] = entry
+        save_json(get_rollup_path(collection_name), summarize_clusters(collection_name, clusters))
+
+
+def remove_cluster_rollup(collection_name, cluster_name):
+    with file_lock(f"rollup.{collection_name}"):
+        rollup = load_rollup(collection_name)
+        if not rollup or cluster_name not in rollup["clusters"]:
+            return
+        clusters = {name: entry for name, entry in rollup["clusters"].items() if name != cluster_name}
+        save_json(get_rollup_path(collection_name), summarize_clusters(collection_name, clusters))
+
+
+def rebuild_collection_rollup(collection_name):
+    """Builds the rollup from scratch, for collections aggregated before rollups existed."""
+    collection_path = get_path(BASE_DIR, collection_name)
+    cluster_names = [
+        cluster_name for cluster_name in get_subdirectories(collection_path)
+        if os.path.isdir(get_path(collection_path, cluster_name, "summaries"))
+    ]
+    # One vectorized pass over all clusters fills the health cache the entries read from
+    evaluate_health(collection_name, cluster_names)
+
+    clusters = {}
+    for cluster_name in cluster_names:
+        try:
+            clusters[cluster_name] = build_cluster_entry(collection_name, cluster_name)
+        except Exception as e:
+            logging.error(f"Failed to roll up cluster '{cluster_name}': {e}")
+
+    with file_lock(f"rollup.{collection_name}"):
+        rollup = summarize_clusters(collection_name, clusters)
+        save_json(get_rollup_path(collection_name), rollup)
+    return rollup
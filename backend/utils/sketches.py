@@ -0,0 +1,120 @@
+import hashlib
+import heapq
+import math
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimator (Flajolet et al.) in 2**precision one-byte registers.
+    The standard error of the estimate is about 1.04 / sqrt(2**precision), 1.6% for the default 12.
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, key):
+        # A stable hash of the key's text, so the estimate does not depend on PYTHONHASHSEED
+        value = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "big")
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def estimate(self):
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self._registers)
+        empty = self._registers.count(0)
+        if raw <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            return round(m * math.log(m / empty))
+        return round(raw)
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving heavy-hitter sketch (Metwally et al.) with a fixed number of counters.
+
+    Every tracked key carries an estimated count and the maximum amount it may be overestimated by.
+    With `capacity` counters and a total weight N, any key whose true count exceeds N / capacity is
+    guaranteed to be tracked, and every estimate satisfies
+        true_count <= count <= true_count + error,  error <= N / capacity.
+    While fewer than `capacity` distinct keys have been seen, counts are exact.
+    The number of distinct keys seen is estimated separately, see distinct().
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counters = {}  # key -> [count, error]
+        self._heap = []      # (count, sequence, key), may hold outdated entries
+        self._sequence = 0
+        self.evictions = 0
+        self._distinct = HyperLogLog()
+
+    def _push(self, key, count):
+        self._sequence += 1
+        heapq.heappush(self._heap, (count, self._sequence, key))
+        # Outdated heap entries are skipped lazily; rebuild when they start to dominate
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i, k) for i, (k, (c, _)) in enumerate(self._counters.items())]
+            heapq.heapify(self._heap)
+            self._sequence = len(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            counter = self._counters.get(key)
+            if counter is not None and counter[0] == count:
+                return key, counter
+
+    def update(self, key, weight=1):
+        if weight <= 0:
+            return
+        self.total += weight
+
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            self._push(key, counter[0])
+            return
+
+        # Keys are only hashed when they start being tracked, tracked keys were counted then
+        self._distinct.add(key)
+        if len(self._counters) < self.capacity:
+            counter = self._counters[key] = [weight, 0]
+        else:
+            # Replace the smallest counter; the new key inherits its count as possible overestimate
+            evicted_key, evicted = self._pop_min()
+            del self._counters[evicted_key]
+            self.evictions += 1
+            counter = self._counters[key] = [evicted[0] + weight, evicted[0]]
+        self._push(key, counter[0])
+
+    @property
+    def exact(self):
+        """True while no key was ever evicted, i.e. every count is exact and every key seen is tracked."""
+        return self.evictions == 0
+
+    def distinct(self):
+        """Number of distinct keys seen: exact while nothing was evicted, a HyperLogLog estimate after."""
+        return len(self._counters) if self.exact else self._distinct.estimate()
+
+    @property
+    def max_error(self):
+        """Upper bound of the overestimate of any reported count."""
+        return self.total // self.capacity if len(self._counters) >= self.capacity else 0
+
+    def top(self, k=None):
+        """Returns (key, count, error) tuples sorted by estimated count, largest first."""
+        items = sorted(self._counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count, error) for key, (count, error) in items[:k]]
+
+    def __len__(self):
+        return len(self._counters)
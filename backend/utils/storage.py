@@ -0,0 +1,261 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from utils.trash import move_to_trash
+from utils.utils import REPORTS_DIR, get_path
+
+# Load environment variables
+load_dotenv()
+
+# "local" keeps files under the *_DIR folders; "s3" stores them in an S3-compatible bucket (AWS, MinIO, ...)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_REGION = os.getenv("S3_REGION")
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+LIST_BATCH_SIZE = 1000
+# Writes to object storage are buffered in memory up to this size, then spill to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def validate_key(key):
+    """Keys are "/"-separated relative paths; empty, absolute and parent components are rejected."""
+    parts = key.split("/")
+    if not key or key.startswith("/") or any(part in ("", ".", "..") or "\\" in part for part in parts):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return parts
+
+
+class LocalStorage:
+    """Stores objects as files under a root folder; keys map to relative paths."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def locate(self, key):
+        return get_path(self.root, *validate_key(key))
+
+    def exists(self, key):
+        return os.path.isfile(self.locate(key))
+
+    def exists_prefix(self, prefix):
+        return os.path.isdir(self.locate(prefix))
+
+    def stat(self, key):
+        stat = os.stat(self.locate(key))
+        return {"key": key, "size": stat.st_size, "modified": stat.st_mtime}
+
+    def iter_chunks(self, key, start=0, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields the bytes in [start, end) of an object, chunk by chunk."""
+        with open(self.locate(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def read_bytes(self, key):
+        with open(self.locate(key), "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def open_write(self, key):
+        """Yields a binary file to write the object to; it is only published once the block exits cleanly."""
+        path = self.locate(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dotfile name, so listings never pick up a half-written object
+        temp_path = get_path(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                yield f
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def write_bytes(self, key, data):
+        with self.open_write(key) as f:
+            f.write(data)
+
+    def list(self, prefix="", batch_size=LIST_BATCH_SIZE):
+        """Yields the objects under a prefix, recursively, in batches of at most `batch_size`."""
+        root = self.locate(prefix) if prefix else self.root
+        batch = []
+        for directory, dir_names, files in os.walk(root):
+            dir_names[:] = sorted(name for name in dir_names if not name.startswith("."))  # e.g. .trash
+            for file_name in sorted(files):
+                path = get_path(directory, file_name)
+                stat = os.stat(path)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                batch.append({"key": key, "size": stat.st_size, "modified": stat.st_mtime})
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def list_prefixes(self, prefix=""):
+        """Names of the direct "sub-folders" of a prefix."""
+        root = self.locate(prefix) if prefix else self.root
+        if not os.path.isdir(root):
+            return []
+        return sorted(entry.name for entry in os.scandir(root) if entry.is_dir())
+
+    def delete(self, key):
+        try:
+            os.remove(self.locate(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix):
+        """Moves the folder to the trash; utils.reaper frees the space in the background."""
+        move_to_trash(self.locate(prefix), self.root)
+
+
+class S3Storage:
+    """
+    Stores objects in an S3-compatible bucket under an optional key prefix.
+    boto3 is only required, and only imported, when this backend is used.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None):
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND is 's3'.")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                try:
+                    import boto3
+                except ImportError:
+                    raise RuntimeError("STORAGE_BACKEND 's3' requires boto3 (pip install boto3).")
+                self._client = boto3.client("s3", endpoint_url=self.endpoint_url, region_name=self.region)
+            return self._client
+
+    def object_key(self, key):
+        validate_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def relative_key(self, object_key):
+        return object_key[len(self.prefix) + 1:] if self.prefix else object_key
+
+    def locate(self, key):
+        return f"s3://{self.bucket}/{self.object_key(key)}"
+
+    def is_not_found(self, error):
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def stat(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if self.is_not_found(e):
+                raise FileNotFoundError(f"Object '{key}' not found.")
+            raise
+        return {"key": key, "size": head["ContentLength"], "modified": head["LastModified"].timestamp()}
+
+    def exists(self, key):
+        try:
+            self.stat(key)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def exists_prefix(self, prefix):
+        response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=f"{self.object_key(prefix)}/", MaxKeys=1)
+        return response.get("KeyCount", 0) > 0
+
+    def iter_chunks(self, key, start=0, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yields the bytes in [start, end) of an object, fetching only that range from the bucket."""
+        from botocore.exceptions import ClientError
+
+        request = {"Bucket": self.bucket, "Key": self.object_key(key)}
+        if start or end is not None:
+            request["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            body = self.client.get_object(**request)["Body"]
+        except ClientError as e:
+            if self.is_not_found(e):
+                raise FileNotFoundError(f"Object '{key}' not found.")
+            raise
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def read_bytes(self, key):
+        return b"".join(self.iter_chunks(key))
+
+    @contextmanager
+    def open_write(self, key):
+        """Yields a binary file to write the object to; it is uploaded (multipart when large) when the block exits."""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as f:
+            yield f
+            f.seek(0)
+            self.client.upload_fileobj(f, self.bucket, self.object_key(key))
+
+    def write_bytes(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.object_key(key), Body=data)
+
+    def list(self, prefix="", batch_size=LIST_BATCH_SIZE):
+        """Yields the objects under a prefix in batches, one list request per batch."""
+        object_prefix = f"{self.object_key(prefix)}/" if prefix else (f"{self.prefix}/" if self.prefix else "")
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=self.bucket, Prefix=object_prefix, PaginationConfig={"PageSize": batch_size})
+        for page in pages:
+            batch = [
+                {"key": self.relative_key(item["Key"]), "size": item["Size"], "modified": item["LastModified"].timestamp()}
+                for item in page.get("Contents", [])
+            ]
+            if batch:
+                yield batch
+
+    def list_prefixes(self, prefix=""):
+        object_prefix = f"{self.object_key(prefix)}/" if prefix else (f"{self.prefix}/" if self.prefix else "")
+        paginator = self.client.get_paginator("list_objects_v2")
+        names = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=object_prefix, Delimiter="/"):
+            names.extend(item["Prefix"][len(object_prefix):].rstrip("/") for item in page.get("CommonPrefixes", []))
+        return sorted(names)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def delete_prefix(self, prefix):
+        # list_objects_v2 pages and delete_objects requests are both capped at 1000 keys
+        for batch in self.list(prefix, batch_size=1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self.object_key(item["key"])} for item in batch], "Quiet": True},
+            )
+
+
+def create_storage(local_root, namespace):
+    """Returns the storage for one kind of data: a local folder, or a namespace inside the bucket."""
+    if STORAGE_BACKEND == "s3":
+        prefix = "/".join(part for part in (S3_PREFIX.strip("/"), namespace) if part)
+        return S3Storage(S3_BUCKET, prefix, S3_ENDPOINT_URL, S3_REGION)
+    if STORAGE_BACKEND != "local":
+        raise ValueError(f"Unsupported STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return LocalStorage(local_root)
+
+
+REPORT_STORAGE = create_storage(REPORTS_DIR, "reports")
@@ -0,0 +1,127 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from utils.utils import TEMP_DIR
+
+# Load environment variables
+load_dotenv()
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+# Fraction of traces whose spans are exported while tracing is enabled
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(TEMP_DIR, "traces.jsonl"))
+# Once larger than this, the trace file is rotated to <TRACE_FILE>.1, replacing the previous one
+TRACE_FILE_MAX_MB = float(os.getenv("TRACE_FILE_MAX_MB", 64))
+TRACE_FILES = (TRACE_FILE, f"{TRACE_FILE}.1")
+
+_current_trace_id = contextvars.ContextVar("trace_id", default=None)
+_trace_sampled = contextvars.ContextVar("trace_sampled", default=False)
+_current_span = contextvars.ContextVar("span", default=None)
+_export_lock = threading.Lock()
+
+
+def new_id(length=32):
+    return uuid.uuid4().hex[:length]
+
+
+def start_trace(trace_id=None):
+    """
+    Binds a trace ID to the current context, deciding once per trace whether its spans are sampled.
+    Returns the token to pass to end_trace.
+    """
+    return _current_trace_id.set(trace_id or new_id()), _trace_sampled.set(random.random() < TRACE_SAMPLE_RATE)
+
+
+def end_trace(token):
+    trace_token, sampled_token = token
+    _current_trace_id.reset(trace_token)
+    _trace_sampled.reset(sampled_token)
+
+
+def current_trace_id():
+    return _current_trace_id.get()
+
+
+def export_span(record):
+    line = json.dumps(record, default=str)
+    try:
+        with _export_lock:
+            with open(TRACE_FILE, "a") as f:
+                f.write(line + "\n")
+                size = f.tell()
+            if TRACE_FILE_MAX_MB and size > TRACE_FILE_MAX_MB * 1024 * 1024:
+                # Another process may rotate at the same moment; at worst a few spans are lost
+                os.replace(TRACE_FILE, TRACE_FILES[1])
+    except OSError as e:
+        logging.error(f"Failed to export trace span: {e}")
+
+
+class Span:
+    """
+    A timed unit of work. Nested spans record their parent, so a trace can be rebuilt
+    from the JSON-lines export by grouping on trace_id and following parent_id.
+    """
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.span_id = new_id(16)
+        self.parent_id = None
+        self.trace_id = None
+        self._trace_token = None
+        self._span_token = None
+        self._recording = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        if not TRACING_ENABLED:
+            return self
+        if current_trace_id() is None:
+            # Work started outside a request (e.g. the CLI) gets its own trace
+            self._trace_token = start_trace()
+        if not _trace_sampled.get():
+            return self
+        self._recording = True
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = current_trace_id()
+        self._span_token = _current_span.set(self)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._recording:
+            if self._trace_token is not None:
+                end_trace(self._trace_token)
+            return False
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        _current_span.reset(self._span_token)
+        export_span({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": round(duration_ms, 3),
+            "status": "error" if exc_type else "ok",
+            "error": str(exc) if exc else None,
+            "attributes": self.attributes,
+        })
+        if self._trace_token is not None:
+            end_trace(self._trace_token)
+        return False
+
+
+def span(name, **attributes):
+    """Usage: `with span("aggregate.cluster", cluster=cluster_name) as s: ... s.set(rows=n)`"""
+    return Span(name, attributes)
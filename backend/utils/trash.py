@@ -0,0 +1,26 @@
+import os
+import uuid
+
+from utils.utils import create_and_get_path, get_path
+
+# Every data root has a hidden trash folder; utils.reaper empties them in the background
+TRASH_DIR_NAME = ".trash"
+
+
+def get_trash_dir(root):
+    return get_path(root, TRASH_DIR_NAME)
+
+
+def move_to_trash(path, root):
+    """
+    Moves a file or folder into <root>/.trash with a single rename, so deleting even a huge
+    collection returns immediately and readers see it either complete or gone.
+    `path` must live under `root`, which keeps the rename on one filesystem.
+    Returns False when there was nothing to move.
+    """
+    trash_dir = create_and_get_path(root, TRASH_DIR_NAME)
+    try:
+        os.rename(path, get_path(trash_dir, f"{uuid.uuid4().hex}-{os.path.basename(path)}"))
+    except FileNotFoundError:
+        return False
+    return True
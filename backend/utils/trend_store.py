@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from utils.locking import file_lock
+from utils.repository import LRUCache, read_summary_json, read_summary_stats
+from utils.utils import TRENDS_DIR, get_path
+
+NUMERIC_COLUMNS = ("requests", "responses", "errors", "paths", "remote_addresses")
+DATE_COLUMNS = ("collected_at", "start_date", "end_date")
+TEXT_COLUMNS = ("collection", "top_paths", "top_errors")
+TOP_N = 5
+
+# Each cluster has one .npz file under TRENDS_DIR: one array per column, one row per collection,
+# sorted by collection time. Aggregation upserts the row of the collection it just processed.
+# A file holds rows of every collection and is written by any web worker or CLI process, so each
+# read-modify-write runs under file_lock("trends.<cluster>")
+_read_cache = LRUCache(32 * 1024 * 1024)
+
+
+def get_trend_path(cluster_name):
+    return get_path(TRENDS_DIR, f"{cluster_name}.npz")
+
+
+def parse_collection_time(collection_name):
+    """Reads the timestamp out of generated names like healthcheck_2024-11-04-13.05."""
+    match = re.search(r"(\d{4}-\d{2}-\d{2})(?:-(\d{2})\.(\d{2}))?", collection_name)
+    if not match:
+        return None
+    date_part, hour, minute = match.groups()
+    try:
+        return datetime.strptime(f"{date_part} {hour or '00'}:{minute or '00'}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def top_entries(entries, key, n=TOP_N):
+    ranked = sorted((entry for entry in entries if entry.get(key)), key=lambda entry: entry["Count"], reverse=True)
+    return [[entry[key], entry["Count"]] for entry in ranked[:n]]
+
+
+def build_trend_row(collection_name, cluster_name, start_date, end_date):
+    def summary(file_name):
+        try:
+            return read_summary_json(collection_name, cluster_name, file_name)
+        except (OSError, ValueError):
+            return []
+
+    def distinct(file_name, entries):
+        # Approximate summaries keep only their top keys, so their length stops at top_k
+        stats = read_summary_stats(collection_name, cluster_name, file_name)
+        return stats["distinct"] if stats and "distinct" in stats else len(entries)
+
+    req_resp = {entry.get("Operation"): entry.get("Count", 0) for entry in summary("2_req-resp.json")}
+    errors = summary("6_error-count.json")
+    paths = summary("5_req-paths.json")
+    addresses = summary("7_remote-addr-count.json")
+
+    return {
+        "collection": collection_name,
+        # Unknown (NaT) for collections without a timestamp in their name: the wall clock would give an
+        # old collection a new place in the series every time it is re-aggregated
+        "collected_at": parse_collection_time(collection_name),
+        "start_date": start_date,
+        "end_date": end_date,
+        "requests": req_resp.get("request", 0),
+        "responses": req_resp.get("response", 0),
+        "errors": sum(entry.get("Count", 0) for entry in errors),
+        "paths": distinct("5_req-paths.json", paths),
+        "remote_addresses": distinct("7_remote-addr-count.json", addresses),
+        "top_paths": json.dumps(top_entries(paths, "Path")),
+        "top_errors": json.dumps(top_entries(errors, "Errors")),
+    }
+
+
+def load_columns(cluster_name):
+    """Returns the cluster's columns as a dict of NumPy arrays, or None when nothing was recorded yet."""
+    import numpy as np
+
+    path = get_trend_path(cluster_name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    columns = _read_cache.get(key)
+    if columns is None:
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+        _read_cache.invalidate(path)
+        _read_cache.put(key, columns, stat.st_size)
+    return columns
+
+
+def save_columns(cluster_name, columns):
+    import numpy as np
+
+    path = get_trend_path(cluster_name)
+    temp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temp_path, **columns)
+    os.replace(temp_path, path)
+
+
+def rows_to_columns(rows):
+    import numpy as np
+
+    # Rows without a collection time go last, where NaT also sorts, so searchsorted keeps working
+    rows = sorted(rows, key=lambda row: (row["collected_at"] is None, row["collected_at"] or datetime.min))
+    columns = {name: np.array([row[name] for row in rows], dtype=np.int64) for name in NUMERIC_COLUMNS}
+    columns.update({
+        name: np.array([row[name] for row in rows], dtype="datetime64[s]") for name in DATE_COLUMNS
+    })
+    columns.update({name: np.array([row[name] for row in rows], dtype=np.str_) for name in TEXT_COLUMNS})
+    return columns
+
+
+def columns_to_rows(columns):
+    if columns is None:
+        return []
+    names = NUMERIC_COLUMNS + DATE_COLUMNS + TEXT_COLUMNS
+    return [
+        {name: columns[name][i].item() for name in names}
+        for i in range(len(columns["collection"]))
+    ]
+
+
+def record_cluster_trend(collection_name, cluster_name, start_date, end_date):
+    """Upserts the row of this collection in the cluster's series."""
+    row = build_trend_row(collection_name, cluster_name, start_date, end_date)
+    with file_lock(f"trends.{cluster_name}"):
+        rows = [r for r in columns_to_rows(load_columns(cluster_name)) if r["collection"] != collection_name]
+        save_columns(cluster_name, rows_to_columns(rows + [row]))
+
+
+def remove_collection_trends(collection_name, cluster_names=None):
+    """Drops a deleted collection (or some of its clusters) from the series."""
+    for file_name in os.listdir(TRENDS_DIR):
+        cluster_name, extension = os.path.splitext(file_name)
+        if extension != ".npz" or (cluster_names and cluster_name not in cluster_names):
+            continue
+        with file_lock(f"trends.{cluster_name}"):
+            rows = columns_to_rows(load_columns(cluster_name))
+            remaining = [r for r in rows if r["collection"] != collection_name]
+            if len(remaining) != len(rows):
+                if remaining:
+                    save_columns(cluster_name, rows_to_columns(remaining))
+                else:
+                    os.remove(get_trend_path(cluster_name))
+
+
+def list_trend_clusters():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(TRENDS_DIR) if name.endswith(".npz"))
+
+
+def query_trend(cluster_name, metrics=None, since=None, until=None):
+    """
+    Returns the series of a cluster between `since` and `until` (datetimes, inclusive).
+    The time filter is a binary search over the sorted collected_at column.
+    """
+    import numpy as np
+
+    columns = load_columns(cluster_name)
+    if columns is None:
+        return None
+
+    metrics = list(metrics or NUMERIC_COLUMNS)
+    unknown = [metric for metric in metrics if metric not in NUMERIC_COLUMNS + ("top_paths", "top_errors")]
+    if unknown:
+        raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+
+    collected_at = columns["collected_at"]
+    lo = np.searchsorted(collected_at, np.datetime64(since, "s"), side="left") if since else 0
+    hi = np.searchsorted(collected_at, np.datetime64(until, "s"), side="right") if until else len(collected_at)
+    if since or until:
+        # Collections without a known time sort last and never match a time filter
+        hi = min(hi, len(collected_at) - int(np.isnat(collected_at).sum()))
+
+    series = {
+        "collection": columns["collection"][lo:hi].tolist(),
+        "collected_at": [
+            None if np.isnat(value) else str(value) for value in collected_at[lo:hi]
+        ],
+        "start_date": np.datetime_as_string(columns["start_date"][lo:hi]).tolist(),
+        "end_date": np.datetime_as_string(columns["end_date"][lo:hi]).tolist(),
+    }
+    for metric in metrics:
+        values = columns[metric][lo:hi]
+        series[metric] = [json.loads(v) for v in values.tolist()] if metric.startswith("top_") else values.tolist()
+    logging.debug(f"Trend query for '{cluster_name}' returned {hi - lo} points.")
+    return series
@@ -0,0 +1,152 @@
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+from utils.blob_store import link_or_copy
+from utils.manifest import hash_file
+from utils.repository import load_json_file, save_json
+from utils.utils import TEMP_DIR, create_and_get_path, get_path
+
+# Load environment variables
+load_dotenv()
+
+# Every upload is a folder under TEMP_DIR/uploads holding its metadata and the partially received file
+UPLOADS_DIR = create_and_get_path(TEMP_DIR, "uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+STREAM_BUFFER_SIZE = 1024 * 1024
+METADATA_FILE = "upload.json"
+DATA_FILE = "data.part"
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadOffsetError(ValueError):
+    """Raised when a chunk does not continue the upload; carries the offset the client must resume from."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class StagedFile:
+    """Gives a completed upload the `filename` / `save()` interface of a Werkzeug FileStorage."""
+
+    def __init__(self, path, filename):
+        self.path = path
+        self.filename = filename
+
+    def save(self, destination):
+        link_or_copy(self.path, destination)
+
+
+def get_upload_path(upload_id):
+    if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+        raise FileNotFoundError("Upload not found.")
+    return get_path(UPLOADS_DIR, upload_id)
+
+
+def create_upload(collection_name, filename, size, sha256=None):
+    upload_id = uuid.uuid4().hex
+    upload_path = create_and_get_path(UPLOADS_DIR, upload_id)
+    open(get_path(upload_path, DATA_FILE), "wb").close()
+
+    now = datetime.now().isoformat(timespec="seconds")
+    metadata = {
+        "upload_id": upload_id,
+        "collection_name": collection_name,
+        "filename": filename,
+        "size": size,
+        "sha256": sha256,
+        "offset": 0,
+        "chunks": 0,
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "created_at": now,
+        "updated_at": now,
+    }
+    save_json(get_path(upload_path, METADATA_FILE), metadata)
+    return metadata
+
+
+def get_upload(upload_id):
+    try:
+        return load_json_file(get_path(get_upload_path(upload_id), METADATA_FILE))
+    except FileNotFoundError:
+        raise FileNotFoundError("Upload not found.")
+
+
+def write_chunk(upload_id, offset, stream, length, checksum):
+    """
+    Streams one chunk from `stream` into the staged file at `offset`.
+    The chunk is only committed (the stored offset advanced) once all `length` bytes arrived and
+    their SHA-256 matches `checksum`; bytes of a failed or interrupted chunk are truncated away
+    by the next attempt, so a client can always resume from the offset reported by get_upload.
+    """
+    upload_path = get_upload_path(upload_id)
+    metadata = get_upload(upload_id)
+    if not checksum:
+        raise ValueError("Missing chunk checksum.")
+    if not length or length < 0 or offset + length > metadata["size"]:
+        raise ValueError(f"Chunk of {length} bytes at offset {offset} exceeds the upload size of {metadata['size']}.")
+
+    with open(get_path(upload_path, DATA_FILE), "r+b") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadOffsetError("Another chunk is being written to this upload.", metadata["offset"])
+
+        # Re-read under the lock, a concurrent writer may have committed a chunk meanwhile
+        metadata = get_upload(upload_id)
+        if offset != metadata["offset"]:
+            raise UploadOffsetError(f"Expected a chunk at offset {metadata['offset']}.", metadata["offset"])
+
+        f.truncate(offset)
+        f.seek(offset)
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining:
+            buffer = stream.read(min(STREAM_BUFFER_SIZE, remaining))
+            if not buffer:
+                break
+            f.write(buffer)
+            digest.update(buffer)
+            remaining -= len(buffer)
+
+        if remaining:
+            f.truncate(offset)
+            raise UploadOffsetError(f"Chunk ended after {length - remaining} of {length} bytes.", offset)
+        if digest.hexdigest() != checksum.lower():
+            f.truncate(offset)
+            raise ValueError("Chunk checksum mismatch.")
+
+        f.flush()
+        os.fsync(f.fileno())
+        metadata = {
+            **metadata,
+            "offset": offset + length,
+            "chunks": metadata["chunks"] + 1,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        save_json(get_path(upload_path, METADATA_FILE), metadata)
+    return metadata
+
+
+def finalize_upload(upload_id):
+    """Checks that an upload is complete and intact, and returns its metadata and staged file."""
+    metadata = get_upload(upload_id)
+    if metadata["offset"] != metadata["size"]:
+        raise UploadOffsetError(
+            f"Upload is incomplete: {metadata['offset']} of {metadata['size']} bytes received.", metadata["offset"]
+        )
+
+    data_path = get_path(get_upload_path(upload_id), DATA_FILE)
+    if metadata["sha256"] and hash_file(data_path) != metadata["sha256"].lower():
+        raise ValueError("Upload checksum mismatch.")
+    return metadata, StagedFile(data_path, metadata["filename"])
+
+
+def remove_upload(upload_id):
+    shutil.rmtree(get_upload_path(upload_id), ignore_errors=True)
@@ -12,12 +12,16 @@ TEMP_DIR = os.getenv("TEMP_DIR", os.path.abspath("__temp__"))
 BASE_DIR = os.getenv("BASE_DIR", os.path.abspath("__collections__"))
 REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.abspath("__reports__"))
 TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", os.path.abspath("__templates__"))
+TRENDS_DIR = os.getenv("TRENDS_DIR", os.path.abspath("__trends__"))
+BLOBS_DIR = os.getenv("BLOBS_DIR", os.path.abspath("__blobs__"))
 
 # Ensure the directories exist
 os.makedirs(BASE_DIR, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 os.makedirs(TEMPLATES_DIR, exist_ok=True)
+os.makedirs(TRENDS_DIR, exist_ok=True)
+os.makedirs(BLOBS_DIR, exist_ok=True)
 
 # Utility Functions
 def validate_filename(filename):
@@ -67,9 +71,12 @@ def is_valid_name(name):
 
 
 def get_subdirectories(path):
-    """Returns a list of subdirectories in a given path."""
+    """Returns a list of subdirectories in a given path, skipping hidden (staging) folders."""
     try:
-        subdirs = [folder for folder in os.listdir(path) if os.path.isdir(os.path.join(path, folder))]
+        subdirs = [
+            folder for folder in os.listdir(path)
+            if not folder.startswith(".") and os.path.isdir(os.path.join(path, folder))
+        ]
         return subdirs
     except FileNotFoundError:
         return []